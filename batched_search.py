@@ -0,0 +1,239 @@
+import heapq
+from collections import OrderedDict
+
+import numpy as np
+
+from graph_store import CSRGraph
+
+
+class ShortestPathTree:
+    """
+    Dijkstra from one source that can be resumed: the settled distances and
+    parents plus the open frontier, so asking for more goals later only
+    extends the search instead of starting over.
+    """
+
+    __slots__ = ("source", "dist", "parent", "settled", "queue")
+
+    def __init__(self, source):
+        self.source = source
+        self.dist = {source: 0}
+        self.parent = {source: None}
+        self.settled = set()
+        self.queue = [(0, source)]
+
+    @property
+    def complete(self):
+        """True once every reachable node is settled."""
+        return not self.queue
+
+    def settle(self, adjacency, goals):
+        """Extend the search until every node in ``goals`` is settled or nothing reachable is left."""
+        settled, dist, parent, queue = self.settled, self.dist, self.parent, self.queue
+        missing = {goal for goal in goals if goal not in settled}
+        while missing and queue:
+            d, u = heapq.heappop(queue)
+            if u in settled:
+                continue
+            settled.add(u)
+            missing.discard(u)
+            for v, w in adjacency[u]:
+                nd = d + w
+                if nd < dist.get(v, float("inf")):
+                    dist[v] = nd
+                    parent[v] = u
+                    heapq.heappush(queue, (nd, v))
+
+    def distance(self, node):
+        """Settled distance to ``node``, inf if it is not settled (unreachable once the tree is complete)."""
+        return self.dist[node] if node in self.settled else float("inf")
+
+    def path(self, goal):
+        if goal not in self.settled:
+            return []
+        path = [goal]
+        while self.parent[path[-1]] is not None:
+            path.append(self.parent[path[-1]])
+        path.reverse()
+        return path
+
+
+class DistanceOracle:
+    """
+    Batched shortest-path distances on one weighted graph (an adjacency dict
+    of node -> [(neighbor, weight), ...] or a CSRGraph, queried by label).
+
+    Shortest-path trees are kept in an LRU cache keyed by source, so repeated
+    queries from a source are answered from its settled tree and new goals
+    resume its search. With a ContractionHierarchy of the same graph,
+    ``many_to_many`` uses the bucket algorithm instead of one search per
+    source.
+    """
+
+    def __init__(self, graph, capacity=64, hierarchy=None):
+        self.graph = graph
+        self.csr = isinstance(graph, CSRGraph)
+        self.adjacency = graph.weighted_view() if self.csr else graph
+        self.capacity = capacity
+        self.hierarchy = hierarchy
+        self._trees = OrderedDict()  # source -> ShortestPathTree, least recently used first
+        self.hits = 0
+        self.searches = 0
+
+    def _id(self, node):
+        return self.graph.node_id(node) if self.csr else node
+
+    def tree(self, source):
+        """The cached tree of ``source`` (as an id for CSR graphs), created if missing."""
+        tree = self._trees.get(source)
+        if tree is not None:
+            self._trees.move_to_end(source)
+            return tree
+        tree = self._trees[source] = ShortestPathTree(source)
+        if len(self._trees) > self.capacity:
+            self._trees.popitem(last=False)
+        return tree
+
+    def _settled_tree(self, source, goals):
+        tree = self.tree(source)
+        if tree.complete or all(goal in tree.settled for goal in goals):
+            self.hits += 1
+        else:
+            self.searches += 1
+            tree.settle(self.adjacency, goals)
+        return tree
+
+    def one_to_many(self, source, goals):
+        """
+        Distances from ``source`` to each of ``goals`` from a single search
+        that stops once all of them are settled.
+
+        Returns:
+            Float array with one distance per goal, inf where unreachable.
+        """
+        goals = [self._id(goal) for goal in goals]
+        tree = self._settled_tree(self._id(source), goals)
+        return np.array([tree.distance(goal) for goal in goals], dtype=np.float64)
+
+    def shortest_path(self, start, goal):
+        """(cost, path) like ``uniform_cost_search``, but with the path itself; (inf, []) if unreachable."""
+        goal_id = self._id(goal)
+        tree = self._settled_tree(self._id(start), [goal_id])
+        path = tree.path(goal_id)
+        return tree.distance(goal_id), self.graph.labels_of(path) if self.csr else path
+
+    def many_to_many(self, sources, targets):
+        """
+        Distance table between ``sources`` (rows) and ``targets`` (columns),
+        bucket-based when a hierarchy is available.
+        """
+        if self.hierarchy is not None:
+            return bucket_distance_table(self.hierarchy, sources, targets)
+        table = np.empty((len(sources), len(targets)), dtype=np.float64)
+        for i, source in enumerate(sources):
+            table[i] = self.one_to_many(source, targets)
+        return table
+
+
+def bucket_distance_table(hierarchy, sources, targets):
+    """
+    Many-to-many distances on a ContractionHierarchy (Knopp et al.).
+
+    A backward upward search from every target leaves (target, distance)
+    entries in the bucket of each node it settles. A forward upward search
+    from every source then only scans the buckets of the nodes it settles.
+    Every shortest path meets at its highest node, so the smallest sum
+    over those entries is the distance.
+    """
+    table = np.full((len(sources), len(targets)), np.inf)
+    bucket_nodes, bucket_targets, bucket_dists = [], [], []
+    for j, target in enumerate(targets):
+        nodes, dists = hierarchy.upward_search(hierarchy._id(target), backward=True)
+        bucket_nodes.extend(nodes)
+        bucket_targets.extend([j] * len(nodes))
+        bucket_dists.extend(dists)
+
+    # Buckets as CSR arrays over node ids, so each source scans them vectorized
+    n = len(hierarchy.rank)
+    bucket_nodes = np.array(bucket_nodes, dtype=np.int64)
+    order = np.argsort(bucket_nodes, kind="stable")
+    bucket_targets = np.array(bucket_targets, dtype=np.int64)[order]
+    bucket_dists = np.array(bucket_dists, dtype=np.float64)[order]
+    counts = np.bincount(bucket_nodes, minlength=n)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+
+    for i, source in enumerate(sources):
+        nodes, dists = hierarchy.upward_search(hierarchy._id(source))
+        nodes = np.array(nodes, dtype=np.int64)
+        sizes = counts[nodes]
+        total = int(sizes.sum())
+        if not total:
+            continue
+        # Index of every bucket entry of every settled node, in one array
+        offsets = np.repeat(starts[nodes] - np.cumsum(sizes) + sizes, sizes) + np.arange(total)
+        np.minimum.at(table[i], bucket_targets[offsets], np.repeat(np.array(dists, dtype=np.float64), sizes)
+                      + bucket_dists[offsets])
+    return table
+
+
+def benchmark(size=100, num_sources=50, num_targets=50, seed=0):
+    """Distance tables by repeated single-goal searches, one-to-many searches, buckets and the tree cache."""
+    import random
+    import tempfile
+    import time
+
+    from contraction_hierarchy import ContractionHierarchy
+    from indexed_heap import indexed_best_first_search
+    from landmarks import grid_graph
+
+    graph = grid_graph(size, seed=seed)
+    rng = random.Random(seed + 1)
+    sources = [graph.label(rng.randrange(graph.num_nodes)) for _ in range(num_sources)]
+    targets = [graph.label(rng.randrange(graph.num_nodes)) for _ in range(num_targets)]
+    print(f"Weighted grid: {graph.num_nodes:,} nodes, {num_sources} x {num_targets} distance table")
+
+    # Pairwise searches are slow, so time a few rows and scale up
+    rows = 2
+    adjacency = graph.weighted_view()
+    start = time.perf_counter()
+    pairwise = [[indexed_best_first_search(adjacency, graph.node_id(s), graph.node_id(t))[0] for t in targets]
+                for s in sources[:rows]]
+    elapsed = (time.perf_counter() - start) * num_sources / rows
+    print(f"  {'pairwise searches':<24} {elapsed:8.2f}s (estimated from {rows} rows)")
+
+    oracle = DistanceOracle(graph, capacity=num_sources)
+    start = time.perf_counter()
+    table = oracle.many_to_many(sources, targets)
+    print(f"  {'one-to-many searches':<24} {time.perf_counter() - start:8.2f}s")
+    assert table[:rows].tolist() == pairwise
+    start = time.perf_counter()
+    again = oracle.many_to_many(sources, targets)
+    print(f"  {'cached trees':<24} {time.perf_counter() - start:8.2f}s ({oracle.hits} of "
+          f"{oracle.hits + oracle.searches} rows answered without searching)")
+    assert (again == table).all()
+
+    hierarchy = ContractionHierarchy.load_or_build(graph, tempfile.mkdtemp(prefix="hierarchies-"))
+    start = time.perf_counter()
+    buckets = DistanceOracle(graph, hierarchy=hierarchy).many_to_many(sources, targets)
+    print(f"  {'buckets on a hierarchy':<24} {time.perf_counter() - start:8.2f}s")
+    assert (buckets == table).all()
+
+
+if __name__ == "__main__":
+    import sys
+
+    if "--benchmark" in sys.argv:
+        benchmark()
+        sys.exit()
+
+    graph = {
+        "A": [("B", 1), ("C", 4)],
+        "B": [("C", 2), ("D", 5)],
+        "C": [("D", 1)],
+        "D": []
+    }
+    oracle = DistanceOracle(graph)
+    print("Distances from A:", oracle.one_to_many("A", ["B", "C", "D"]))
+    print("Distance table:")
+    print(oracle.many_to_many(["A", "B", "C"], ["B", "C", "D"]))
+    print("A -> D:", oracle.shortest_path("A", "D"))
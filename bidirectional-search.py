@@ -1,91 +1,417 @@
+import argparse
+import heapq
+import random
+import time
+
 import networkx as nx
-import matplotlib.pyplot as plt
 from collections import deque
 
-def bidirectional_search(graph, start, goal):
+from graph_render import LAYOUT_DIRECTORY, cached_layout, draw_sizes, graph_edges, new_figure, show_or_save
+from graph_store import CSRGraph
+from search_stats import callbacks, record
+
+def reconstruct_path(forward_parent, backward_parent, meet):
+    """Join the forward path start -> meet and the backward path meet -> goal."""
+    path = []
+    node = meet
+    while node is not None:
+        path.append(node)
+        node = forward_parent[node]
+    path.reverse()
+    node = backward_parent[meet]
+    while node is not None:
+        path.append(node)
+        node = backward_parent[node]
+    return path
+
+def bidirectional_search(graph, start, goal, *, reverse_graph=None, stats=None):
+    """
+    Alternating breadth-first search from both ends. ``reverse_graph`` works
+    as in ``balanced_bidirectional_search``; ``stats`` receives "touched"
+    (nodes reached from either side) and the ``search_stats`` counters, with
+    "search" and "reconstruct" phases.
+    """
+    if isinstance(graph, CSRGraph):
+        path = bidirectional_search(graph.neighbor_view(), graph.node_id(start), graph.node_id(goal),
+                                    reverse_graph=graph.reverse().neighbor_view(), stats=stats)
+        return graph.labels_of(path) if path else None
     if start == goal:
         return [start]
-    
+    if reverse_graph is None:
+        reverse_graph = graph
+    started = time.perf_counter()
+    on_expand, on_push = callbacks(stats)
+
     forward_queue = deque([start])
     backward_queue = deque([goal])
     forward_visited = {start: None}
     backward_visited = {goal: None}
+    expanded = peak = 0
+    meet = None
 
-    def reconstruct_path(forward_visited, backward_visited, intersect):
-        path = []
-        node = intersect
-        while node is not None:
-            path.append(node)
-            node = forward_visited[node]
-        path.reverse()
-        node = backward_visited[intersect]
-        while node is not None:
-            path.append(node)
-            node = backward_visited[node]
-        return path
-
-    while forward_queue and backward_queue:
+    while forward_queue and backward_queue and meet is None:
+        if len(forward_queue) + len(backward_queue) > peak:
+            peak = len(forward_queue) + len(backward_queue)
         current_forward = forward_queue.popleft()
+        expanded += 1
+        if on_expand is not None:
+            on_expand(current_forward)
         for neighbor in graph[current_forward]:
             if neighbor not in forward_visited:
                 forward_visited[neighbor] = current_forward
                 forward_queue.append(neighbor)
+                if on_push is not None:
+                    on_push(neighbor, 0)
                 if neighbor in backward_visited:
-                    return reconstruct_path(forward_visited, backward_visited, neighbor)
-        
+                    meet = neighbor
+                    break
+        if meet is not None:
+            break
+
         current_backward = backward_queue.popleft()
-        for neighbor in graph[current_backward]:
+        expanded += 1
+        if on_expand is not None:
+            on_expand(current_backward)
+        for neighbor in reverse_graph[current_backward]:
             if neighbor not in backward_visited:
                 backward_visited[neighbor] = current_backward
                 backward_queue.append(neighbor)
+                if on_push is not None:
+                    on_push(neighbor, 1)
                 if neighbor in forward_visited:
-                    return reconstruct_path(forward_visited, backward_visited, neighbor)
-    
-    return None
+                    meet = neighbor
+                    break
+
+    searched = time.perf_counter()
+    path = reconstruct_path(forward_visited, backward_visited, meet) if meet is not None else None
+    if stats is not None:
+        stats["touched"] = len(forward_visited) + len(backward_visited)
+        record(stats, expanded, stats["touched"] - 2, 0, peak,
+               {"search": searched - started, "reconstruct": time.perf_counter() - searched})
+    return path
+
+def balanced_bidirectional_search(graph, start, goal, *, reverse_graph=None, stats=None):
+    """
+    Bidirectional BFS that always expands the smaller frontier, one whole level at a time.
+
+    On graphs with skewed branching (hubs) the side that is cheaper to grow
+    keeps growing, instead of both sides taking turns node by node. The
+    first meeting found is on a shortest path.
+
+    Args:
+        graph: Dict mapping each node to a list of neighbors, or a CSRGraph.
+        start: Start node.
+        goal: Goal node.
+        reverse_graph: Dict of predecessor lists for directed graphs
+            (default: ``graph``, i.e. undirected).
+        stats: Optional dict that receives "touched" (nodes reached from
+            either side) and "levels".
+
+    Returns:
+        The path as a list of nodes, or None if there is none.
+    """
+    if isinstance(graph, CSRGraph):
+        path = balanced_bidirectional_search(graph.neighbor_view(), graph.node_id(start), graph.node_id(goal),
+                                             reverse_graph=graph.reverse().neighbor_view(), stats=stats)
+        return graph.labels_of(path) if path else None
+    if start == goal:
+        return [start]
+    if reverse_graph is None:
+        reverse_graph = graph
+
+    forward_parent = {start: None}
+    backward_parent = {goal: None}
+    forward_frontier = [start]
+    backward_frontier = [goal]
+    meet = None
+    levels = 0
+
+    while forward_frontier and backward_frontier and meet is None:
+        levels += 1
+        if len(forward_frontier) <= len(backward_frontier):
+            frontier, adjacency, parent, other = forward_frontier, graph, forward_parent, backward_parent
+        else:
+            frontier, adjacency, parent, other = backward_frontier, reverse_graph, backward_parent, forward_parent
+        next_frontier = []
+        for node in frontier:
+            for neighbor in adjacency[node]:
+                if neighbor not in parent:
+                    parent[neighbor] = node
+                    if neighbor in other:
+                        meet = neighbor
+                        break
+                    next_frontier.append(neighbor)
+            if meet is not None:
+                break
+        if frontier is forward_frontier:
+            forward_frontier = next_frontier
+        else:
+            backward_frontier = next_frontier
+
+    if stats is not None:
+        stats["touched"] = len(forward_parent) + len(backward_parent)
+        stats["levels"] = levels
+    if meet is None:
+        return None
+    return reconstruct_path(forward_parent, backward_parent, meet)
+
+def bidirectional_dijkstra(graph, start, goal, *, reverse_graph=None, heuristic=None, stats=None):
+    """
+    Weighted bidirectional Dijkstra, or bidirectional A* when a heuristic is given.
+
+    Each step settles a node on the side with the smaller queue. The search
+    stops once the two smallest queue keys add up to at least the best
+    start -> goal cost seen so far, at which point that cost is optimal.
+
+    For A* both sides use the average potential
+    ``(heuristic(node, goal) - heuristic(start, node)) / 2``, which keeps the
+    same stopping rule valid as long as the heuristic is consistent.
+
+    Args:
+        graph: Dict mapping each node to a list of (neighbor, weight) tuples,
+            or a CSRGraph (the heuristic then gets node ids).
+        start: Start node.
+        goal: Goal node.
+        reverse_graph: Dict of (predecessor, weight) lists for directed graphs
+            (default: ``graph``, i.e. undirected).
+        heuristic: Optional function ``heuristic(a, b)`` giving a lower bound
+            on the cost from ``a`` to ``b``.
+        stats: Optional dict that receives "settled" and "touched".
+
+    Returns:
+        (cost, path), or (inf, None) if the goal is unreachable.
+    """
+    if isinstance(graph, CSRGraph):
+        cost, path = bidirectional_dijkstra(graph.weighted_view(), graph.node_id(start), graph.node_id(goal),
+                                            reverse_graph=graph.reverse().weighted_view(),
+                                            heuristic=heuristic, stats=stats)
+        return cost, graph.labels_of(path) if path else None
+    if reverse_graph is None:
+        reverse_graph = graph
+    inf = float("inf")
+    if heuristic is None:
+        def potential(node):
+            return 0
+    else:
+        def potential(node):
+            return (heuristic(node, goal) - heuristic(start, node)) / 2
+
+    adjacency = (graph, reverse_graph)
+    sign = (1, -1)
+    dist = ({start: 0}, {goal: 0})
+    parent = ({start: None}, {goal: None})
+    settled = (set(), set())
+    queues = ([(potential(start), start)], [(-potential(goal), goal)])
+    best, meet = (0, start) if start == goal else (inf, None)
 
-def visualize_graph(graph, path):
+    while queues[0] and queues[1] and queues[0][0][0] + queues[1][0][0] < best:
+        side = 0 if len(queues[0]) <= len(queues[1]) else 1
+        queue, done = queues[side], settled[side]
+        _, node = heapq.heappop(queue)
+        if node in done:
+            continue
+        done.add(node)
+        own, other, parents = dist[side], dist[1 - side], parent[side]
+        cost = own[node]
+        for neighbor, weight in adjacency[side][node]:
+            new_cost = cost + weight
+            if new_cost < own.get(neighbor, inf):
+                own[neighbor] = new_cost
+                parents[neighbor] = node
+                heapq.heappush(queue, (new_cost + sign[side] * potential(neighbor), neighbor))
+                if neighbor in other and new_cost + other[neighbor] < best:
+                    best, meet = new_cost + other[neighbor], neighbor
+
+    if stats is not None:
+        stats["settled"] = len(settled[0]) + len(settled[1])
+        stats["touched"] = len(dist[0]) + len(dist[1])
+    if meet is None:
+        return inf, None
+    return best, reconstruct_path(parent[0], parent[1], meet)
+
+def visualize_graph(graph, path, hops=None, output=None, layout="auto", layout_directory=LAYOUT_DIRECTORY):
+    """
+    Draw the graph with the path highlighted.
+
+    Args:
+        graph: Adjacency dict or CSRGraph.
+        path: Path to highlight (may be None).
+        hops: If set, draw only the nodes within this many hops of the path.
+        output: Image file to write (headless, Agg) instead of showing a window.
+        layout: "spring", "fast" or "auto" (see ``cached_layout``).
+        layout_directory: Where layouts are cached; None to disable caching.
+    """
+    nodes, edges = graph_edges(graph, path, hops)
     G = nx.Graph()
-    for node, neighbors in graph.items():
-        for neighbor in neighbors:
-            G.add_edge(node, neighbor)
+    G.add_nodes_from(nodes)
+    G.add_edges_from((u, v) for u, v, _ in edges)
 
-    pos = nx.spring_layout(G)
-    plt.figure(figsize=(10, 7))
+    pos = cached_layout(G, layout, layout_directory)
+    fig, ax = new_figure(output, figsize=(10, 7))
+    node_size, labels = draw_sizes(G)
 
     # Draw the graph
-    nx.draw_networkx_nodes(G, pos, node_size=700, node_color='lightblue')
-    nx.draw_networkx_edges(G, pos, edge_color='gray')
-    nx.draw_networkx_labels(G, pos, font_size=12, font_weight='bold')
+    nx.draw_networkx_nodes(G, pos, node_size=node_size, node_color='lightblue', ax=ax)
+    nx.draw_networkx_edges(G, pos, edge_color='gray', ax=ax)
+    if labels:
+        nx.draw_networkx_labels(G, pos, font_size=12, font_weight='bold', ax=ax)
 
     # Highlight the shortest path
     if path:
         path_edges = list(zip(path, path[1:]))
-        nx.draw_networkx_edges(G, pos, edgelist=path_edges, edge_color='red', width=2)
-        nx.draw_networkx_nodes(G, pos, nodelist=path, node_color='orange', node_size=700)
-
-    plt.title("Graph with Shortest Path using Bidirectional Search", fontsize=14)
-    plt.show()
-
-# Example Graph
-graph = {
-    'A': ['B', 'C'],
-    'B': ['A', 'D'],
-    'C': ['A', 'D'],
-    'D': ['B', 'C', 'E'],
-    'E': ['D', 'F'],
-    'F': ['E', 'G', 'H'],
-    'G': ['F', 'I'],
-    'H': ['F', 'I'],
-    'I': ['H', 'G']
-}
-
-start = 'A'
-goal = 'I'
-path = bidirectional_search(graph, start, goal)
-
-if path:
-    print("Shortest Path:", " -> ".join(path))
-else:
-    print("No path exists between the nodes.")
-
-visualize_graph(graph, path)
+        nx.draw_networkx_edges(G, pos, edgelist=path_edges, edge_color='red', width=2, ax=ax)
+        nx.draw_networkx_nodes(G, pos, nodelist=path, node_color='orange', node_size=node_size, ax=ax)
+
+    ax.set_title("Graph with Shortest Path using Bidirectional Search", fontsize=14)
+    show_or_save(fig, output)
+
+def random_graph(n, average_degree, seed=0):
+    """Undirected Erdos-Renyi style graph as adjacency lists over ints."""
+    rng = random.Random(seed)
+    graph = {node: [] for node in range(n)}
+    for _ in range(n * average_degree // 2):
+        u, v = rng.randrange(n), rng.randrange(n)
+        if u != v:
+            graph[u].append(v)
+            graph[v].append(u)
+    return graph
+
+def scale_free_graph(n, edges_per_node=2, seed=0):
+    """Undirected Barabasi-Albert graph (a few hubs, many leaves) as adjacency lists."""
+    G = nx.barabasi_albert_graph(n, edges_per_node, seed=seed)
+    return {node: list(G.adj[node]) for node in G}
+
+def add_weights(graph, max_weight=10, seed=0):
+    """Symmetric random integer weights for an undirected adjacency-list graph."""
+    rng = random.Random(seed)
+    weights = {}
+    weighted = {}
+    for node, neighbors in graph.items():
+        edges = weighted[node] = []
+        for neighbor in neighbors:
+            key = (node, neighbor) if node < neighbor else (neighbor, node)
+            if key not in weights:
+                weights[key] = rng.randint(1, max_weight)
+            edges.append((neighbor, weights[key]))
+    return weighted
+
+def weighted_grid(size, max_weight=5, seed=0):
+    """4-connected grid with random weights >= 1, so Manhattan distance is a consistent heuristic."""
+    rng = random.Random(seed)
+    graph = {(x, y): [] for x in range(size) for y in range(size)}
+    for x in range(size):
+        for y in range(size):
+            for nx_, ny in ((x + 1, y), (x, y + 1)):
+                if nx_ < size and ny < size:
+                    weight = rng.randint(1, max_weight)
+                    graph[(x, y)].append(((nx_, ny), weight))
+                    graph[(nx_, ny)].append(((x, y), weight))
+    return graph
+
+def manhattan(a, b):
+    return abs(a[0] - b[0]) + abs(a[1] - b[1])
+
+def benchmark_bidirectional(n=200_000, queries=50, grid_size=300, seed=0):
+    """
+    Nodes touched and wall time of the balanced engine against
+    ``bidirectional_search`` on large random and scale-free graphs, and of
+    bidirectional Dijkstra/A* on the weighted versions.
+    """
+    rng = random.Random(seed + 1)  # not the generators' stream, or queries would follow edges
+    graphs = [
+        (f"random (n={n:,}, avg degree 4)", random_graph(n, 4, seed)),
+        (f"scale-free (n={n:,}, m=2)", scale_free_graph(n, 2, seed)),
+    ]
+    hubs = sorted(graphs[1][1], key=lambda node: len(graphs[1][1][node]), reverse=True)[:queries]
+    leaves = [node for node in graphs[1][1] if len(graphs[1][1][node]) <= 2]
+    cases = [(label, graph, [(rng.randrange(n), rng.randrange(n)) for _ in range(queries)]) for label, graph in graphs]
+    # Skewed: one end is a hub, the other a leaf far out in the graph
+    cases.append(("scale-free, hub -> leaf queries", graphs[1][1], [(hub, rng.choice(leaves)) for hub in hubs]))
+    for label, graph, pairs in cases:
+        print(label)
+        for name, search in (("bidirectional_search", bidirectional_search),
+                             ("balanced_bidirectional_search", balanced_bidirectional_search)):
+            touched = hops = 0
+            start_time = time.perf_counter()
+            for start, goal in pairs:
+                stats = {}
+                path = search(graph, start, goal, stats=stats)
+                touched += stats["touched"]
+                hops += len(path) - 1 if path else 0
+            elapsed = time.perf_counter() - start_time
+            print(f"  {name:<30} {1000 * elapsed / queries:8.2f} ms/query, "
+                  f"{touched / queries:>10,.0f} nodes touched/query, total hops {hops}")
+
+        weighted = add_weights(graph, seed=seed)
+        settled = 0
+        start_time = time.perf_counter()
+        costs = []
+        for start, goal in pairs:
+            stats = {}
+            costs.append(bidirectional_dijkstra(weighted, start, goal, stats=stats)[0])
+            settled += stats["settled"]
+        elapsed = time.perf_counter() - start_time
+        print(f"  {'bidirectional_dijkstra':<30} {1000 * elapsed / queries:8.2f} ms/query, "
+              f"{settled / queries:>10,.0f} nodes settled/query")
+        # Cross-check the costs against networkx
+        G = nx.Graph((u, v, {"weight": w}) for u, edges in weighted.items() for v, w in edges)
+        for (start, goal), cost in zip(pairs[:10], costs):
+            try:
+                expected = nx.bidirectional_dijkstra(G, start, goal)[0]
+            except (nx.NetworkXNoPath, nx.NodeNotFound):
+                expected = float("inf")
+            assert cost == expected, (start, goal, cost, expected)
+
+    grid = weighted_grid(grid_size, seed=seed)
+    cells = list(grid)
+    pairs = [(rng.choice(cells), rng.choice(cells)) for _ in range(queries)]
+    print(f"weighted grid {grid_size}x{grid_size}")
+    for name, heuristic in (("bidirectional Dijkstra", None), ("bidirectional A*", manhattan)):
+        settled = 0
+        start_time = time.perf_counter()
+        costs = []
+        for start, goal in pairs:
+            stats = {}
+            costs.append(bidirectional_dijkstra(grid, start, goal, heuristic=heuristic, stats=stats)[0])
+            settled += stats["settled"]
+        elapsed = time.perf_counter() - start_time
+        print(f"  {name:<30} {1000 * elapsed / queries:8.2f} ms/query, "
+              f"{settled / queries:>10,.0f} nodes settled/query")
+        if heuristic is None:
+            reference = costs
+        else:
+            assert costs == reference
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bidirectional search")
+    parser.add_argument("--benchmark", action="store_true", help="compare the search engines on large random and scale-free graphs")
+    parser.add_argument("--output", help="write the picture to this image file instead of opening a window")
+    parser.add_argument("--hops", type=int, help="only draw nodes within this many hops of the path")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark_bidirectional()
+    else:
+        # Example Graph
+        graph = {
+            'A': ['B', 'C'],
+            'B': ['A', 'D'],
+            'C': ['A', 'D'],
+            'D': ['B', 'C', 'E'],
+            'E': ['D', 'F'],
+            'F': ['E', 'G', 'H'],
+            'G': ['F', 'I'],
+            'H': ['F', 'I'],
+            'I': ['H', 'G']
+        }
+
+        start = 'A'
+        goal = 'I'
+        path = bidirectional_search(graph, start, goal)
+
+        if path:
+            print("Shortest Path:", " -> ".join(path))
+        else:
+            print("No path exists between the nodes.")
+
+        visualize_graph(graph, path, hops=args.hops, output=args.output)
@@ -0,0 +1,378 @@
+import heapq
+import os
+
+import numpy as np
+
+from graph_store import CSRGraph, id_adjacency, node_index
+from landmarks import graph_fingerprint
+
+HIERARCHY_DIRECTORY = "hierarchies"
+
+
+def _to_csr(adjacency):
+    """indptr, indices, weights arrays for a list of [(id, weight), ...] lists."""
+    indptr = np.zeros(len(adjacency) + 1, dtype=np.int64)
+    np.cumsum([len(edges) for edges in adjacency], out=indptr[1:])
+    indices = np.array([v for edges in adjacency for v, _ in edges], dtype=np.int64)
+    weights = np.array([w for edges in adjacency for _, w in edges])
+    return indptr, indices, weights
+
+
+def _from_csr(indptr, indices, weights):
+    indices, weights = indices.tolist(), weights.tolist()
+    bounds = indptr.tolist()
+    return [list(zip(indices[bounds[u]:bounds[u + 1]], weights[bounds[u]:bounds[u + 1]]))
+            for u in range(len(bounds) - 1)]
+
+
+class _Contraction:
+    """Remaining (uncontracted) graph while the hierarchy is built."""
+
+    def __init__(self, forward, settle_limit):
+        self.out = [{} for _ in forward]
+        self.inn = [{} for _ in forward]
+        for u, edges in enumerate(forward):
+            for v, w in edges:
+                if u != v and w < self.out[u].get(v, float("inf")):
+                    self.out[u][v] = w
+                    self.inn[v][u] = w
+        self.middle = {}  # (u, v) -> contracted node a shortcut u -> v skips
+        self.deleted = [0] * len(forward)  # contracted neighbors, spreads contraction evenly
+        self.settle_limit = settle_limit
+
+    def _witnesses(self, source, skip, limit, targets):
+        """
+        Distances from ``source`` avoiding ``skip``, stopping past ``limit``,
+        once every node in ``targets`` is settled, or after settle_limit nodes.
+        """
+        dist = {source: 0}
+        pq = [(0, source)]
+        settled = 0
+        unsettled = len(targets)
+        out = self.out
+        while pq and settled < self.settle_limit:
+            d, u = heapq.heappop(pq)
+            if d > dist[u]:
+                continue
+            if d > limit:
+                break
+            settled += 1
+            if u in targets:
+                unsettled -= 1
+                if not unsettled:
+                    break
+            for v, w in out[u].items():
+                nd = d + w
+                if v != skip and nd < dist.get(v, float("inf")):
+                    dist[v] = nd
+                    heapq.heappush(pq, (nd, v))
+        return dist
+
+    def shortcuts(self, v):
+        """(u, w, cost) shortcuts needed to contract ``v``: u -> v -> w paths with no witness as short."""
+        out_edges = self.out[v]
+        shortcuts = []
+        if not out_edges:
+            return shortcuts
+        longest = max(out_edges.values())
+        for u, in_weight in self.inn[v].items():
+            dist = self._witnesses(u, v, in_weight + longest, out_edges)
+            for w, out_weight in out_edges.items():
+                if w != u and dist.get(w, float("inf")) > in_weight + out_weight:
+                    shortcuts.append((u, w, in_weight + out_weight))
+        return shortcuts
+
+    def priority(self, v):
+        """Edge difference plus contracted neighbors: cheap nodes with few shortcuts go first."""
+        return 2 * (len(self.shortcuts(v)) - len(self.out[v]) - len(self.inn[v])) + self.deleted[v]
+
+    def contract(self, v):
+        """Remove ``v``, adding its shortcuts; returns its remaining out- and in-edges (all to higher ranks)."""
+        for u, w, cost in self.shortcuts(v):
+            if cost < self.out[u].get(w, float("inf")):
+                self.out[u][w] = cost
+                self.inn[w][u] = cost
+                self.middle[u, w] = v
+        up_out, up_in = list(self.out[v].items()), list(self.inn[v].items())
+        for w in self.out[v]:
+            del self.inn[w][v]
+            self.deleted[w] += 1
+        for u in self.inn[v]:
+            del self.out[u][v]
+            self.deleted[u] += 1
+        self.out[v], self.inn[v] = {}, {}
+        return up_out, up_in
+
+
+class ContractionHierarchy:
+    """
+    Contraction hierarchy for fast point-to-point shortest paths on a static
+    weighted graph.
+
+    Nodes are contracted one at a time in order of importance; a shortcut
+    u -> w replaces u -> v -> w whenever that is the only shortest path
+    through the contracted node v. A query is then a bidirectional Dijkstra
+    that only climbs to higher-ranked nodes, settling a few hundred nodes
+    instead of a large part of the graph.
+
+    ``up_out[u]`` holds the edges u -> v and ``up_in[u]`` the edges v -> u
+    (stored as (v, weight)) with rank[v] > rank[u]; ``middle`` maps each
+    shortcut to the node it skips, for unpacking paths.
+    """
+
+    def __init__(self, graph, rank, up_out, up_in, middle):
+        self.graph = graph
+        self.nodes, self.index = node_index(graph)
+        self.rank = rank
+        self.up_out = up_out
+        self.up_in = up_in
+        self.middle = middle
+
+    @classmethod
+    def build(cls, graph, settle_limit=50):
+        """
+        Contract every node of ``graph``, a weighted adjacency dict
+        (node -> [(neighbor, weight), ...]) or a CSRGraph.
+
+        Args:
+            settle_limit: Nodes a witness search may settle before giving up
+                and adding the shortcut anyway (never wrong, just larger).
+        """
+        if isinstance(graph, CSRGraph):
+            view = graph.weighted_view()
+            forward = [view[u] for u in range(graph.num_nodes)]
+        else:
+            forward = id_adjacency(graph)[2]
+        n = len(forward)
+        remaining = _Contraction(forward, settle_limit)
+
+        pq = [(remaining.priority(v), v) for v in range(n)]
+        heapq.heapify(pq)
+        rank = [-1] * n
+        up_out, up_in = [None] * n, [None] * n
+        order = 0
+        while pq:
+            _, v = heapq.heappop(pq)
+            # Lazy updates: priorities go stale as neighbors are contracted, so
+            # recheck the top node instead of updating every neighbor each time
+            current = remaining.priority(v)
+            if pq and current > pq[0][0]:
+                heapq.heappush(pq, (current, v))
+                continue
+            up_out[v], up_in[v] = remaining.contract(v)
+            rank[v] = order
+            order += 1
+
+        return cls(graph, rank, up_out, up_in, remaining.middle)
+
+    @property
+    def num_shortcuts(self):
+        return len(self.middle)
+
+    def save(self, path, fingerprint=None):
+        out_indptr, out_indices, out_weights = _to_csr(self.up_out)
+        in_indptr, in_indices, in_weights = _to_csr(self.up_in)
+        shortcuts = np.array([(u, w, v) for (u, w), v in self.middle.items()], dtype=np.int64).reshape(-1, 3)
+        np.savez(path, rank=np.array(self.rank, dtype=np.int64),
+                 out_indptr=out_indptr, out_indices=out_indices, out_weights=out_weights,
+                 in_indptr=in_indptr, in_indices=in_indices, in_weights=in_weights, shortcuts=shortcuts,
+                 fingerprint=np.array(fingerprint or graph_fingerprint(self.graph)))
+
+    @classmethod
+    def load(cls, graph, path, fingerprint=None):
+        """Load a saved hierarchy for ``graph``; ValueError if it was built for a different graph."""
+        with np.load(path) as data:
+            if str(data["fingerprint"]) != (fingerprint or graph_fingerprint(graph)):
+                raise ValueError(f"{path} was built for a different graph")
+            up_out = _from_csr(data["out_indptr"], data["out_indices"], data["out_weights"])
+            up_in = _from_csr(data["in_indptr"], data["in_indices"], data["in_weights"])
+            middle = {(u, w): v for u, w, v in data["shortcuts"].tolist()}
+            return cls(graph, data["rank"].tolist(), up_out, up_in, middle)
+
+    @classmethod
+    def load_or_build(cls, graph, directory=HIERARCHY_DIRECTORY, settle_limit=50):
+        """Reuse the hierarchy saved under ``directory`` for this graph, building it if missing."""
+        fingerprint = graph_fingerprint(graph)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{fingerprint}.npz")
+        if os.path.exists(path):
+            return cls.load(graph, path, fingerprint)
+        hierarchy = cls.build(graph, settle_limit)
+        hierarchy.save(path, fingerprint)
+        return hierarchy
+
+    def _id(self, node):
+        return self.graph.node_id(node) if self.index is None else self.index[node]
+
+    def upward_search(self, node, backward=False):
+        """
+        Complete upward Dijkstra from node id ``node`` (towards it with
+        ``backward``), with stall-on-demand.
+
+        Returns:
+            (nodes, distances) of the settled nodes that were not stalled.
+            Each distance is the shortest one using only upward edges, an
+            upper bound on the true graph distance. It is exact at the
+            highest node of some shortest path, which is why callers such as
+            ``bucket_distance_table`` take the minimum over all meeting nodes.
+        """
+        up, down = (self.up_in, self.up_out) if backward else (self.up_out, self.up_in)
+        dist = {node: 0}
+        pq = [(0, node)]
+        nodes, distances = [], []
+        while pq:
+            d, u = heapq.heappop(pq)
+            if d > dist[u]:
+                continue
+            for v, w in down[u]:
+                if v in dist and dist[v] + w < d:
+                    break
+            else:
+                nodes.append(u)
+                distances.append(d)
+                for v, w in up[u]:
+                    nd = d + w
+                    if nd < dist.get(v, float("inf")):
+                        dist[v] = nd
+                        heapq.heappush(pq, (nd, v))
+        return nodes, distances
+
+    def query_ids(self, source, target):
+        """
+        Bidirectional upward Dijkstra between node ids.
+
+        Returns:
+            (cost, path) with the path as node ids, unpacked through every
+            shortcut; (inf, []) if ``target`` cannot be reached.
+        """
+        if source == target:
+            return 0, [source]
+        dist = ({source: 0}, {target: 0})
+        parent = ({source: -1}, {target: -1})
+        queues = ([(0, source)], [(0, target)])
+        up = (self.up_out, self.up_in)
+        best, meeting = float("inf"), -1
+
+        while queues[0] or queues[1]:
+            if queues[0] and (not queues[1] or queues[0][0][0] <= queues[1][0][0]):
+                side = 0
+            else:
+                side = 1
+            queue = queues[side]
+            d, u = heapq.heappop(queue)
+            if d >= best:
+                # Nothing left on this side can improve on the best meeting point
+                queue.clear()
+                continue
+            own, other = dist[side], dist[1 - side]
+            if d > own[u]:
+                continue
+            if u in other and d + other[u] < best:
+                best, meeting = d + other[u], u
+            # Stall on demand: if a higher node reaches u more cheaply, u's
+            # upward edges cannot lie on a shortest path
+            for v, w in up[1 - side][u]:
+                if v in own and own[v] + w < d:
+                    break
+            else:
+                for v, w in up[side][u]:
+                    nd = d + w
+                    if nd < own.get(v, float("inf")):
+                        own[v] = nd
+                        parent[side][v] = u
+                        heapq.heappush(queue, (nd, v))
+
+        if meeting < 0:
+            return float("inf"), []
+        forward = [meeting]
+        while parent[0][forward[-1]] >= 0:
+            forward.append(parent[0][forward[-1]])
+        forward.reverse()
+        backward = [meeting]
+        while parent[1][backward[-1]] >= 0:
+            backward.append(parent[1][backward[-1]])
+        return best, self._unpack(forward + backward[1:])
+
+    def _unpack(self, path):
+        """Replace every shortcut on ``path`` by the edges it stands for."""
+        middle = self.middle
+        unpacked = [path[0]]
+        stack = [(u, v) for u, v in zip(reversed(path[:-1]), reversed(path[1:]))]
+        while stack:
+            u, v = stack.pop()
+            m = middle.get((u, v))
+            if m is None:
+                unpacked.append(v)
+            else:
+                stack.append((m, v))
+                stack.append((u, m))
+        return unpacked
+
+    def query(self, start, goal):
+        """
+        Shortest path between two nodes (labels for a CSRGraph).
+
+        Returns:
+            (cost, path): the same cost as ``uniform_cost_search`` but the
+            shortest path itself rather than the explored nodes.
+        """
+        cost, path = self.query_ids(self._id(start), self._id(goal))
+        if self.index is None:
+            return cost, self.graph.labels_of(path)
+        return cost, [self.nodes[node] for node in path]
+
+
+def benchmark(size=100, queries=1000, dijkstra_queries=20, seed=0):
+    """Preprocessing time and query throughput of the hierarchy against plain Dijkstra."""
+    import random
+    import tempfile
+    import time
+
+    from indexed_heap import indexed_best_first_search
+    from landmarks import grid_graph
+
+    graph = grid_graph(size, seed=seed)
+    adjacency = graph.weighted_view()
+    rng = random.Random(seed + 1)
+    pairs = [(rng.randrange(graph.num_nodes), rng.randrange(graph.num_nodes)) for _ in range(queries)]
+    print(f"Weighted grid: {graph.num_nodes:,} nodes, {graph.num_edges:,} edges")
+
+    directory = tempfile.mkdtemp(prefix="hierarchies-")
+    start = time.perf_counter()
+    hierarchy = ContractionHierarchy.load_or_build(graph, directory)
+    built = time.perf_counter() - start
+    start = time.perf_counter()
+    hierarchy = ContractionHierarchy.load_or_build(graph, directory)
+    loaded = time.perf_counter() - start
+    size_mb = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory)) / 2 ** 20
+    print(f"  built in {built:.1f}s with {hierarchy.num_shortcuts:,} shortcuts, "
+          f"{size_mb:.1f} MB on disk, reloaded in {1000 * loaded:.0f}ms")
+
+    start = time.perf_counter()
+    expected = [indexed_best_first_search(adjacency, s, t)[0] for s, t in pairs[:dijkstra_queries]]
+    dijkstra = (time.perf_counter() - start) / dijkstra_queries
+
+    start = time.perf_counter()
+    costs = [hierarchy.query_ids(s, t)[0] for s, t in pairs]
+    ch = (time.perf_counter() - start) / queries
+    assert costs[:dijkstra_queries] == expected
+    print(f"  Dijkstra:            {1000 * dijkstra:8.3f} ms/query, {1 / dijkstra:9,.0f} queries/s")
+    print(f"  Contraction queries: {1000 * ch:8.3f} ms/query, {1 / ch:9,.0f} queries/s ({dijkstra / ch:,.0f}x)")
+
+
+if __name__ == "__main__":
+    import sys
+
+    if "--benchmark" in sys.argv:
+        benchmark()
+        sys.exit()
+
+    graph = {
+        "A": [("B", 1), ("C", 4)],
+        "B": [("C", 2), ("D", 5)],
+        "C": [("D", 1)],
+        "D": []
+    }
+    hierarchy = ContractionHierarchy.build(graph)
+    print("Contraction order:", sorted(graph, key=lambda node: hierarchy.rank[hierarchy.index[node]]))
+    print("A -> D:", hierarchy.query("A", "D"))
@@ -2,6 +2,9 @@ import matplotlib.pyplot as plt
 from matplotlib.widgets import Button
 import numpy as np
 import heapq
+import time
+
+from search_stats import callbacks, record
 
 # Directions for movement (up, down, left, right)
 DIRECTIONS = [(-1, 0), (1, 0), (0, -1), (0, 1)]
@@ -10,15 +13,28 @@ def heuristic(a, b):
     """Heuristic function for A* (Manhattan Distance)."""
     return abs(a[0] - b[0]) + abs(a[1] - b[1])
 
-def bfs(grid, start, goal):
-    """Breadth-First Search algorithm."""
+def bfs(grid, start, goal, stats=None):
+    """
+    Breadth-First Search algorithm.
+
+    ``stats`` (a dict or SearchStats) receives the ``search_stats`` counters
+    with "search" and "reconstruct" phases.
+    """
+    started = time.perf_counter()
+    on_expand, on_push = callbacks(stats)
     queue = [start]
     visited = set()
     visited.add(start)
     parent = {start: None}
+    expanded = peak = 0
     
     while queue:
+        if len(queue) > peak:
+            peak = len(queue)
         current = queue.pop(0)
+        expanded += 1
+        if on_expand is not None:
+            on_expand(current)
         if current == goal:
             break
         for dx, dy in DIRECTIONS:
@@ -28,17 +44,27 @@ def bfs(grid, start, goal):
                     queue.append(neighbor)
                     visited.add(neighbor)
                     parent[neighbor] = current
-    return reconstruct_path(parent, goal)
-
-def dfs(grid, start, goal):
-    """Depth-First Search algorithm."""
+                    if on_push is not None:
+                        on_push(neighbor, None)
+    return _finish(stats, parent, goal, expanded, len(visited), 0, peak, started)
+
+def dfs(grid, start, goal, stats=None):
+    """Depth-First Search algorithm; ``stats`` works as in ``bfs``."""
+    started = time.perf_counter()
+    on_expand, on_push = callbacks(stats)
     stack = [start]
     visited = set()
     visited.add(start)
     parent = {start: None}
+    expanded = peak = 0
     
     while stack:
+        if len(stack) > peak:
+            peak = len(stack)
         current = stack.pop()
+        expanded += 1
+        if on_expand is not None:
+            on_expand(current)
         if current == goal:
             break
         for dx, dy in DIRECTIONS:
@@ -48,18 +74,34 @@ def dfs(grid, start, goal):
                     stack.append(neighbor)
                     visited.add(neighbor)
                     parent[neighbor] = current
-    return reconstruct_path(parent, goal)
-
-def a_star(grid, start, goal):
-    """A* Search algorithm."""
+                    if on_push is not None:
+                        on_push(neighbor, None)
+    return _finish(stats, parent, goal, expanded, len(visited), 0, peak, started)
+
+def a_star(grid, start, goal, stats=None):
+    """
+    A* Search algorithm; ``stats`` works as in ``bfs``. There is no closed
+    set, so "reopened" counts stale queue entries that are expanded again.
+    """
+    started = time.perf_counter()
+    on_expand, on_push = callbacks(stats)
     open_set = []
     heapq.heappush(open_set, (0, start))
     parent = {start: None}
     g_score = {start: 0}
     f_score = {start: heuristic(start, goal)}
+    expanded = peak = reopened = 0
+    pushed = 1
     
     while open_set:
-        _, current = heapq.heappop(open_set)
+        if len(open_set) > peak:
+            peak = len(open_set)
+        f, current = heapq.heappop(open_set)
+        expanded += 1
+        if f > f_score[current]:
+            reopened += 1
+        if on_expand is not None:
+            on_expand(current)
         if current == goal:
             break
         for dx, dy in DIRECTIONS:
@@ -71,7 +113,19 @@ def a_star(grid, start, goal):
                     g_score[neighbor] = tentative_g_score
                     f_score[neighbor] = g_score[neighbor] + heuristic(neighbor, goal)
                     heapq.heappush(open_set, (f_score[neighbor], neighbor))
-    return reconstruct_path(parent, goal)
+                    pushed += 1
+                    if on_push is not None:
+                        on_push(neighbor, f_score[neighbor])
+    return _finish(stats, parent, goal, expanded, pushed, reopened, peak, started)
+
+def _finish(stats, parent, goal, expanded, pushed, reopened, peak, started):
+    """Reconstruct the path, timing it and recording the run into ``stats``."""
+    searched = time.perf_counter()
+    path = reconstruct_path(parent, goal)
+    if stats is not None:
+        record(stats, expanded, pushed, reopened, peak,
+               {"search": searched - started, "reconstruct": time.perf_counter() - searched})
+    return path
 
 def reconstruct_path(parent, goal):
     """Reconstructs the path from the goal using the parent dictionary."""
@@ -97,44 +151,46 @@ def visualize(grid, path, ax, title):
     ax.set_title(title)
     plt.draw()
 
-# Grid and Start/Goal points
-grid = [
-    [0, 0, 0, 1, 0],
-    [1, 1, 0, 1, 0],
-    [0, 0, 0, 0, 0],
-    [0, 1, 1, 1, 1],
-    [0, 0, 0, 0, 0],
-]
-start = (0, 0)
-goal = (4, 4)
-
-# Interactive Visualization
-fig, ax = plt.subplots(figsize=(6, 6))
-plt.subplots_adjust(bottom=0.2)
-
-def run_bfs(event):
-    path = bfs(grid, start, goal)
-    visualize(grid, path, ax, "BFS Path")
-
-def run_dfs(event):
-    path = dfs(grid, start, goal)
-    visualize(grid, path, ax, "DFS Path")
-
-def run_a_star(event):
-    path = a_star(grid, start, goal)
-    visualize(grid, path, ax, "A* Path")
-
-# Buttons
-ax_bfs = plt.axes([0.1, 0.05, 0.2, 0.075])
-ax_dfs = plt.axes([0.4, 0.05, 0.2, 0.075])
-ax_a_star = plt.axes([0.7, 0.05, 0.2, 0.075])
-
-btn_bfs = Button(ax_bfs, 'BFS')
-btn_dfs = Button(ax_dfs, 'DFS')
-btn_a_star = Button(ax_a_star, 'A*')
-
-btn_bfs.on_clicked(run_bfs)
-btn_dfs.on_clicked(run_dfs)
-btn_a_star.on_clicked(run_a_star)
-
-plt.show()
+# Example usage
+if __name__ == "__main__":
+    # Grid and Start/Goal points
+    grid = [
+        [0, 0, 0, 1, 0],
+        [1, 1, 0, 1, 0],
+        [0, 0, 0, 0, 0],
+        [0, 1, 1, 1, 1],
+        [0, 0, 0, 0, 0],
+    ]
+    start = (0, 0)
+    goal = (4, 4)
+
+    # Interactive Visualization
+    fig, ax = plt.subplots(figsize=(6, 6))
+    plt.subplots_adjust(bottom=0.2)
+
+    def run_bfs(event):
+        path = bfs(grid, start, goal)
+        visualize(grid, path, ax, "BFS Path")
+
+    def run_dfs(event):
+        path = dfs(grid, start, goal)
+        visualize(grid, path, ax, "DFS Path")
+
+    def run_a_star(event):
+        path = a_star(grid, start, goal)
+        visualize(grid, path, ax, "A* Path")
+
+    # Buttons
+    ax_bfs = plt.axes([0.1, 0.05, 0.2, 0.075])
+    ax_dfs = plt.axes([0.4, 0.05, 0.2, 0.075])
+    ax_a_star = plt.axes([0.7, 0.05, 0.2, 0.075])
+
+    btn_bfs = Button(ax_bfs, 'BFS')
+    btn_dfs = Button(ax_dfs, 'DFS')
+    btn_a_star = Button(ax_a_star, 'A*')
+
+    btn_bfs.on_clicked(run_bfs)
+    btn_dfs.on_clicked(run_dfs)
+    btn_a_star.on_clicked(run_a_star)
+
+    plt.show()
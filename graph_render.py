@@ -0,0 +1,223 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+import networkx as nx
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from graph_store import CSRGraph
+
+LAYOUT_DIRECTORY = "layouts"
+# Above this many nodes "auto" uses fast_layout; networkx's spring layout
+# also switches to its scipy-based sparse solver there
+FAST_LAYOUT_THRESHOLD = 500
+LABEL_LIMIT = 100  # above this many nodes, draw small unlabeled nodes
+
+
+def _weighted_neighbors(graph):
+    """node -> [(neighbor, weight or None)] for adjacency dicts, or for CSRGraph node ids."""
+    if isinstance(graph, CSRGraph):
+        view = graph.weighted_view()
+        if graph.weights is None:
+            return lambda node: [(neighbor, None) for neighbor, _ in view[node]]
+        return view.__getitem__
+
+    def neighbors(node):
+        return [edge if isinstance(edge, tuple) else (edge, None) for edge in graph.get(node, ())]
+    return neighbors
+
+
+def graph_edges(graph, path=None, hops=None):
+    """
+    The nodes and (u, v, weight) edges to draw: the whole graph, or with
+    ``hops`` only the nodes within that many out-edges of a path node and
+    the edges among them. Weights are None for unweighted graphs.
+    """
+    neighbors = _weighted_neighbors(graph)
+    csr = isinstance(graph, CSRGraph)
+    if hops is None or not path:
+        nodes = list(range(graph.num_nodes)) if csr else list(graph)
+        seen = None
+    else:
+        frontier = [graph.node_id(node) for node in path] if csr else list(path)
+        seen = set(frontier)
+        for _ in range(hops):
+            next_frontier = []
+            for node in frontier:
+                for neighbor, _ in neighbors(node):
+                    if neighbor not in seen:
+                        seen.add(neighbor)
+                        next_frontier.append(neighbor)
+            frontier = next_frontier
+        nodes = list(seen)
+
+    edges = [(u, v, w) for u in nodes for v, w in neighbors(u) if seen is None or v in seen]
+    if csr:
+        label = graph.label
+        return [label(node) for node in nodes], [(label(u), label(v), w) for u, v, w in edges]
+    return nodes, edges
+
+
+def graph_fingerprint(G):
+    """Hash of a networkx graph's nodes and edges, independent of insertion order."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr(G.is_directed()).encode())
+    for node in sorted(map(repr, G.nodes)):
+        digest.update(node.encode() + b"\0")
+    if G.is_directed():
+        edges = sorted(f"{u!r}\0{v!r}" for u, v in G.edges)
+    else:
+        edges = sorted("\0".join(sorted((repr(u), repr(v)))) for u, v in G.edges)
+    for edge in edges:
+        digest.update(edge.encode() + b"\1")
+    return digest.hexdigest()
+
+
+def fast_layout(G, seed=0, iterations=50, samples=16):
+    """
+    Approximate force-directed layout in O((V * samples + E) * iterations).
+
+    Springs pull along the edges as in Fruchterman-Reingold, but every node is
+    only pushed away from a random sample of other nodes (scaled up to stand
+    for all of them) instead of from every node.
+    """
+    nodes = list(G)
+    n = len(nodes)
+    if n == 0:
+        return {}
+    index = {node: i for i, node in enumerate(nodes)}
+    edges = np.array([(index[u], index[v]) for u, v in G.edges if u != v], dtype=np.int64).reshape(-1, 2)
+    rng = np.random.default_rng(seed)
+    pos = rng.random((n, 2))
+    k = 1 / np.sqrt(n)  # ideal edge length
+
+    for step in range(iterations):
+        temperature = 0.1 * (1 - step / iterations)
+        other = rng.integers(0, n, (n, samples))
+        delta = pos[:, None, :] - pos[other]
+        distance2 = np.maximum((delta ** 2).sum(axis=2), 1e-12)
+        displacement = (delta * (k * k / distance2)[:, :, None]).sum(axis=1) * (n / samples)
+
+        delta = pos[edges[:, 0]] - pos[edges[:, 1]]
+        distance = np.sqrt((delta ** 2).sum(axis=1))
+        force = delta * (distance / k)[:, None]
+        for axis in range(2):
+            displacement[:, axis] += (np.bincount(edges[:, 1], force[:, axis], n)
+                                      - np.bincount(edges[:, 0], force[:, axis], n))
+
+        length = np.maximum(np.sqrt((displacement ** 2).sum(axis=1)), 1e-12)
+        pos += displacement * (np.minimum(length, temperature) / length)[:, None]
+
+    return {node: pos[i] for i, node in enumerate(nodes)}
+
+
+def _to_node(value):
+    """JSON turns tuple nodes (grid cells) into lists; turn them back."""
+    return tuple(_to_node(item) for item in value) if isinstance(value, list) else value
+
+
+def cached_layout(G, method="auto", directory=LAYOUT_DIRECTORY, seed=0):
+    """
+    Node positions for a networkx graph, stored under ``directory`` keyed by
+    the graph's fingerprint so the same graph is only laid out once.
+
+    Args:
+        method: "spring" (networkx), "fast" (``fast_layout``) or "auto",
+            which picks "fast" above FAST_LAYOUT_THRESHOLD nodes.
+    """
+    if method == "auto":
+        method = "fast" if len(G) > FAST_LAYOUT_THRESHOLD else "spring"
+    path = None
+    if directory is not None:
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{graph_fingerprint(G)}-{method}-{seed}.json")
+        if os.path.exists(path):
+            with open(path) as f:
+                return {_to_node(node): np.array(xy) for node, xy in json.load(f)}
+
+    if method == "spring":
+        pos = nx.spring_layout(G, seed=seed)
+    elif method == "fast":
+        pos = fast_layout(G, seed=seed)
+    else:
+        raise ValueError(f"Unknown layout method: {method}")
+
+    if path is not None:
+        with open(path, "w") as f:
+            json.dump([[node, [float(x), float(y)]] for node, (x, y) in pos.items()], f)
+    return pos
+
+
+def new_figure(output=None, figsize=(10, 7)):
+    """
+    A pyplot figure for interactive display, or, when writing to ``output``,
+    a standalone Agg figure that never touches the GUI backend.
+    """
+    if output is None:
+        import matplotlib.pyplot as plt  # only for interactive windows; it loads a GUI backend
+
+        fig = plt.figure(figsize=figsize)
+    else:
+        fig = Figure(figsize=figsize)
+        FigureCanvasAgg(fig)
+    return fig, fig.add_subplot()
+
+
+def show_or_save(fig, output=None, dpi=100):
+    if output is None:
+        import matplotlib.pyplot as plt
+
+        plt.show()
+    else:
+        fig.savefig(output, dpi=dpi)
+
+
+def draw_sizes(G):
+    """Node size and whether to draw labels, so big graphs stay readable."""
+    return (700, True) if len(G) <= LABEL_LIMIT else (max(2, 20000 // len(G)), False)
+
+
+def benchmark_rendering(num_nodes=5000, edges_per_node=2, hops=2, seed=0):
+    """Time full spring layout, fast layout, cached reload and path-neighborhood rendering."""
+    G = nx.barabasi_albert_graph(num_nodes, edges_per_node, seed=seed)
+    graph = {node: list(G.adj[node]) for node in G}
+    path = nx.shortest_path(G, 0, num_nodes - 1)
+    directory = tempfile.mkdtemp(prefix="layouts-")
+    print(f"Barabasi-Albert graph: {num_nodes:,} nodes, {G.number_of_edges():,} edges, path of {len(path)} nodes")
+
+    for method in ("spring", "fast"):
+        start = time.perf_counter()
+        try:
+            cached_layout(G, method, directory, seed)
+        except ImportError as error:  # spring layout of large graphs needs scipy
+            print(f"  {method:<6} layout of the whole graph: skipped ({error})")
+            continue
+        computed = time.perf_counter() - start
+        start = time.perf_counter()
+        cached_layout(G, method, directory, seed)
+        print(f"  {method:<6} layout of the whole graph: {computed:7.2f}s, "
+              f"{1000 * (time.perf_counter() - start):7.1f}ms from cache")
+
+    start = time.perf_counter()
+    nodes, edges = graph_edges(graph, path, hops)
+    H = nx.Graph()
+    H.add_nodes_from(nodes)
+    H.add_edges_from((u, v) for u, v, _ in edges)
+    pos = cached_layout(H, "auto", directory, seed)
+    fig, ax = new_figure(os.path.join(directory, "neighborhood.png"))
+    node_size, labels = draw_sizes(H)
+    nx.draw_networkx_nodes(H, pos, node_size=node_size, node_color="lightblue", ax=ax)
+    nx.draw_networkx_edges(H, pos, edge_color="gray", ax=ax)
+    nx.draw_networkx_edges(H, pos, edgelist=list(zip(path, path[1:])), edge_color="red", width=2, ax=ax)
+    show_or_save(fig, os.path.join(directory, "neighborhood.png"))
+    print(f"  {hops}-hop path neighborhood ({len(H):,} nodes) laid out and written to PNG: "
+          f"{time.perf_counter() - start:7.2f}s")
+    print(f"  files in {directory}")
+
+
+if __name__ == "__main__":
+    benchmark_rendering()
@@ -0,0 +1,542 @@
+import heapq
+import itertools
+import mmap
+import multiprocessing
+import os
+import struct
+import time
+
+import numpy as np
+
+GRAPH_MAGIC = b"CSR\x01"
+# magic, directed, weight kind, number of nodes, number of edges, label bytes
+HEADER = struct.Struct("<4sBB2xqqq")
+NO_WEIGHTS, INT_WEIGHTS, FLOAT_WEIGHTS = 0, 1, 2
+WEIGHT_DTYPES = {INT_WEIGHTS: np.int64, FLOAT_WEIGHTS: np.float64}
+
+
+def _padded(size):
+    """Round a byte count up to a multiple of 8 so every array in the file stays aligned."""
+    return (size + 7) & ~7
+
+
+def _edge_list_blocks(path, block_size):
+    """Yield the columns (lists of tokens) of an edge-list file, one block of whole lines at a time."""
+    with open(path) as f:
+        rest = ""
+        while True:
+            data = f.read(block_size)
+            text = rest + data
+            if not text:
+                return
+            cut = text.rfind("\n") + 1 if data else len(text)
+            text, rest = text[:cut], text[cut:]
+            if not text:
+                continue
+            if "#" in text or "%" in text:
+                text = "".join(line for line in text.splitlines(True) if line[:1] not in "#%")
+            tokens = text.split()
+            if not tokens:
+                continue
+            width = len(text.split("\n", 1)[0].split())
+            lines = text.count("\n") + (not text.endswith("\n"))
+            if width < 2 or lines * width != len(tokens):  # blank or ragged lines: check line by line
+                rows = [row for row in map(str.split, text.splitlines()) if row]
+                width = len(rows[0])
+                if width < 2 or any(len(row) != width for row in rows):
+                    raise ValueError(f"{path}: every line needs the same 'source target [weight]' columns")
+                tokens = [token for row in rows for token in row]
+            yield [tokens[i::width] for i in range(width)]
+
+
+def _parse_weights(columns):
+    if len(columns) < 3:
+        return None
+    try:
+        return np.array(columns[2], dtype=np.int64)
+    except ValueError:
+        return np.array(columns[2], dtype=np.float64)
+
+
+def _join_chunks(path, source_chunks, target_chunks, weight_chunks):
+    """Concatenate the per-block arrays into (sources, targets, weights or None)."""
+    sources = np.concatenate(source_chunks) if source_chunks else np.zeros(0, dtype=np.int64)
+    targets = np.concatenate(target_chunks) if target_chunks else np.zeros(0, dtype=np.int64)
+    if not any(chunk is not None for chunk in weight_chunks):
+        return sources, targets, None
+    if any(chunk is None for chunk in weight_chunks):
+        raise ValueError(f"{path}: some edges have weights and some do not")
+    if all(np.issubdtype(chunk.dtype, np.integer) for chunk in weight_chunks):
+        return sources, targets, np.concatenate(weight_chunks)
+    return sources, targets, np.concatenate(weight_chunks).astype(np.float64)
+
+
+class NeighborView:
+    """``view[node]`` is the list of neighbor ids, like an unweighted adjacency dict."""
+
+    __slots__ = ("indptr", "indices")
+
+    def __init__(self, graph):
+        self.indptr = graph.indptr
+        self.indices = graph.indices
+
+    def __getitem__(self, node):
+        return self.indices[self.indptr[node]:self.indptr[node + 1]].tolist()
+
+
+class WeightedView:
+    """``view[node]`` is the list of (neighbor id, weight) tuples, like a weighted adjacency dict."""
+
+    __slots__ = ("indptr", "indices", "weights")
+
+    def __init__(self, graph):
+        self.indptr = graph.indptr
+        self.indices = graph.indices
+        self.weights = graph.weights
+
+    def __getitem__(self, node):
+        start, end = self.indptr[node], self.indptr[node + 1]
+        if self.weights is None:
+            return [(neighbor, 1) for neighbor in self.indices[start:end].tolist()]
+        return list(zip(self.indices[start:end].tolist(), self.weights[start:end].tolist()))
+
+
+class CSRGraph:
+    """
+    Graph in compressed sparse row form over interned int node ids.
+
+    The outgoing edges of node ``u`` are ``indices[indptr[u]:indptr[u + 1]]``
+    with matching ``weights`` (None for unweighted graphs). Node labels are
+    kept as one UTF-8 blob with an offset array, plus the ids in label
+    order for binary-search lookups, so a memory-mapped graph needs no
+    per-node Python objects at all.
+
+    Graphs built by ``from_dict`` also keep the original label objects
+    (ints, tuples, ...) in ``labels``, and ``label``/``node_id`` use those.
+    The file format stores only the labels' strings, so they load back as
+    strings.
+    """
+
+    def __init__(self, indptr, indices, weights, label_offsets, label_data, label_order, directed, buffer=None,
+                 labels=None):
+        self.indptr = indptr
+        self.indices = indices
+        self.weights = weights
+        self.label_offsets = label_offsets
+        self.label_data = label_data
+        self.label_order = label_order
+        self.directed = directed
+        self._buffer = buffer  # keeps the memory map alive
+        self._reverse = None
+        self.labels = labels  # original labels in id order, or None for string labels
+        self._label_ids = None  # label -> id for ``labels``, built on first lookup
+
+    @property
+    def num_nodes(self):
+        return len(self.indptr) - 1
+
+    @property
+    def num_edges(self):
+        """Stored edges; an undirected edge counts once per direction."""
+        return len(self.indices)
+
+    @property
+    def nbytes(self):
+        arrays = (self.indptr, self.indices, self.weights, self.label_offsets, self.label_order)
+        return sum(a.nbytes for a in arrays if a is not None) + len(self.label_data)
+
+    def __len__(self):
+        return self.num_nodes
+
+    def label(self, node):
+        if self.labels is not None:
+            return self.labels[node]
+        return bytes(self.label_data[self.label_offsets[node]:self.label_offsets[node + 1]]).decode()
+
+    def labels_of(self, nodes):
+        return [self.label(node) for node in nodes]
+
+    def node_id(self, label):
+        """Id of a node label; KeyError if the graph has no such node."""
+        if self.labels is not None:
+            if self._label_ids is None:
+                self._label_ids = {label: node for node, label in enumerate(self.labels)}
+            return self._label_ids[label]
+        key = str(label).encode()
+        order, offsets, data = self.label_order, self.label_offsets, self.label_data
+        lo, hi = 0, len(order)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            node = order[mid]
+            if bytes(data[offsets[node]:offsets[node + 1]]) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(order):
+            node = int(order[lo])
+            if bytes(data[offsets[node]:offsets[node + 1]]) == key:
+                return node
+        raise KeyError(label)
+
+    def neighbors(self, node):
+        return self.indices[self.indptr[node]:self.indptr[node + 1]]
+
+    def neighbor_view(self):
+        return NeighborView(self)
+
+    def weighted_view(self):
+        return WeightedView(self)
+
+    def reverse(self):
+        """The graph with every edge flipped (the graph itself when undirected); built once."""
+        if not self.directed:
+            return self
+        if self._reverse is None:
+            sources = np.repeat(np.arange(self.num_nodes, dtype=self.indices.dtype), np.diff(self.indptr))
+            order = np.argsort(self.indices, kind="stable")
+            indptr = np.zeros(self.num_nodes + 1, dtype=np.int64)
+            np.cumsum(np.bincount(self.indices, minlength=self.num_nodes), out=indptr[1:])
+            weights = None if self.weights is None else self.weights[order]
+            self._reverse = CSRGraph(indptr, sources[order], weights, self.label_offsets,
+                                     self.label_data, self.label_order, True, self._buffer, self.labels)
+            self._reverse._reverse = self
+        return self._reverse
+
+    @classmethod
+    def from_edges(cls, sources, targets, weights, labels, directed=True):
+        """Build from parallel edge arrays over node ids and the labels in id order."""
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+        if not directed:
+            sources, targets = np.concatenate([sources, targets]), np.concatenate([targets, sources])
+            if weights is not None:
+                weights = np.concatenate([weights, weights])
+        num_nodes = len(labels)
+        order = np.argsort(sources, kind="stable")
+        indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=num_nodes), out=indptr[1:])
+        index_dtype = np.int32 if num_nodes < 2 ** 31 else np.int64
+        indices = targets[order].astype(index_dtype)
+        if weights is not None:
+            weights = np.asarray(weights)[order]
+
+        encoded = [label.encode() for label in labels]
+        label_offsets = np.zeros(num_nodes + 1, dtype=np.int64)
+        np.cumsum([len(label) for label in encoded], out=label_offsets[1:])
+        label_order = np.array(sorted(range(num_nodes), key=encoded.__getitem__), dtype=index_dtype)
+        return cls(indptr, indices, weights, label_offsets, b"".join(encoded), label_order, directed)
+
+    @classmethod
+    def from_dict(cls, graph, directed=True):
+        """
+        Convert an adjacency dict, either ``{node: [neighbor, ...]}`` or
+        ``{node: [(neighbor, weight), ...]}``. For undirected graphs pass
+        each edge once, or it will be stored twice. The node labels are
+        kept as they are (see ``labels``); only a saved copy turns them
+        into strings.
+        """
+        interned = {}
+        labels = []
+
+        def intern(label):
+            node = interned.get(label)
+            if node is None:
+                node = interned[label] = len(labels)
+                labels.append(label)
+            return node
+
+        sources, targets, weights = [], [], []
+        for node, edges in graph.items():
+            u = intern(node)
+            for edge in edges:
+                if isinstance(edge, tuple):
+                    edge, weight = edge
+                    weights.append(weight)
+                sources.append(u)
+                targets.append(intern(edge))
+        weight_array = np.array(weights) if weights else None
+        graph = cls.from_edges(sources, targets, weight_array, [str(label) for label in labels], directed)
+        graph.labels = labels
+        return graph
+
+    @classmethod
+    def from_edge_list(cls, path, directed=True, block_size=1 << 22):
+        """
+        Stream a whitespace-separated ``source target [weight]`` edge list
+        (lines starting with '#' or '%' are comments), ``block_size`` bytes at
+        a time, straight into NumPy arrays.
+
+        Integer node labels (as in SNAP and DIMACS files) are converted and
+        renumbered entirely in NumPy, and come back as their decimal strings.
+        Any other labels are interned through one dict, which is then the only
+        per-node Python object. The file is read once: at the first block with
+        a label that is not an integer, the integers read so far are interned
+        by their decimal strings and the rest goes through the dict. Weights
+        become int64 if they are all integers, float64 otherwise.
+        """
+        blocks = _edge_list_blocks(path, block_size)
+        source_chunks, target_chunks, weight_chunks = [], [], []
+        for columns in blocks:
+            try:
+                sources = np.array(columns[0], dtype=np.int64)
+                targets = np.array(columns[1], dtype=np.int64)
+            except ValueError:
+                return cls._from_label_blocks(path, directed, itertools.chain([columns], blocks),
+                                              source_chunks, target_chunks, weight_chunks)
+            source_chunks.append(sources)
+            target_chunks.append(targets)
+            weight_chunks.append(_parse_weights(columns))
+        return cls._from_integer_chunks(path, directed, source_chunks, target_chunks, weight_chunks)
+
+    @classmethod
+    def _from_label_blocks(cls, path, directed, blocks, source_chunks, target_chunks, weight_chunks):
+        """Intern the integer chunks read so far by their decimal strings, then every label in ``blocks``."""
+        interned = {}
+        if source_chunks:
+            count = sum(len(chunk) for chunk in source_chunks)
+            values, ids = np.unique(np.concatenate(source_chunks + target_chunks), return_inverse=True)
+            interned = {label: node for node, label in enumerate(map(str, values.tolist()))}
+            source_chunks, target_chunks = [ids[:count]], [ids[count:]]
+            del values, ids
+        for columns in blocks:
+            for column in columns[:2]:
+                fresh = [label for label in dict.fromkeys(column) if label not in interned]
+                interned.update(zip(fresh, range(len(interned), len(interned) + len(fresh))))
+            source_chunks.append(np.fromiter(map(interned.__getitem__, columns[0]), np.int64, len(columns[0])))
+            target_chunks.append(np.fromiter(map(interned.__getitem__, columns[1]), np.int64, len(columns[1])))
+            weight_chunks.append(_parse_weights(columns))
+        labels = list(interned)
+        del interned
+        return cls.from_edges(*_join_chunks(path, source_chunks, target_chunks, weight_chunks), labels, directed)
+
+    @classmethod
+    def _from_integer_chunks(cls, path, directed, source_chunks, target_chunks, weight_chunks):
+        sources, targets, weights = _join_chunks(path, source_chunks, target_chunks, weight_chunks)
+        for chunks in (source_chunks, target_chunks, weight_chunks):
+            chunks.clear()  # the caller still holds these lists
+        if not len(sources):
+            return cls.from_edges(sources, targets, weights, [], directed)
+        low = min(sources.min(), targets.min())
+        high = max(sources.max(), targets.max())
+        if low >= 0 and high < 4 * len(sources) + 1024:
+            # Dense ids: renumber through a lookup table instead of sorting
+            present = np.zeros(high + 1, dtype=bool)
+            present[sources] = True
+            present[targets] = True
+            labels = np.flatnonzero(present)
+            renumber = np.cumsum(present) - 1
+            del present
+            sources, targets = renumber[sources], renumber[targets]
+        else:
+            labels, ids = np.unique(np.concatenate([sources, targets]), return_inverse=True)
+            sources, targets = ids[:len(sources)], ids[len(sources):]
+        return cls.from_edges(sources, targets, weights, list(map(str, labels.tolist())), directed)
+
+    def save(self, path):
+        """Write a header followed by the raw arrays, each padded to 8 bytes."""
+        if self.weights is None:
+            kind = NO_WEIGHTS
+        else:
+            kind = INT_WEIGHTS if np.issubdtype(self.weights.dtype, np.integer) else FLOAT_WEIGHTS
+        index_dtype = np.int32 if self.num_nodes < 2 ** 31 else np.int64
+        arrays = [
+            np.asarray(self.indptr, dtype=np.int64),
+            np.asarray(self.indices, dtype=index_dtype),
+            np.asarray(self.label_offsets, dtype=np.int64),
+            np.asarray(self.label_order, dtype=index_dtype),
+        ]
+        if kind != NO_WEIGHTS:
+            arrays.append(np.asarray(self.weights, dtype=WEIGHT_DTYPES[kind]))
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(GRAPH_MAGIC, self.directed, kind, self.num_nodes,
+                                self.num_edges, len(self.label_data)))
+            for array in arrays:
+                f.write(array.tobytes())
+                f.write(bytes(_padded(array.nbytes) - array.nbytes))
+            f.write(bytes(self.label_data))
+
+    @classmethod
+    def load(cls, path):
+        """Memory-map a saved graph; nothing is copied and pages are read on first use."""
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, directed, kind, num_nodes, num_edges, label_bytes = HEADER.unpack_from(buffer)
+        if magic != GRAPH_MAGIC:
+            raise ValueError(f"{path} is not a graph store file")
+        index_dtype = np.int32 if num_nodes < 2 ** 31 else np.int64
+        offset = HEADER.size
+
+        def take(dtype, count):
+            nonlocal offset
+            array = np.frombuffer(buffer, dtype=dtype, count=count, offset=offset)
+            offset += _padded(array.nbytes)
+            return array
+
+        indptr = take(np.int64, num_nodes + 1)
+        indices = take(index_dtype, num_edges)
+        label_offsets = take(np.int64, num_nodes + 1)
+        label_order = take(index_dtype, num_nodes)
+        weights = take(WEIGHT_DTYPES[kind], num_edges) if kind != NO_WEIGHTS else None
+        label_data = memoryview(buffer)[offset:offset + label_bytes]
+        return cls(indptr, indices, weights, label_offsets, label_data, label_order, bool(directed), buffer)
+
+
+def node_index(graph):
+    """
+    (nodes, index) translating between the nodes of an adjacency dict and
+    ids 0..n-1; (None, None) for a CSRGraph, whose ids are the nodes.
+    Nodes that only appear as neighbors get ids too.
+    """
+    if isinstance(graph, CSRGraph):
+        return None, None
+    nodes = list(graph)
+    index = {node: i for i, node in enumerate(nodes)}
+    for edges in graph.values():
+        for neighbor, _ in edges:
+            if neighbor not in index:
+                index[neighbor] = len(nodes)
+                nodes.append(neighbor)
+    return nodes, index
+
+
+def id_adjacency(graph):
+    """
+    (nodes, index, forward, backward) for a weighted graph: ``forward[u]`` and
+    ``backward[u]`` list (id, weight) edges leaving and entering node id u.
+    """
+    if isinstance(graph, CSRGraph):
+        return None, None, graph.weighted_view(), graph.reverse().weighted_view()
+    nodes, index = node_index(graph)
+    forward = [[] for _ in nodes]
+    backward = [[] for _ in nodes]
+    for node, edges in graph.items():
+        u = index[node]
+        for neighbor, weight in edges:
+            v = index[neighbor]
+            forward[u].append((v, weight))
+            backward[v].append((u, weight))
+    return nodes, index, forward, backward
+
+
+def dijkstra_distances(adjacency, n, source, parents=False):
+    """Distances from ``source`` to every id (inf if unreachable), optionally with the tree and settle order."""
+    dist = [float("inf")] * n
+    parent = [-1] * n if parents else None
+    order = []
+    dist[source] = 0
+    pq = [(0, source)]
+    while pq:
+        d, u = heapq.heappop(pq)
+        if d > dist[u]:
+            continue
+        order.append(u)
+        for v, w in adjacency[u]:
+            nd = d + w
+            if nd < dist[v]:
+                dist[v] = nd
+                if parents:
+                    parent[v] = u
+                heapq.heappush(pq, (nd, v))
+    if parents:
+        return np.array(dist, dtype=np.float64), parent, order
+    return np.array(dist, dtype=np.float64)
+
+
+def load_edge_list(path, directed=True, cache=True):
+    """
+    Load an edge-list file, reusing the binary cache ``<path>.csr`` when it is
+    newer than the text file and writing it otherwise.
+    """
+    cache_path = path + ".csr"
+    if cache and os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(path):
+        graph = CSRGraph.load(cache_path)
+        if graph.directed == directed:
+            return graph
+    graph = CSRGraph.from_edge_list(path, directed)
+    if cache:
+        graph.save(cache_path)
+        graph = CSRGraph.load(cache_path)
+    return graph
+
+
+def write_random_edge_list(path, num_nodes, num_edges, max_weight=100, seed=0):
+    """Random directed edge list with integer node ids and weights, like a SNAP or DIMACS file."""
+    rng = np.random.default_rng(seed)
+    with open(path, "w") as f:
+        for start in range(0, num_edges, 1 << 20):
+            count = min(1 << 20, num_edges - start)
+            sources = rng.integers(0, num_nodes, count)
+            targets = rng.integers(0, num_nodes, count)
+            weights = rng.integers(1, max_weight + 1, count)
+            f.write("".join(f"{u} {v} {w}\n" for u, v, w in zip(sources.tolist(), targets.tolist(), weights.tolist())))
+
+
+def load_dict_of_lists(path):
+    """The plain-Python alternative: ``{source: [(target, weight), ...]}``."""
+    adjacency = {}
+    with open(path) as f:
+        for line in f:
+            u, v, w = line.split()
+            adjacency.setdefault(u, []).append((v, int(w)))
+    return adjacency
+
+
+def _measure_load(loader, path, results):
+    """Run a loader in this (fresh) process and report its time and peak memory growth."""
+    import resource  # Unix only, and only needed here
+
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    loader(path)
+    elapsed = time.perf_counter() - start
+    results.put((elapsed, (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline) * 1024))
+
+
+def benchmark(num_nodes=1_000_000, num_edges=5_000_000, path="random-graph.txt"):
+    """Load time and memory of the CSR store against a dict of (neighbor, weight) lists."""
+    if not os.path.exists(path):
+        print(f"Writing {num_edges:,} random edges to {path}")
+        write_random_edge_list(path, num_nodes, num_edges)
+    print(f"Edge list: {os.path.getsize(path) / 2 ** 20:,.0f} MB")
+
+    # Each loader runs in its own process so peak RSS is not shared between them
+    results = multiprocessing.Queue()
+    for label, loader in (("CSR from text", CSRGraph.from_edge_list), ("dict of lists", load_dict_of_lists)):
+        worker = multiprocessing.Process(target=_measure_load, args=(loader, path, results))
+        worker.start()
+        elapsed, peak = results.get()
+        worker.join()
+        print(f"{label + ':':<22}{elapsed:7.2f}s, peak {peak / 2 ** 20:7,.0f} MB")
+
+    graph = CSRGraph.from_edge_list(path)
+    print(f"CSR arrays:           {graph.nbytes / 2 ** 20:7,.0f} MB for {graph.num_nodes:,} nodes, "
+          f"{graph.num_edges:,} edges")
+    cache_path = path + ".csr"
+    start = time.perf_counter()
+    graph.save(cache_path)
+    print(f"Binary cache written: {time.perf_counter() - start:7.2f}s, "
+          f"{os.path.getsize(cache_path) / 2 ** 20:,.0f} MB")
+    start = time.perf_counter()
+    graph = CSRGraph.load(cache_path)
+    node = graph.node_id(12345)
+    degree = len(graph.weighted_view()[node])
+    print(f"Reload from cache:    {1000 * (time.perf_counter() - start):7.2f}ms (memory-mapped, "
+          f"first lookup included; node 12345 has {degree} out-edges)")
+
+
+if __name__ == "__main__":
+    import sys
+
+    if "--benchmark" in sys.argv:
+        benchmark()
+        sys.exit()
+
+    graph = CSRGraph.from_dict({
+        "A": [("B", 1), ("C", 4)],
+        "B": [("C", 2), ("D", 5)],
+        "C": [("D", 1)],
+        "D": []
+    })
+    print(f"{graph.num_nodes} nodes, {graph.num_edges} edges")
+    for node in range(graph.num_nodes):
+        print(graph.label(node), "->", [(graph.label(v), w) for v, w in graph.weighted_view()[node]])
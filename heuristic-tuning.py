@@ -1,30 +1,76 @@
+import argparse
 import heapq
+import json
+import math
+import multiprocessing
+import os
+import random
+import time
+import tracemalloc
 
-def a_star_with_heuristics(graph, start, goal, heuristic):
+import numpy as np
+
+from graph_store import dijkstra_distances, id_adjacency
+from indexed_heap import indexed_best_first_search
+from landmarks import Landmarks
+from search_stats import callbacks, record
+
+def a_star_with_heuristics(graph, start, goal, heuristic, queue="heapq", stats=None):
+    """
+    With ``queue="indexed"`` the frontier is an IndexedHeap with decrease-key
+    instead of a heapq list that collects stale entries. ``stats`` receives
+    "peak_queue", the largest frontier size, and the ``search_stats``
+    counters; "reopened" counts closed nodes later reached more cheaply,
+    which shows where a heuristic is inconsistent.
+    """
+    if queue == "indexed":
+        cost, path, _ = indexed_best_first_search(graph, start, goal, heuristic, stats=stats)
+        return cost, path, len(path)
+    started = time.perf_counter()
+    on_expand, on_push = callbacks(stats)
+    peak = 0
+    pushed = 1
+    reopened = 0
     pq = []  # Priority queue
     heapq.heappush(pq, (0, start))  # (f(n), node)
     visited = set()
     cost_so_far = {start: 0}
     path = []  # To store the explored path
+    found = False
 
     while pq:
+        if len(pq) > peak:
+            peak = len(pq)
         current_cost, current_node = heapq.heappop(pq)
 
         if current_node in visited:
             continue
         visited.add(current_node)
         path.append(current_node)
+        if on_expand is not None:
+            on_expand(current_node)
 
         if current_node == goal:
-            return cost_so_far[current_node], path, len(visited)
+            found = True
+            break
 
         for neighbor, weight in graph[current_node]:
             new_cost = cost_so_far[current_node] + weight
             if neighbor not in cost_so_far or new_cost < cost_so_far[neighbor]:
+                if neighbor in visited:
+                    reopened += 1
                 cost_so_far[neighbor] = new_cost
                 f_cost = new_cost + heuristic[neighbor]
                 heapq.heappush(pq, (f_cost, neighbor))
+                pushed += 1
+                if on_push is not None:
+                    on_push(neighbor, f_cost)
 
+    if stats is not None:
+        stats["peak_queue"] = peak
+        record(stats, len(visited), pushed, reopened, peak, {"search": time.perf_counter() - started})
+    if found:
+        return cost_so_far[goal], path, len(visited)
     return float("inf"), path, len(visited)  # If no path is found
 
 def heuristic_tuning_analysis():
@@ -65,5 +111,245 @@ def heuristic_tuning_analysis():
     print(f"Consistent Heuristic:")
     print(f"  Path Cost = {consistent_cost}, Path = {consistent_path}, Nodes Explored = {consistent_nodes}")
 
+def geometric_graph(num_nodes, neighbors=6, detour=0.3, rng=None):
+    """
+    Random points in a 100x100 square, each linked both ways to its nearest
+    neighbors. Edge weights are the Euclidean length stretched by up to
+    ``detour``, so straight-line distance never overestimates.
+    """
+    rng = rng or random.Random(0)
+    coords = np.array([(rng.uniform(0, 100), rng.uniform(0, 100)) for _ in range(num_nodes)])
+    distance = np.sqrt(((coords[:, None, :] - coords[None, :, :]) ** 2).sum(axis=2))
+    nearest = np.argsort(distance, axis=1)[:, 1:neighbors + 1]
+    edges = {}
+    for u in range(num_nodes):
+        for v in nearest[u].tolist():
+            if (v, u) not in edges:
+                edges[u, v] = round(float(distance[u, v]) * rng.uniform(1, 1 + detour), 3)
+    return coords.tolist(), [(u, v, w) for (u, v), w in edges.items()] + [(v, u, w) for (u, v), w in edges.items()]
+
+
+def grid_corpus_graph(size, max_weight=10, rng=None):
+    """4-connected size x size grid with unit spacing and weights in [1, max_weight]."""
+    rng = rng or random.Random(0)
+    coords = [(x, y) for x in range(size) for y in range(size)]
+    edges = []
+    for x in range(size):
+        for y in range(size):
+            for nx_, ny in ((x + 1, y), (x, y + 1)):
+                if nx_ < size and ny < size:
+                    weight = rng.randint(1, max_weight)
+                    edges.append((x * size + y, nx_ * size + ny, weight))
+                    edges.append((nx_ * size + ny, x * size + y, weight))
+    return coords, edges
+
+
+def make_corpus(num_graphs=4, num_nodes=1600, queries=10, seed=0):
+    """
+    Alternating geometric and grid graphs, each with ``queries`` random
+    (start, goal) pairs that are connected.
+
+    Returns:
+        List of {"name", "coords", "edges", "queries"} entries, as stored by
+        ``save_corpus``.
+    """
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(num_graphs):
+        if i % 2 == 0:
+            name = f"geometric-{i}"
+            coords, edges = geometric_graph(num_nodes, rng=rng)
+        else:
+            name = f"grid-{i}"
+            coords, edges = grid_corpus_graph(int(math.sqrt(num_nodes)), rng=rng)
+        graph = adjacency_of(len(coords), edges)
+        _, _, forward, _ = id_adjacency(graph)
+        pairs = []
+        while len(pairs) < queries:
+            start, goal = rng.randrange(len(coords)), rng.randrange(len(coords))
+            if start != goal and dijkstra_distances(forward, len(coords), start)[goal] < float("inf"):
+                pairs.append((start, goal))
+        corpus.append({"name": name, "coords": coords, "edges": edges, "queries": pairs})
+    return corpus
+
+
+def save_corpus(path, corpus):
+    with open(path, "w") as f:
+        json.dump(corpus, f)
+
+
+def load_corpus(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def adjacency_of(num_nodes, edges):
+    graph = {node: [] for node in range(num_nodes)}
+    for u, v, w in edges:
+        graph[u].append((v, w))
+    return graph
+
+
+def _zero(entry, goal):
+    return np.zeros(len(entry["coords"]))
+
+
+def _euclidean(entry, goal):
+    coords = entry["coords_array"]
+    return np.sqrt(((coords - coords[goal]) ** 2).sum(axis=1))
+
+
+def _manhattan(entry, goal):
+    coords = entry["coords_array"]
+    return np.abs(coords - coords[goal]).sum(axis=1)
+
+
+def _landmarks(entry, goal):
+    if "landmarks" not in entry:
+        entry["landmarks"] = Landmarks.build(entry["graph"], count=8)
+    return entry["landmarks"].bounds_to(goal)
+
+
+# Heuristic families: (corpus entry, goal) -> array of estimates indexed by node
+HEURISTIC_FAMILIES = {
+    "zero": _zero,
+    "euclidean": _euclidean,
+    "manhattan": _manhattan,
+    "landmarks": _landmarks,
+}
+
+
+def check_heuristic(h, exact, sources, targets, weights, tolerance=1e-9):
+    """
+    Vectorized admissibility and consistency checks for one goal.
+
+    Args:
+        h: Heuristic values per node.
+        exact: True distances to the goal per node (inf where unreachable).
+        sources, targets, weights: Edge arrays of the graph.
+
+    Returns:
+        (fraction of reachable nodes where h <= exact, fraction of edges
+        where h(u) <= w(u, v) + h(v)).
+    """
+    reachable = np.isfinite(exact)
+    admissible = np.count_nonzero(h[reachable] <= exact[reachable] + tolerance) / max(1, np.count_nonzero(reachable))
+    consistent = np.count_nonzero(h[sources] <= weights + h[targets] + tolerance) / max(1, len(sources))
+    return admissible, consistent
+
+
+_worker = {}
+
+
+def _init_worker(corpus):
+    for entry in corpus:
+        entry["graph"] = adjacency_of(len(entry["coords"]), entry["edges"])
+        entry["coords_array"] = np.array(entry["coords"], dtype=np.float64)
+        edges = np.array(entry["edges"], dtype=np.float64).reshape(-1, 3)
+        entry["edge_arrays"] = (edges[:, 0].astype(np.int64), edges[:, 1].astype(np.int64), edges[:, 2])
+        entry["backward"] = id_adjacency(entry["graph"])[3]
+        entry["exact"] = {}
+    _worker["corpus"] = corpus
+
+
+def _exact_to(entry, goal):
+    """True distances to ``goal`` from a Dijkstra over the reversed edges, cached per worker."""
+    if goal not in entry["exact"]:
+        entry["exact"][goal] = dijkstra_distances(entry["backward"], len(entry["coords"]), goal)
+    return entry["exact"][goal]
+
+
+def _evaluate(task):
+    """Run every query of one corpus graph with one heuristic family and weight."""
+    graph_index, family, weight = task
+    entry = _worker["corpus"][graph_index]
+    graph = entry["graph"]
+    heuristics, admissible, consistent = {}, [], []
+    for _, goal in entry["queries"]:
+        h = weight * HEURISTIC_FAMILIES[family](entry, goal)
+        exact = _exact_to(entry, goal)
+        a, c = check_heuristic(h, exact, *entry["edge_arrays"])
+        admissible.append(a)
+        consistent.append(c)
+        heuristics[goal] = h.tolist()
+
+    nodes, ratios = 0, []
+    start_time = time.perf_counter()
+    for start, goal in entry["queries"]:
+        cost, _, explored = a_star_with_heuristics(graph, start, goal, heuristics[goal])
+        nodes += explored
+        ratios.append(cost / _exact_to(entry, goal)[start])
+    elapsed = time.perf_counter() - start_time
+
+    # Peak memory in a second pass, since tracing slows the searches down
+    tracemalloc.start()
+    for start, goal in entry["queries"]:
+        a_star_with_heuristics(graph, start, goal, heuristics[goal])
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    queries = len(entry["queries"])
+    return {"graph": entry["name"], "family": family, "weight": weight, "nodes": nodes / queries,
+            "ms": 1000 * elapsed / queries, "peak_kb": peak / 1024, "mean_ratio": sum(ratios) / queries,
+            "max_ratio": max(ratios), "admissible": min(admissible), "consistent": min(consistent)}
+
+
+def evaluate_heuristics(corpus, families=None, weights=(1, 1.5, 2, 3), workers=None):
+    """
+    Sweep every heuristic family and weighted-A* factor over every corpus
+    graph, one (graph, family, weight) task per pool job.
+
+    Returns:
+        One result dict per task with average nodes expanded and time per
+        query, peak traced memory, mean and worst cost / optimal ratio, and
+        the smallest fraction of nodes (admissibility) and edges
+        (consistency) on which the weighted heuristic held for any goal.
+    """
+    families = families or list(HEURISTIC_FAMILIES)
+    # Scaling the zero heuristic changes nothing, so it only runs once as the baseline
+    tasks = [(i, family, weight) for i in range(len(corpus)) for family in families
+             for weight in (weights[:1] if family == "zero" else weights)]
+    workers = workers or os.cpu_count()
+    with multiprocessing.Pool(workers, _init_worker, (corpus,)) as pool:
+        return pool.map(_evaluate, tasks, chunksize=max(1, len(tasks) // (workers * 4)))
+
+
+def print_results(results):
+    """Average the per-graph results of each (family, weight) into one table row."""
+    rows = {}
+    for result in results:
+        rows.setdefault((result["family"], result["weight"]), []).append(result)
+    print(f"{'heuristic':<10} {'w':>4} {'nodes':>9} {'ms':>8} {'peak KB':>9} {'mean ratio':>11} "
+          f"{'max ratio':>10} {'admissible':>11} {'consistent':>11}")
+    for (family, weight), group in rows.items():
+        mean = {key: sum(result[key] for result in group) / len(group)
+                for key in ("nodes", "ms", "peak_kb", "mean_ratio")}
+        print(f"{family:<10} {weight:>4} {mean['nodes']:>9,.0f} {mean['ms']:>8.2f} {mean['peak_kb']:>9,.0f} "
+              f"{mean['mean_ratio']:>11.4f} {max(r['max_ratio'] for r in group):>10.4f} "
+              f"{min(r['admissible'] for r in group):>11.1%} {min(r['consistent'] for r in group):>11.1%}")
+
 # Example usage
-heuristic_tuning_analysis()
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Heuristic tuning")
+    parser.add_argument("--sweep", action="store_true", help="evaluate heuristic families and weights on a corpus")
+    parser.add_argument("--corpus", help="JSON corpus to load, or to create if it does not exist")
+    parser.add_argument("--graphs", type=int, default=4, help="graphs in a generated corpus")
+    parser.add_argument("--nodes", type=int, default=1600, help="nodes per generated graph")
+    parser.add_argument("--queries", type=int, default=10, help="queries per generated graph")
+    parser.add_argument("--weights", type=float, nargs="+", default=[1, 1.5, 2, 3], help="weighted A* factors")
+    parser.add_argument("--workers", type=int, help="worker processes (default: all cores)")
+    args = parser.parse_args()
+
+    if not args.sweep:
+        heuristic_tuning_analysis()
+    else:
+        if args.corpus and os.path.exists(args.corpus):
+            corpus = load_corpus(args.corpus)
+        else:
+            corpus = make_corpus(args.graphs, args.nodes, args.queries)
+            if args.corpus:
+                save_corpus(args.corpus, corpus)
+        start = time.perf_counter()
+        results = evaluate_heuristics(corpus, weights=args.weights, workers=args.workers)
+        print_results(results)
+        print(f"{len(results)} configurations in {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,159 @@
+import time
+
+from search_stats import callbacks, record
+
+
+class IndexedHeap:
+    """
+    Addressable d-ary min-heap with decrease-key.
+
+    Every item is in the heap at most once, and ``position`` maps each item
+    (a node id or any hashable node) to its slot, so lowering its priority
+    moves the existing entry instead of pushing a duplicate. The heap never
+    holds more entries than there are open nodes.
+    """
+
+    __slots__ = ("arity", "priorities", "items", "position", "peak")
+
+    def __init__(self, arity=2):
+        self.arity = arity
+        self.priorities = []
+        self.items = []
+        self.position = {}
+        self.peak = 0  # largest size reached
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, item):
+        return item in self.position
+
+    def priority(self, item):
+        return self.priorities[self.position[item]]
+
+    def push(self, item, priority):
+        """
+        Insert ``item``, or lower its priority if it is already queued.
+
+        Returns:
+            True if the heap changed, False if the item was queued with a
+            priority that is no higher.
+        """
+        i = self.position.get(item)
+        if i is None:
+            i = len(self.items)
+            self.items.append(item)
+            self.priorities.append(priority)
+            if i >= self.peak:
+                self.peak = i + 1
+        elif priority < self.priorities[i]:
+            self.priorities[i] = priority
+        else:
+            return False
+        self._sift_up(i, item, priority)
+        return True
+
+    def pop(self):
+        """Remove and return the (priority, item) pair with the smallest priority."""
+        items, priorities = self.items, self.priorities
+        top_item, top_priority = items[0], priorities[0]
+        del self.position[top_item]
+        item, priority = items.pop(), priorities.pop()
+        if items:
+            self._sift_down(item, priority)
+        return top_priority, top_item
+
+    def _sift_up(self, i, item, priority):
+        items, priorities, position, arity = self.items, self.priorities, self.position, self.arity
+        while i:
+            parent = (i - 1) // arity
+            if priorities[parent] <= priority:
+                break
+            items[i] = items[parent]
+            priorities[i] = priorities[parent]
+            position[items[i]] = i
+            i = parent
+        items[i] = item
+        priorities[i] = priority
+        position[item] = i
+
+    def _sift_down(self, item, priority):
+        """Place ``item`` at the root slot and move it down to where it belongs."""
+        items, priorities, position, arity = self.items, self.priorities, self.position, self.arity
+        size = len(items)
+        i = 0
+        while True:
+            first = i * arity + 1
+            if first >= size:
+                break
+            best = first
+            best_priority = priorities[first]
+            for child in range(first + 1, min(first + arity, size)):
+                if priorities[child] < best_priority:
+                    best, best_priority = child, priorities[child]
+            if best_priority >= priority:
+                break
+            items[i] = items[best]
+            priorities[i] = best_priority
+            position[items[i]] = i
+            i = best
+        items[i] = item
+        priorities[i] = priority
+        position[item] = i
+
+
+def indexed_best_first_search(graph, start, goal, heuristic=None, arity=2, stats=None):
+    """
+    Uniform-cost search (or A* with a ``heuristic`` dict or sequence) on an
+    IndexedHeap: an improved cost lowers the node's existing entry instead of
+    adding a stale duplicate. Closed nodes are never reopened.
+
+    Args:
+        graph: Adjacency mapping of node -> [(neighbor, weight), ...].
+        stats: Optional dict that receives "peak_queue" (largest heap size)
+            and the ``search_stats`` counters; "pushed" counts inserts and
+            decrease-keys.
+
+    Returns:
+        (cost, explored, found) with ``explored`` the nodes in the order they
+        were closed; cost is inf and found False if the goal is unreachable.
+    """
+    started = time.perf_counter()
+    on_expand, on_push = callbacks(stats)
+    queue = IndexedHeap(arity)
+    queue.push(start, heuristic[start] if heuristic is not None else 0)
+    pushed = 1
+    cost_so_far = {start: 0}
+    closed = set()
+    explored = []
+    found = False
+
+    while queue:
+        _, current_node = queue.pop()
+        closed.add(current_node)
+        explored.append(current_node)
+        if on_expand is not None:
+            on_expand(current_node)
+        if current_node == goal:
+            found = True
+            break
+
+        current_cost = cost_so_far[current_node]
+        for neighbor, weight in graph[current_node]:
+            if neighbor in closed:
+                continue
+            new_cost = current_cost + weight
+            if neighbor not in cost_so_far or new_cost < cost_so_far[neighbor]:
+                cost_so_far[neighbor] = new_cost
+                priority = new_cost + heuristic[neighbor] if heuristic is not None else new_cost
+                queue.push(neighbor, priority)
+                pushed += 1
+                if on_push is not None:
+                    on_push(neighbor, priority)
+
+    if stats is not None:
+        stats["peak_queue"] = queue.peak
+        record(stats, len(explored), pushed, 0, queue.peak, {"search": time.perf_counter() - started})
+    if not found:
+        return float("inf"), explored, False
+    return cost_so_far[goal], explored, True
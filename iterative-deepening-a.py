@@ -1,6 +1,15 @@
+import multiprocessing
+import os
+import random
+import sys
+import time
+
 import numpy as np
 import matplotlib.pyplot as plt
 
+from search_stats import callbacks, phase_times, record
+from sliding_puzzle import PuzzleSearch, SlidingPuzzle, load_pattern_databases
+
 # Directions for movement (up, down, left, right, and diagonals)
 DIRECTIONS = [(-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (-1, 1), (1, -1), (1, 1)]
 
@@ -8,7 +17,7 @@ def heuristic(a, b):
     """Calculate the Manhattan distance heuristic."""
     return abs(a[0] - b[0]) + abs(a[1] - b[1])
 
-def ida_star(grid, start, goal):
+def ida_star(grid, start, goal, stats=None):
     """
     Iterative Deepening A* (IDA*) algorithm to find the shortest path in a grid.
     
@@ -16,15 +25,30 @@ def ida_star(grid, start, goal):
         grid: 2D list representing the grid.
         start: Tuple (x, y) for the start position.
         goal: Tuple (x, y) for the goal position.
+        stats: Optional dict or SearchStats that receives "iterations" and
+            the ``search_stats`` counters, with one phase per iteration.
+            Counting reopened cells keeps a set of every expanded cell, so
+            with stats the search uses O(cells) memory instead of O(depth).
     
     Returns:
         Path as a list of (x, y) tuples if found, else None.
     """
+    on_expand, on_push = callbacks(stats)
+    counts = [0, 0, 0]  # expanded, pushed, deepest path
+    seen = set() if stats is not None else None  # expanded cells, to count repeat expansions
+
     def search(path, g, threshold):
         node = path[-1]
         f = g + heuristic(node, goal)
         if f > threshold:
             return f
+        counts[0] += 1
+        if seen is not None:
+            seen.add(node)
+            if len(path) > counts[2]:
+                counts[2] = len(path)
+        if on_expand is not None:
+            on_expand(node)
         if node == goal:
             return path
         min_cost = float('inf')
@@ -36,6 +60,9 @@ def ida_star(grid, start, goal):
                 grid[neighbor[0]][neighbor[1]] == 0 and
                 neighbor not in path
             ):
+                counts[1] += 1
+                if on_push is not None:
+                    on_push(neighbor, g + 1)
                 result = search(path + [neighbor], g + 1, threshold)
                 if isinstance(result, list):  # Path found
                     return result
@@ -44,14 +71,365 @@ def ida_star(grid, start, goal):
 
     threshold = heuristic(start, goal)
     path = [start]
+    marks = [("start", time.perf_counter())]
     while True:
         result = search(path, 0, threshold)
-        if isinstance(result, list):  # Path found
-            return result
-        if result == float('inf'):  # No path exists
-            return None
+        marks.append((f"iteration {len(marks)}", time.perf_counter()))
+        if isinstance(result, list) or result == float('inf'):  # Path found or no path exists
+            break
         threshold = result
 
+    if stats is not None:
+        stats["iterations"] = len(marks) - 1
+        record(stats, counts[0], counts[1], counts[0] - len(seen), counts[2], phase_times(marks))
+    return result if isinstance(result, list) else None
+
+class FlatGrid:
+    """
+    A grid padded with a border of walls and flattened into a bytearray, so
+    neighbors are plain index offsets with no bounds checks. The heuristic is
+    precomputed for every cell.
+    """
+
+    def __init__(self, grid, goal):
+        rows, cols = len(grid), len(grid[0])
+        self.width = width = cols + 2
+        blocked = bytearray([1]) * width
+        h = [0] * width
+        for x in range(rows):
+            blocked += bytes([1] + [cell != 0 for cell in grid[x]] + [1])
+            dx = abs(x - goal[0])
+            h += [0] + [dx + abs(y - goal[1]) for y in range(cols)] + [0]
+        self.blocked = blocked + bytearray([1]) * width
+        self.h = h + [0] * width
+        self.offsets = [dx * width + dy for dx, dy in DIRECTIONS]
+        self.target = self.index(goal)
+
+    def index(self, position):
+        return (position[0] + 1) * self.width + position[1] + 1
+
+    def position(self, cell):
+        return (cell // self.width - 1, cell % self.width - 1)
+
+    def bounded_search(self, path, threshold, on_path, table=None, iteration=0, max_table_size=0,
+                       depth_limit=None, frontier=None, stop=None):
+        """
+        Depth-first search below ``path`` (a list of cells, used as the stack),
+        pruning at f > ``threshold``.
+
+        One path stack and one stack of next-direction indices replace the
+        recursion, and ``on_path`` (a bytearray over the cells, all zero on
+        entry and on return) marks the cells on the current path.
+
+        Args:
+            table: Optional dict of best (g, iteration) per cell; cells reached
+                again with a worse g, or with the same g earlier in this
+                iteration, are skipped.
+            depth_limit: If set, cells this many steps below ``path`` within the
+                threshold are appended to ``frontier`` as paths, not expanded.
+            stop: Optional Event polled every few thousand nodes; once set the
+                search gives up.
+
+        Returns:
+            (path to the goal or None, smallest f above the threshold, nodes visited)
+        """
+        blocked, h, offsets, target = self.blocked, self.h, self.offsets, self.target
+        base = len(path) - 1
+        for cell in path:
+            on_path[cell] = 1
+        next_dir = [0]
+        minimum = float('inf')
+        nodes = 0
+        found = None
+
+        while next_dir:
+            node = path[-1]
+            d = next_dir[-1]
+            if d == 0:  # first visit of this node
+                nodes += 1
+                if stop is not None and not nodes & 4095 and stop.is_set():
+                    break
+                g = len(path) - 1
+                f = g + h[node]
+                prune = f > threshold
+                if prune:
+                    minimum = min(minimum, f)
+                elif node == target:
+                    found = list(path)
+                    break
+                elif table is not None:
+                    best = table.get(node)
+                    if best is not None and (g > best[0] or (g == best[0] and best[1] == iteration)):
+                        prune = True
+                    elif best is not None or len(table) < max_table_size:
+                        table[node] = (g, iteration)
+                if not prune and depth_limit is not None and g - base == depth_limit:
+                    frontier.append(list(path))
+                    prune = True
+                if prune:
+                    path.pop()
+                    next_dir.pop()
+                    on_path[node] = 0
+                    continue
+            if d == 8:
+                path.pop()
+                next_dir.pop()
+                on_path[node] = 0
+                continue
+            next_dir[-1] = d + 1
+            neighbor = node + offsets[d]
+            if not blocked[neighbor] and not on_path[neighbor]:
+                path.append(neighbor)
+                next_dir.append(0)
+                on_path[neighbor] = 1
+
+        for cell in path:
+            on_path[cell] = 0
+        return found, minimum, nodes
+
+
+def ida_star_iterative(grid, start, goal, transposition_table=True, max_table_size=1_000_000, stats=None):
+    """
+    Iterative IDA* over a flattened grid, without per-node allocations.
+
+    Without the table it explores exactly the same tree, in the same order,
+    as ``ida_star``.
+
+    Args:
+        grid: 2D list representing the grid.
+        start: Tuple (x, y) for the start position.
+        goal: Tuple (x, y) for the goal position.
+        transposition_table: Remember the best g-value per cell (kept across
+            threshold iterations) and skip cells reached again with a worse
+            g, or with the same g earlier in this iteration.
+        max_table_size: Maximum number of cells remembered.
+        stats: Optional dict that receives "nodes" and "iterations".
+
+    Returns:
+        Path as a list of (x, y) tuples if found, else None.
+    """
+    flat = FlatGrid(grid, goal)
+    source = flat.index(start)
+    on_path = bytearray(len(flat.blocked))
+    table = {} if transposition_table else None
+    nodes = iteration = 0
+    threshold = flat.h[source]
+
+    while True:
+        iteration += 1
+        found, minimum, count = flat.bounded_search([source], threshold, on_path, table, iteration, max_table_size)
+        nodes += count
+        if found is not None or minimum == float('inf'):  # Path found or no path exists
+            break
+        threshold = minimum
+
+    if stats is not None:
+        stats["nodes"], stats["iterations"] = nodes, iteration
+    if found is None:
+        return None
+    return [flat.position(cell) for cell in found]
+
+
+class GridDomain:
+    """Grid pathfinding as seen by ``parallel_ida_star``; paths are lists of flat cells."""
+
+    def __init__(self, grid, start, goal):
+        self.flat = FlatGrid(grid, goal)
+        self.source = self.flat.index(start)
+        self.on_path = bytearray(len(self.flat.blocked))
+
+    def threshold(self):
+        return self.flat.h[self.source]
+
+    def expand(self, depth, threshold):
+        frontier = []
+        found, minimum, _ = self.flat.bounded_search([self.source], threshold, self.on_path,
+                                                     depth_limit=depth, frontier=frontier)
+        return found, frontier, minimum
+
+    def search(self, prefix, threshold, stop):
+        found, minimum, _ = self.flat.bounded_search(list(prefix), threshold, self.on_path, stop=stop)
+        return found, minimum
+
+    def solution(self, found):
+        return [self.flat.position(cell) for cell in found]
+
+
+class SlidingDomain:
+    """N x N sliding puzzle as seen by ``parallel_ida_star``; paths are lists of blank positions."""
+
+    def __init__(self, tiles):
+        puzzle = SlidingPuzzle(tiles)
+        # Memory-mapped, so all workers share one copy of the database pages
+        self.engine = PuzzleSearch(puzzle, load_pattern_databases(puzzle.n))
+
+    def threshold(self):
+        self.engine.reset()
+        return self.engine.h
+
+    def expand(self, depth, threshold):
+        self.engine.reset()
+        frontier = []
+        result = self.engine.search(threshold, depth_limit=depth, frontier=frontier)
+        if result is True:
+            return list(self.engine.blanks), [], float('inf')
+        return None, frontier, result
+
+    def search(self, prefix, threshold, stop):
+        self.engine.reset(prefix)
+        result = self.engine.search(threshold, stop=stop)
+        if result is True:
+            return list(self.engine.blanks), None
+        return None, result
+
+    def solution(self, blanks):
+        self.engine.reset(blanks)
+        return self.engine.path()
+
+
+_worker = {}
+
+
+def _init_worker(domain_type, args, stop):
+    _worker["domain"] = domain_type(*args)
+    _worker["stop"] = stop
+
+
+def _search_subtree(task):
+    prefix, threshold = task
+    return _worker["domain"].search(prefix, threshold, _worker["stop"])
+
+
+def parallel_ida_star(domain_type, args, workers=None, split_depth=4):
+    """
+    IDA* with each threshold iteration spread over a process pool.
+
+    Every iteration expands the tree ``split_depth`` levels deep in this
+    process, then searches the subtrees below those frontier nodes in the
+    workers under the same threshold. The smallest f-value any of them
+    exceeded becomes the next threshold. As soon as one worker reaches the
+    goal, a shared Event tells the others to give up and the pool is
+    terminated.
+
+    Args:
+        domain_type: ``GridDomain`` or ``SlidingDomain`` (built once per worker).
+        args: Constructor arguments for ``domain_type``.
+        workers: Number of worker processes (default: all cores).
+        split_depth: Depth of the frontier handed to the workers.
+
+    Returns:
+        The domain's solution path, or None if there is none.
+    """
+    workers = workers or os.cpu_count()
+    domain = domain_type(*args)
+    threshold = domain.threshold()
+    stop = multiprocessing.Event()
+
+    with multiprocessing.Pool(workers, _init_worker, (domain_type, args, stop)) as pool:
+        while True:
+            found, frontier, minimum = domain.expand(split_depth, threshold)
+            if found is None and frontier:
+                tasks = [(prefix, threshold) for prefix in frontier]
+                chunksize = max(1, len(tasks) // (workers * 8))
+                for sub_found, sub_minimum in pool.imap_unordered(_search_subtree, tasks, chunksize):
+                    if sub_found is not None:
+                        found = sub_found
+                        stop.set()
+                        break
+                    minimum = min(minimum, sub_minimum)
+            if found is not None:
+                return domain.solution(found)
+            if minimum == float('inf'):  # No path exists
+                return None
+            threshold = minimum
+
+
+def benchmark_parallel(core_counts=None, maze_size=21, puzzle=(6, 11, 10, 13, 0, 3, 4, 5, 9, 1, 15, 8, 14, 2, 12, 7)):
+    """Wall time and speedup of ``parallel_ida_star`` per worker count on a grid maze and a 15-puzzle."""
+    core_counts = core_counts or sorted({1, 2, 4, os.cpu_count()})
+    grid = maze_grid(maze_size)
+    goal = (maze_size - 1, maze_size - 1)
+    cases = [
+        (f"maze {maze_size}x{maze_size}", GridDomain, (grid, (0, 0), goal), 4),
+        ("15-puzzle", SlidingDomain, (puzzle,), 8),
+    ]
+    for label, domain_type, args, split_depth in cases:
+        print(label)
+        baseline = None
+        for workers in core_counts:
+            start = time.perf_counter()
+            path = parallel_ida_star(domain_type, args, workers, split_depth)
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            print(f"  {workers:>3} workers: {elapsed:8.3f}s, speedup {baseline / elapsed:5.2f}x, "
+                  f"path length {len(path) - 1 if path else None}")
+
+
+def open_grid(size, obstacle_ratio=0.1, seed=0):
+    """A size x size grid with scattered obstacles; the corners are kept free."""
+    rng = random.Random(seed)
+    grid = [[1 if rng.random() < obstacle_ratio else 0 for _ in range(size)] for _ in range(size)]
+    grid[0][0] = grid[size - 1][size - 1] = 0
+    return grid
+
+
+def maze_grid(size, seed=0):
+    """A size x size perfect maze (odd size) carved by randomized depth-first search."""
+    rng = random.Random(seed)
+    grid = [[1] * size for _ in range(size)]
+    grid[0][0] = 0
+    stack = [(0, 0)]
+    while stack:
+        x, y = stack[-1]
+        options = [(x + dx, y + dy, dx, dy) for dx, dy in [(-2, 0), (2, 0), (0, -2), (0, 2)]
+                   if 0 <= x + dx < size and 0 <= y + dy < size and grid[x + dx][y + dy]]
+        if not options:
+            stack.pop()
+            continue
+        nx, ny, dx, dy = rng.choice(options)
+        grid[x + dx // 2][y + dy // 2] = grid[nx][ny] = 0
+        stack.append((nx, ny))
+    return grid
+
+
+def benchmark_ida_star(size=201, small_maze_size=21, large_maze_size=61):
+    """
+    Node rate and total time of ``ida_star`` against ``ida_star_iterative`` on
+    open and maze grids. ``ida_star`` reports no node counts itself; it
+    explores the same tree as the iterative engine without a table, so that
+    count is used for its rate. Without a table both blow up exponentially on
+    cluttered grids and large mazes, so those only run with the table.
+    """
+    sys.setrecursionlimit(100000)
+    cases = [
+        (f"open {size}x{size}", open_grid(size, 0.0), True),
+        (f"open {size}x{size}, 5% obstacles", open_grid(size, 0.05), True),
+        (f"open {size}x{size}, 20% obstacles", open_grid(size, 0.2), False),
+        (f"maze {small_maze_size}x{small_maze_size}", maze_grid(small_maze_size), True),
+        (f"maze {large_maze_size}x{large_maze_size}", maze_grid(large_maze_size), False),
+    ]
+
+    for label, grid, baseline in cases:
+        goal = (len(grid) - 1, len(grid[0]) - 1)
+        print(label)
+        if baseline:
+            stats = {}
+            start = time.perf_counter()
+            ida_star_iterative(grid, (0, 0), goal, transposition_table=False, stats=stats)
+            plain_time = time.perf_counter() - start
+            start = time.perf_counter()
+            ida_star(grid, (0, 0), goal)
+            recursive_time = time.perf_counter() - start
+            print(f"  ida_star:             {recursive_time:9.3f}s {stats['nodes'] / recursive_time:>12,.0f} nodes/s")
+            print(f"  iterative, no table:  {plain_time:9.3f}s {stats['nodes'] / plain_time:>12,.0f} nodes/s")
+        stats = {}
+        start = time.perf_counter()
+        path = ida_star_iterative(grid, (0, 0), goal, stats=stats)
+        elapsed = time.perf_counter() - start
+        print(f"  iterative, table:     {elapsed:9.3f}s {stats['nodes'] / elapsed:>12,.0f} nodes/s "
+              f"({stats['nodes']:,} nodes, path {len(path) if path else None})")
+
+
 def visualize_grid(grid, path=None):
     """Visualize the grid and the path."""
     grid = np.array(grid)
@@ -81,6 +459,13 @@ def visualize_grid(grid, path=None):
 
 # Example Usage
 if __name__ == "__main__":
+    if "--benchmark" in sys.argv:
+        benchmark_ida_star()
+        sys.exit()
+    if "--benchmark-parallel" in sys.argv:
+        benchmark_parallel()
+        sys.exit()
+
     grid = [
         [0, 0, 0, 0, 0],
         [1, 1, 1, 1, 0],
@@ -0,0 +1,258 @@
+import hashlib
+import os
+import random
+
+import numpy as np
+
+from graph_store import CSRGraph, dijkstra_distances, id_adjacency, node_index
+
+LANDMARK_DIRECTORY = "landmarks"
+
+
+def graph_fingerprint(graph):
+    """Hash of a weighted graph's structure, used to tell whether saved tables still apply."""
+    digest = hashlib.blake2b(digest_size=16)
+    if isinstance(graph, CSRGraph):
+        for array in (graph.indptr, graph.indices, graph.weights):
+            if array is not None:
+                digest.update(np.ascontiguousarray(array).tobytes())
+    else:
+        for node, edges in graph.items():
+            digest.update(repr((node, edges)).encode())
+    return digest.hexdigest()
+
+
+class Landmarks:
+    """
+    ALT (A*, landmarks, triangle inequality) preprocessing.
+
+    ``to_landmark[i, v]`` is the distance from node id v to landmark i and
+    ``from_landmark[i, v]`` the distance from landmark i to v. For any
+    goal t, the triangle inequality gives the lower bound
+
+        d(v, t) >= max_i max(d(v, L_i) - d(t, L_i), d(L_i, t) - d(L_i, v))
+    """
+
+    def __init__(self, graph, landmarks, to_landmark, from_landmark):
+        self.graph = graph
+        self.nodes, self.index = node_index(graph)
+        self.landmarks = landmarks
+        self.to_landmark = to_landmark
+        self.from_landmark = from_landmark
+
+    @classmethod
+    def build(cls, graph, count=8, method="farthest", seed=0):
+        """
+        Pick ``count`` landmarks and run Dijkstra from and to each of them.
+
+        Args:
+            graph: Weighted adjacency dict of node -> [(neighbor, weight), ...]
+                or a CSRGraph.
+            method: "farthest" (each new landmark is the node farthest from
+                those already chosen) or "avoid" (Goldberg and Werneck: grow
+                a shortest-path tree from a random root and descend into the
+                subtree where the current landmarks give the worst bounds).
+        """
+        _, _, forward, backward = id_adjacency(graph)
+        n = graph.num_nodes if isinstance(graph, CSRGraph) else len(forward)
+        count = min(count, n)
+        rng = random.Random(seed)
+        landmarks, to_rows, from_rows = [], [], []
+
+        def add(landmark):
+            landmarks.append(landmark)
+            from_rows.append(dijkstra_distances(forward, n, landmark))
+            to_rows.append(dijkstra_distances(backward, n, landmark))
+
+        if method == "farthest":
+            # Start from the node farthest from a random one, then keep adding
+            # the node whose closest landmark is farthest away. Unreachable
+            # nodes count as farthest, so other components get landmarks too.
+            start = dijkstra_distances(forward, n, rng.randrange(n))
+            add(int(np.argmax(np.where(np.isinf(start), -1, start))))
+            closest = np.minimum(from_rows[0], to_rows[0])
+            while len(landmarks) < count:
+                candidate = int(np.argmax(np.where(np.isinf(closest), np.finfo(np.float64).max, closest)))
+                if closest[candidate] == 0:
+                    break  # every node is a landmark already
+                add(candidate)
+                closest = np.minimum(closest, np.minimum(from_rows[-1], to_rows[-1]))
+        elif method == "avoid":
+            while len(landmarks) < count:
+                root = rng.randrange(n)
+                dist, parent, order = dijkstra_distances(forward, n, root, parents=True)
+                if landmarks:
+                    bound = _lower_bounds(np.array(to_rows), np.array(from_rows), root, towards=False)
+                    with np.errstate(invalid="ignore"):
+                        weight = dist - bound
+                else:
+                    weight = dist.copy()
+                weight[~np.isfinite(weight)] = 0
+                size = weight.tolist()
+                blocked = [False] * n
+                for landmark in landmarks:
+                    blocked[landmark] = True
+                best_child = [-1] * n
+                best_size = [-1.0] * n
+                for v in reversed(order):
+                    if blocked[v]:
+                        size[v] = 0
+                    u = parent[v]
+                    if u >= 0:
+                        if blocked[v]:
+                            blocked[u] = True
+                        size[u] += size[v]
+                        if size[v] > best_size[u]:
+                            best_child[u], best_size[u] = v, size[v]
+                # Walk down the heaviest landmark-free subtree to a leaf
+                v = root
+                while best_child[v] >= 0 and best_size[v] > 0:
+                    v = best_child[v]
+                if v in landmarks:
+                    v = rng.randrange(n)
+                    if v in landmarks:
+                        continue
+                add(v)
+        else:
+            raise ValueError(f"Unknown landmark selection method: {method}")
+
+        return cls(graph, np.array(landmarks, dtype=np.int64), np.array(to_rows), np.array(from_rows))
+
+    def save(self, path, fingerprint=None):
+        np.savez(path, landmarks=self.landmarks, to_landmark=self.to_landmark, from_landmark=self.from_landmark,
+                 fingerprint=np.array(fingerprint or graph_fingerprint(self.graph)))
+
+    @classmethod
+    def load(cls, graph, path, fingerprint=None):
+        """Load saved tables for ``graph``; ValueError if they were built for a different graph."""
+        with np.load(path) as data:
+            if str(data["fingerprint"]) != (fingerprint or graph_fingerprint(graph)):
+                raise ValueError(f"{path} was built for a different graph")
+            return cls(graph, data["landmarks"], data["to_landmark"], data["from_landmark"])
+
+    @classmethod
+    def load_or_build(cls, graph, count=8, method="farthest", directory=LANDMARK_DIRECTORY, seed=0):
+        """Reuse the tables saved under ``directory`` for this graph and settings, building them if missing."""
+        fingerprint = graph_fingerprint(graph)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{fingerprint}-{method}-{count}-{seed}.npz")
+        if os.path.exists(path):
+            return cls.load(graph, path, fingerprint)
+        landmarks = cls.build(graph, count, method, seed)
+        landmarks.save(path, fingerprint)
+        return landmarks
+
+    def _id(self, node):
+        return self.graph.node_id(node) if self.index is None else self.index[node]
+
+    def bounds_to(self, goal):
+        """Lower bounds on the distance from every node id to the node ``goal`` (inf where it cannot be reached)."""
+        return _lower_bounds(self.to_landmark, self.from_landmark, self._id(goal))
+
+    def heuristic(self, goal):
+        """
+        The ALT heuristic towards ``goal`` in the form the A* functions take:
+        a list indexed by node id for a CSRGraph, a dict keyed by node otherwise.
+        """
+        values = self.bounds_to(goal).tolist()
+        if self.nodes is None:
+            return values
+        return dict(zip(self.nodes, values))
+
+    def bound(self, a, b):
+        """Lower bound on the distance from node ``a`` to node ``b`` (usable as ``heuristic(a, b)``)."""
+        a, b = self._id(a), self._id(b)
+        to_landmark, from_landmark = self.to_landmark, self.from_landmark
+        with np.errstate(invalid="ignore"):
+            bounds = np.fmax(to_landmark[:, a] - to_landmark[:, b], from_landmark[:, b] - from_landmark[:, a])
+        best = np.nanmax(bounds) if not np.isnan(bounds).all() else 0.0
+        return max(float(best), 0.0)
+
+
+def _lower_bounds(to_landmark, from_landmark, node, towards=True):
+    """
+    Vectorized ALT bounds on the distance from every node to ``node`` (or,
+    with ``towards=False``, from ``node`` to every node). NaN (no
+    information) becomes 0.
+    """
+    if towards:
+        to_landmark, from_landmark = from_landmark, to_landmark
+    # d(s, v) >= d(s, L) - d(v, L) and d(s, v) >= d(L, v) - d(L, s); swapping
+    # the two tables turns these into bounds on d(v, s)
+    with np.errstate(invalid="ignore"):
+        bounds = np.fmax(to_landmark[:, node:node + 1] - to_landmark,
+                         from_landmark - from_landmark[:, node:node + 1])
+        bounds = np.fmax.reduce(bounds, axis=0)
+    bounds[np.isnan(bounds)] = 0
+    return np.maximum(bounds, 0)
+
+
+def grid_graph(size, max_weight=10, seed=0):
+    """Undirected 4-connected size x size grid CSRGraph with random weights, a stand-in for a road network."""
+    rng = np.random.default_rng(seed)
+    ids = np.arange(size * size).reshape(size, size)
+    sources = np.concatenate([ids[:, :-1].ravel(), ids[:-1, :].ravel()])
+    targets = np.concatenate([ids[:, 1:].ravel(), ids[1:, :].ravel()])
+    weights = rng.integers(1, max_weight + 1, len(sources))
+    labels = [f"{x},{y}" for x in range(size) for y in range(size)]
+    return CSRGraph.from_edges(sources, targets, weights, labels, directed=False)
+
+
+def benchmark(size=250, counts=(8, 16), queries=20, seed=0):
+    """Expanded nodes and query time of Dijkstra against ALT, plus preprocessing and reload time."""
+    import tempfile
+    import time
+
+    from indexed_heap import indexed_best_first_search
+
+    graph = grid_graph(size, seed=seed)
+    adjacency = graph.weighted_view()
+    rng = random.Random(seed + 1)
+    pairs = [(rng.randrange(graph.num_nodes), rng.randrange(graph.num_nodes)) for _ in range(queries)]
+    print(f"Weighted grid: {graph.num_nodes:,} nodes, {graph.num_edges:,} edges, {queries} queries")
+
+    start = time.perf_counter()
+    expected = [indexed_best_first_search(adjacency, s, t) for s, t in pairs]
+    elapsed = time.perf_counter() - start
+    baseline = sum(len(explored) for _, explored, _ in expected) / queries
+    print(f"  {'Dijkstra':<15} {baseline:10,.0f} nodes/query {1000 * elapsed / queries:8.1f} ms/query")
+
+    directory = tempfile.mkdtemp(prefix="landmarks-")
+    for method in ("farthest", "avoid"):
+        for count in counts:
+            start = time.perf_counter()
+            landmarks = Landmarks.load_or_build(graph, count, method, directory, seed)
+            built = time.perf_counter() - start
+            start = time.perf_counter()
+            Landmarks.load_or_build(graph, count, method, directory, seed)
+            reloaded = time.perf_counter() - start
+
+            expanded = 0
+            start = time.perf_counter()
+            for (s, t), (cost, _, _) in zip(pairs, expected):
+                h = landmarks.heuristic(graph.label(t))
+                alt_cost, explored, _ = indexed_best_first_search(adjacency, s, t, h)
+                assert alt_cost == cost
+                expanded += len(explored)
+            elapsed = time.perf_counter() - start
+            print(f"  ALT {method:<8} {count:>2} {expanded / queries:10,.0f} nodes/query "
+                  f"{1000 * elapsed / queries:8.1f} ms/query ({baseline * queries / expanded:4.1f}x fewer), "
+                  f"built in {built:5.1f}s, reloaded in {1000 * reloaded:5.1f}ms")
+
+
+if __name__ == "__main__":
+    import sys
+
+    if "--benchmark" in sys.argv:
+        benchmark()
+        sys.exit()
+
+    graph = {
+        "A": [("B", 1), ("C", 4)],
+        "B": [("C", 2), ("D", 5)],
+        "C": [("D", 1)],
+        "D": []
+    }
+    landmarks = Landmarks.build(graph, count=2)
+    print("Landmarks:", [landmarks.nodes[i] for i in landmarks.landmarks])
+    print("Heuristic towards D:", landmarks.heuristic("D"))
@@ -1,70 +1,259 @@
+import heapq
+import multiprocessing
+import os
 import random
+import sys
+import time
+
 import numpy as np
 
+from queens_board import QueensBoard, min_conflicts
+
 def count_conflicts(state):
     """Calculate the number of conflicts for a given state."""
-    conflicts = 0
-    n = len(state)
-    for i in range(n):
-        for j in range(i + 1, n):
-            if state[i] == state[j] or abs(state[i] - state[j]) == abs(i - j):
-                conflicts += 1
-    return conflicts
-
-def generate_successors(state):
-    """Generate all possible successors of the current state."""
-    successors = []
-    n = len(state)
-    for col in range(n):
-        for row in range(n):
-            if state[col] != row:
-                new_state = list(state)
-                new_state[col] = row
-                successors.append(new_state)
-    return successors
-
-def local_beam_search(n, k, max_iterations):
+    return QueensBoard(state).conflicts
+
+def local_beam_search(n, k, max_iterations, samples=None, rng=None):
     """
     Perform Local Beam Search to solve the N-Queens Problem.
+
+    Successors are sampled rather than enumerated: each iteration scores
+    ``samples`` random single-queen moves per beam state by their O(1)
+    conflict delta, and only the k chosen successors are copied.
     
     Args:
         n: Size of the chessboard (N x N).
         k: Number of states to maintain at each step.
         max_iterations: Maximum number of iterations to perform.
+        samples: Moves sampled per state and iteration (default 2 * n).
+        rng: random.Random to use.
     
     Returns:
         Solution state if found, else None.
     """
+    rng = rng or random.Random()
+    samples = 2 * n if samples is None else samples
+
     # Initialize k random states
-    states = [random.sample(range(n), n) for _ in range(k)]
+    beam = _random_beam(n, k, rng)
     
     for iteration in range(max_iterations):
-        # Calculate conflicts for all states
-        state_conflicts = [(state, count_conflicts(state)) for state in states]
-        
-        # Sort states by number of conflicts (ascending order)
-        state_conflicts.sort(key=lambda x: x[1])
-        
         # If a solution is found (conflicts = 0), return it
-        if state_conflicts[0][1] == 0:
-            return state_conflicts[0][0]
-        
-        # Keep the k best states
-        states = [state for state, _ in state_conflicts[:k]]
-        
-        # Generate all successors of the k best states
-        successors = []
-        for state in states:
-            successors.extend(generate_successors(state))
-        
-        # Select the k best successors based on conflicts
-        successor_conflicts = [(state, count_conflicts(state)) for state in successors]
-        successor_conflicts.sort(key=lambda x: x[1])
-        states = [state for state, _ in successor_conflicts[:k]]
+        best = min(beam, key=lambda board: board.conflicts)
+        if best.conflicts == 0:
+            return best.rows
+
+        # Keep the k best successors; the random key breaks ties between
+        # equally good moves
+        moves = _sample_moves(beam, samples, rng)
+        chosen = heapq.nsmallest(k, moves, key=lambda move: (move[0], rng.random()))
+        beam = _successors(beam, chosen) or beam
     
     # If no solution is found within max_iterations, return None
     return None
 
+def _random_beam(n, k, rng):
+    """k boards with one queen per row and column, in random order."""
+    return [QueensBoard(rng.sample(range(n), n)) for _ in range(k)]
+
+def _sample_moves(beam, samples, rng):
+    """
+    (conflicts, state index, col, row) of ``samples`` random single-queen
+    moves per beam state, scored by their delta without building them.
+    """
+    moves = set()
+    for b, board in enumerate(beam):
+        n = board.n
+        for _ in range(samples):
+            col, row = rng.randrange(n), rng.randrange(n)
+            if row != board.rows[col]:
+                moves.add((board.conflicts + board.delta(col, row), b, col, row))
+    return list(moves)
+
+def _successors(beam, chosen):
+    """Copy and apply each chosen move."""
+    states = []
+    for _, b, col, row in chosen:
+        board = beam[b].copy()
+        board.move(col, row)
+        states.append(board)
+    return states
+
+def _select(moves, k, selection, tournament_size, pool, rng):
+    """
+    k moves: the best one, then k - 1 drawn with replacement from the best
+    ``pool * k`` by tournament (best of ``tournament_size``) or in
+    proportion to the fitness 1 / (1 + conflicts above the best). Most
+    sampled moves add conflicts, so without the pool the beam drifts.
+    """
+    moves = heapq.nsmallest(pool * k, moves, key=lambda move: (move[0], rng.random()))
+    best = moves[0]
+    if selection == "tournament":
+        size = min(tournament_size, len(moves))
+        picks = [min(rng.sample(moves, size), key=lambda move: move[0]) for _ in range(k - 1)]
+    elif selection == "proportional":
+        picks = rng.choices(moves, weights=[1 / (1 + move[0] - best[0]) for move in moves], k=k - 1)
+    else:
+        raise ValueError(f"Unknown selection {selection!r}")
+    return [best] + picks
+
+class SharedBest:
+    """
+    Best board found by any process, in a shared array laid out as
+    [conflicts, solved flag, rows...]. Pass ``array`` to attach to one
+    created in another process.
+    """
+
+    def __init__(self, n, array=None):
+        self.n = n
+        if array is None:
+            array = multiprocessing.Array("q", n + 2)
+            array[0] = n * n  # more than any board's conflicts
+        self.array = array
+
+    @property
+    def solved(self):
+        return bool(self.array[1])
+
+    def offer(self, board):
+        """Publish ``board`` if it beats the shared best."""
+        with self.array.get_lock():
+            if board.conflicts < self.array[0]:
+                self.array[0] = board.conflicts
+                self.array[1] = board.conflicts == 0
+                self.array[2:] = board.rows
+
+    def fetch(self):
+        """(conflicts, rows) of the shared best; rows is None before anything was offered."""
+        with self.array.get_lock():
+            conflicts = self.array[0]
+            return conflicts, self.array[2:] if conflicts < self.n * self.n else None
+
+def stochastic_beam_search(n, k=10, samples=None, selection="tournament", tournament_size=3, pool=2,
+                           patience=None, budget=None, max_iterations=None, exchange=None, exchange_every=20,
+                           rng=None, stats=None):
+    """
+    Stochastic Local Beam Search for N-Queens.
+
+    Like ``local_beam_search``, but the next beam is drawn at random by
+    ``_select`` (keeping the best move), so equally good states do not
+    crowd out everything else. A beam whose best state has not improved for
+    ``patience`` iterations restarts from random states.
+
+    Args:
+        n, k, samples: As for ``local_beam_search``.
+        selection: "tournament" or "proportional".
+        tournament_size: Moves per tournament.
+        pool: Selection draws from the best ``pool * k`` sampled moves.
+        patience: Iterations without improvement before a restart (default 5 * n).
+        budget: Wall-clock seconds before giving up.
+        max_iterations: Iterations before giving up (unlimited by default).
+        exchange: SharedBest of several searches. Every ``exchange_every``
+            iterations the beam offers its best state and takes the shared
+            best in place of its worst one; it stops once any search solved.
+        rng: random.Random to use.
+        stats: Optional dict that receives "iterations" and "restarts".
+
+    Returns:
+        Solution state if found, else None.
+    """
+    rng = rng or random.Random()
+    samples = 2 * n if samples is None else samples
+    patience = 5 * n if patience is None else patience
+    deadline = None if budget is None else time.perf_counter() + budget
+    beam = _random_beam(n, k, rng)
+    best_conflicts, since_improved = min(board.conflicts for board in beam), 0
+    iteration = restarts = 0
+    solution = None
+
+    while max_iterations is None or iteration < max_iterations:
+        best = min(beam, key=lambda board: board.conflicts)
+        if best.conflicts == 0:
+            solution = best.rows
+            break
+        if deadline is not None and time.perf_counter() > deadline:
+            break
+        iteration += 1
+
+        if exchange is not None and iteration % exchange_every == 0:
+            exchange.offer(best)
+            if exchange.solved:
+                break
+            conflicts, rows = exchange.fetch()
+            worst = max(range(k), key=lambda b: beam[b].conflicts)
+            if rows is not None and conflicts < beam[worst].conflicts:
+                beam[worst] = QueensBoard(rows)
+
+        if best.conflicts < best_conflicts:
+            best_conflicts, since_improved = best.conflicts, 0
+        else:
+            since_improved += 1
+        if since_improved > patience:
+            beam = _random_beam(n, k, rng)
+            best_conflicts, since_improved = min(board.conflicts for board in beam), 0
+            restarts += 1
+            continue
+
+        moves = _sample_moves(beam, samples, rng)
+        if moves:
+            beam = _successors(beam, _select(moves, k, selection, tournament_size, pool, rng))
+
+    if exchange is not None and solution is not None:
+        exchange.offer(QueensBoard(solution))
+    if stats is not None:
+        stats["iterations"] = stats.get("iterations", 0) + iteration
+        stats["restarts"] = stats.get("restarts", 0) + restarts
+    return solution
+
+_worker = {}
+
+def _init_worker(array, n):
+    _worker["shared"] = SharedBest(n, array)
+
+def _run_group(task):
+    """One independent beam group, coordinated with the others through the shared best."""
+    seed, n, options = task
+    stats = {}
+    solution = stochastic_beam_search(n, exchange=_worker["shared"], rng=random.Random(seed), stats=stats,
+                                      **options)
+    return solution, stats
+
+def parallel_beam_search(n, workers=None, groups=None, budget=10.0, seed=0, stats=None, **options):
+    """
+    Run ``groups`` stochastic beam searches (default one per worker) in a
+    process pool until one solves the board or the wall-clock ``budget``
+    runs out. The groups share their best state through a SharedBest.
+
+    Args:
+        n: Size of the chessboard.
+        workers: Worker processes (default: all cores).
+        groups: Independent beam groups.
+        budget: Wall-clock seconds for every group.
+        seed: Seed of the first group; group g uses seed + g.
+        stats: Optional dict that receives "iterations" and "restarts", summed
+            over the groups that finished.
+        **options: Passed on to ``stochastic_beam_search``.
+
+    Returns:
+        Solution state if found, else None.
+    """
+    workers = workers or os.cpu_count()
+    groups = groups or workers
+    shared = SharedBest(n)
+    options = dict(options, budget=budget)
+    tasks = [(seed + g, n, options) for g in range(groups)]
+    solution = None
+    with multiprocessing.Pool(workers, _init_worker, (shared.array, n)) as pool:
+        # Returning early terminates groups that are still running
+        for rows, group_stats in pool.imap_unordered(_run_group, tasks):
+            if stats is not None:
+                for key, value in group_stats.items():
+                    stats[key] = stats.get(key, 0) + value
+            if rows is not None:
+                solution = rows
+                break
+    return solution
+
 def visualize_solution(state):
     """Visualize the N-Queens solution on a chessboard."""
     if not state:
@@ -79,6 +268,38 @@ def visualize_solution(state):
     for row in board:
         print(" ".join("Q" if cell else "." for cell in row))
 
+def benchmark(seed=0):
+    """Local beam search at growing board sizes, then min-conflicts on a million queens."""
+    rng = random.Random(seed)
+    for n in (8, 20, 50, 100, 200):
+        start = time.perf_counter()
+        solution = local_beam_search(n, k=10, max_iterations=20 * n, rng=rng)
+        elapsed = time.perf_counter() - start
+        found = solution is not None and count_conflicts(solution) == 0
+        print(f"beam search, n = {n:>9,}: {elapsed:6.2f}s, {'solved' if found else 'not solved'}")
+    start = time.perf_counter()
+    solution = min_conflicts(1_000_000, rng=rng)
+    elapsed = time.perf_counter() - start
+    print(f"min-conflicts, n = {1_000_000:>7,}: {elapsed:6.2f}s, "
+          f"{'solved' if solution and count_conflicts(solution) == 0 else 'not solved'}")
+
+def benchmark_parallel(sizes=(100, 200), cores=(1, 2, 4), trials=4, budget=10.0, selection="tournament"):
+    """Success rate and time to solution of ``parallel_beam_search`` by board size and core count."""
+    print(f"{selection} selection, {trials} trials of at most {budget:.0f}s, {os.cpu_count()} cores available")
+    print(f"{'n':>6} {'cores':>6} {'solved':>7} {'median s':>9} {'max s':>7}")
+    for n in sizes:
+        for workers in cores:
+            times = []
+            for trial in range(trials):
+                start = time.perf_counter()
+                solution = parallel_beam_search(n, workers, budget=budget, seed=1000 * trial, selection=selection)
+                if solution is not None:
+                    assert count_conflicts(solution) == 0
+                    times.append(time.perf_counter() - start)
+            median = f"{sorted(times)[len(times) // 2]:9.2f}" if times else f"{'-':>9}"
+            worst = f"{max(times):7.2f}" if times else f"{'-':>7}"
+            print(f"{n:>6} {workers:>6} {len(times) / trials:>7.0%} {median} {worst}")
+
 # Main function
 def main():
     n = 8  # Size of the chessboard
@@ -94,4 +315,12 @@ def main():
         print("No solution found within the given iterations.")
 
 # Run the main function
-main()
+if __name__ == "__main__":
+    if "--benchmark" in sys.argv:
+        benchmark()
+        sys.exit()
+    if "--parallel" in sys.argv:
+        for selection in ("tournament", "proportional"):
+            benchmark_parallel(selection=selection)
+        sys.exit()
+    main()
@@ -1,3 +1,15 @@
+import argparse
+import multiprocessing
+import os
+import time
+
+# Number of distinct solutions for each board size (OEIS A000170)
+KNOWN_SOLUTION_COUNTS = {
+    1: 1, 2: 0, 3: 0, 4: 2, 5: 10, 6: 4, 7: 40, 8: 92, 9: 352, 10: 724,
+    11: 2680, 12: 14200, 13: 73712, 14: 365596, 15: 2279184,
+    16: 14772512, 17: 95815104, 18: 666090624,
+}
+
 def is_safe(board, row, col, n):
     """
     Checks if placing a queen at board[row][col] is safe.
@@ -53,6 +65,143 @@ def n_queens(n):
         return
     print_solution(board)
 
+def count_completions(full, cols, left, right):
+    """
+    Counts the ways to fill the remaining rows of a bitboard.
+
+    ``cols`` holds the occupied columns, ``left``/``right`` the squares of the
+    next row attacked along each diagonal direction, all as n-bit ints. The
+    search keeps its own stack instead of recursing, and the last row is
+    counted with a popcount instead of being pushed.
+    """
+    rows = (full ^ cols).bit_count()  # rows still empty
+    if rows < 2:
+        return (full & ~(cols | left | right)).bit_count() if rows else 1
+    count = 0
+    stack = [(cols, left, right, rows)]
+    pop, push = stack.pop, stack.append
+    while stack:
+        cols, left, right, rows = pop()
+        free = full & ~(cols | left | right)
+        if rows == 2:
+            while free:
+                bit = free & -free
+                free ^= bit
+                count += (full & ~(cols | bit | ((left | bit) << 1) | ((right | bit) >> 1))).bit_count()
+            continue
+        rows -= 1
+        while free:
+            bit = free & -free  # lowest free column
+            free ^= bit
+            push((cols | bit, ((left | bit) << 1) & full, (right | bit) >> 1, rows))
+    return count
+
+
+def split_prefixes(n, depth):
+    """
+    (weight, cols, left, right) for every safe placement of the first
+    ``depth`` rows.
+
+    The left-right mirror maps solutions with the first queen in column c onto
+    those with it in column n - 1 - c, so row 0 only takes the left half of
+    the board, with weight 2, plus the middle column once for odd n.
+    """
+    full = (1 << n) - 1
+    prefixes = []
+    for col in range(n // 2 + n % 2):
+        bit = 1 << col
+        weight = 2 if col < n // 2 else 1
+        prefixes.append((weight, bit, (bit << 1) & full, bit >> 1))
+    for _ in range(min(depth, n) - 1):
+        deeper = []
+        for weight, cols, left, right in prefixes:
+            free = full & ~(cols | left | right)
+            while free:
+                bit = free & -free
+                free ^= bit
+                deeper.append((weight, cols | bit, ((left | bit) << 1) & full, (right | bit) >> 1))
+        prefixes = deeper
+    return prefixes
+
+
+def _count_prefix(task):
+    full, weight, cols, left, right = task
+    return weight * count_completions(full, cols, left, right)
+
+
+def count_n_queens(n, workers=None, depth=3):
+    """
+    Counts all N-Queens solutions on a bitboard.
+
+    The first ``depth`` rows are placed up front (see ``split_prefixes``),
+    giving about a thousand prefixes for n = 16, and each prefix's
+    completions are counted as a separate task on a process pool so the
+    load stays even across workers.
+
+    Every node is still visited in pure Python and the work grows about 6x
+    per n. On one core n = 14 takes about 9 s and n = 16 about 5.5 minutes;
+    n = 18 would take roughly 4 hours, so it is only practical spread over
+    many cores.
+    """
+    if n < 1:
+        return 0
+    full = (1 << n) - 1
+    tasks = [(full, *prefix) for prefix in split_prefixes(n, depth)]
+
+    if workers == 1 or n < 8:
+        return sum(map(_count_prefix, tasks))
+    with multiprocessing.Pool(workers or os.cpu_count()) as pool:
+        return sum(pool.imap_unordered(_count_prefix, tasks, chunksize=4))
+
+
+def enumerate_n_queens(n):
+    """
+    Yields every solution as a list of queen columns, one per row.
+    """
+    full = (1 << n) - 1
+    placement = []
+
+    def place(cols, left, right):
+        if cols == full:
+            yield list(placement)
+            return
+        free = full & ~(cols | left | right)
+        while free:
+            bit = free & -free
+            free ^= bit
+            placement.append(bit.bit_length() - 1)
+            yield from place(cols | bit, ((left | bit) << 1) & full, (right | bit) >> 1)
+            placement.pop()
+
+    yield from place(0, 0, 0)
+
+
+def benchmark_counts(max_n=12, workers=None):
+    """
+    Counts solutions for n = 1..max_n, checks them against the known counts
+    and prints the time taken for each n.
+    """
+    for n in range(1, max_n + 1):
+        start = time.perf_counter()
+        count = count_n_queens(n, workers)
+        elapsed = time.perf_counter() - start
+        expected = KNOWN_SOLUTION_COUNTS.get(n)
+        status = "ok" if expected is None or count == expected else f"MISMATCH (expected {expected})"
+        print(f"n={n:>2}: {count:>12,} solutions in {elapsed:8.3f}s  {status}")
+
+
 # Example usage
-n = 8  # Change this for different board sizes
-n_queens(n)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="N-Queens via backtracking")
+    parser.add_argument("n", nargs="?", type=int, default=8, help="board size")
+    parser.add_argument("--count", action="store_true", help="count every solution with the parallel bitboard solver")
+    parser.add_argument("--benchmark", action="store_true", help="count and time all sizes from 1 to n")
+    parser.add_argument("--workers", type=int, help="worker processes (default: all cores)")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark_counts(args.n, args.workers)
+    elif args.count:
+        print(f"{args.n}-Queens has {count_n_queens(args.n, args.workers)} solutions")
+    else:
+        n_queens(args.n)
@@ -1,8 +1,25 @@
+import argparse
+import contextlib
+import itertools
+import json
+import multiprocessing
+import os
+import queue
+import random
+import sys
+import time
+from collections import deque
+
 import matplotlib.pyplot as plt
 import numpy as np
 
 class Puzzle:
-    """Abstract base class for puzzles."""
+    """Abstract base class for puzzles.
+
+    Besides the readable list-based states, every puzzle exposes a packed
+    key representation (``encode``/``decode``) that is hashable and cheap to
+    expand. ``solve_puzzle`` works on keys only.
+    """
 
     def get_initial_state(self):
         raise NotImplementedError
@@ -16,9 +33,40 @@ class Puzzle:
     def visualize(self, state):
         raise NotImplementedError
 
+    def encode(self, state):
+        """Pack a state into a compact hashable key."""
+        raise NotImplementedError
+
+    def decode(self, key):
+        """Unpack a key produced by ``encode`` back into a state."""
+        raise NotImplementedError
+
+    def is_goal_key(self, key):
+        return self.is_goal_state(self.decode(key))
+
+    def get_key_successors(self, key):
+        """Successor keys of a key; subclasses override this with a packed version."""
+        return [self.encode(s) for s in self.get_successors(self.decode(key))]
+
 
 class EightPuzzle(Puzzle):
-    """8-Puzzle Solver with Visualization."""
+    """8-Puzzle Solver with Visualization.
+
+    Packed keys hold one tile per 4-bit nibble (cell ``i`` at bits ``4*i``)
+    and the blank's cell index in the tenth nibble.
+    """
+
+    # Cells reachable by the blank from each cell of the 3x3 board
+    NEIGHBORS = tuple(
+        tuple(
+            (i + di) * 3 + (j + dj)
+            for di, dj in [(0, 1), (1, 0), (0, -1), (-1, 0)]
+            if 0 <= i + di < 3 and 0 <= j + dj < 3
+        )
+        for i in range(3)
+        for j in range(3)
+    )
+    BLANK_SHIFT = 36
 
     def __init__(self, initial_state):
         self.initial_state = initial_state
@@ -27,6 +75,7 @@ class EightPuzzle(Puzzle):
             [4, 5, 6],
             [7, 8, 0],  # 0 represents the blank space
         ]
+        self.goal_key = self.encode(self.goal_state)
 
     def get_initial_state(self):
         return self.initial_state
@@ -74,13 +123,45 @@ class EightPuzzle(Puzzle):
         plt.title("8-Puzzle Solution")
         plt.show()
 
+    def encode(self, state):
+        key = 0
+        for i, tile in enumerate(t for row in state for t in row):
+            key |= tile << (4 * i)
+            if tile == 0:
+                key |= i << self.BLANK_SHIFT
+        return key
+
+    def decode(self, key):
+        return [[(key >> (4 * (3 * i + j))) & 0xF for j in range(3)] for i in range(3)]
+
+    def is_goal_key(self, key):
+        return key == self.goal_key
+
+    def get_key_successors(self, key):
+        blank = key >> self.BLANK_SHIFT
+        board = key & ((1 << self.BLANK_SHIFT) - 1)
+        successors = []
+        for cell in self.NEIGHBORS[blank]:
+            # The blank nibble is zero, so moving a tile is one subtract and one add
+            tile = (board >> (4 * cell)) & 0xF
+            moved = board - (tile << (4 * cell)) + (tile << (4 * blank))
+            successors.append(moved | (cell << self.BLANK_SHIFT))
+        return successors
+
 
 class NQueens(Puzzle):
-    """N-Queens Solver with Visualization."""
+    """N-Queens Solver with Visualization.
+
+    Packed keys are ``(row, cols, left_diagonals, right_diagonals, placement)``
+    tuples: three attack bitmasks plus the placed columns packed into a single
+    int, ``bits`` bits per row.
+    """
 
     def __init__(self, n):
         self.n = n
         self.solution = []
+        self.full_mask = (1 << n) - 1
+        self.bits = max(1, (n - 1).bit_length())
 
     def get_initial_state(self):
         return []
@@ -121,9 +202,63 @@ class NQueens(Puzzle):
         plt.title(f"{self.n}-Queens Solution")
         plt.show()
 
+    def encode(self, state):
+        cols = left = right = placement = 0
+        for row, col in enumerate(state):
+            bit = 1 << col
+            cols |= bit
+            left = ((left | bit) << 1) & self.full_mask
+            right = (right | bit) >> 1
+            placement |= col << (self.bits * row)
+        return (len(state), cols, left, right, placement)
+
+    def decode(self, key):
+        row, _, _, _, placement = key
+        mask = (1 << self.bits) - 1
+        return [(placement >> (self.bits * r)) & mask for r in range(row)]
+
+    def is_goal_key(self, key):
+        return key[0] == self.n
+
+    def get_key_successors(self, key):
+        row, cols, left, right, placement = key
+        if row >= self.n:
+            return []
+
+        successors = []
+        free = ~(cols | left | right) & self.full_mask
+        while free:
+            bit = free & -free
+            free ^= bit
+            successors.append((
+                row + 1,
+                cols | bit,
+                ((left | bit) << 1) & self.full_mask,
+                (right | bit) >> 1,
+                placement | ((bit.bit_length() - 1) << (self.bits * row)),
+            ))
+        return successors
+
+
+def sudoku_peers():
+    """Indices of the 20 cells sharing a row, column or box with each of the 81 cells."""
+    peers = []
+    for r in range(9):
+        for c in range(9):
+            sr, sc = 3 * (r // 3), 3 * (c // 3)
+            cells = {r * 9 + i for i in range(9)} | {i * 9 + c for i in range(9)}
+            cells |= {i * 9 + j for i in range(sr, sr + 3) for j in range(sc, sc + 3)}
+            cells.discard(r * 9 + c)
+            peers.append(tuple(sorted(cells)))
+    return tuple(peers)
+
 
 class Sudoku(Puzzle):
-    """Sudoku Solver with Visualization."""
+    """Sudoku Solver with Visualization.
+
+    Packed keys are 81-byte ``bytes`` objects, one digit per cell in row-major
+    order with 0 for an empty cell.
+    """
 
     def __init__(self, initial_state):
         self.initial_state = initial_state
@@ -169,29 +304,359 @@ class Sudoku(Puzzle):
         plt.title("Sudoku Solution")
         plt.show()
 
+    def encode(self, state):
+        return bytes(num for row in state for num in row)
 
-def solve_puzzle(puzzle):
-    """Solve a puzzle using BFS."""
-    from collections import deque
+    def decode(self, key):
+        return [list(key[r * 9:r * 9 + 9]) for r in range(9)]
+
+    def is_goal_key(self, key):
+        return 0 not in key
+
+    def get_key_successors(self, key):
+        cell = key.find(0)
+        if cell < 0:
+            return []
+        used = {key[p] for p in SUDOKU_PEERS[cell]}
+        head, tail = key[:cell], key[cell + 1:]
+        return [head + bytes((num,)) + tail for num in range(1, 10) if num not in used]
+
+
+SUDOKU_PEERS = sudoku_peers()
+
+
+class SearchLimitExceeded(Exception):
+    """Raised by ``solve_puzzle`` when its node budget or time limit runs out."""
+
+    def __init__(self, reason, expansions):
+        super().__init__(f"{reason} after {expansions} expansions")
+        self.reason = reason
+        self.expansions = expansions
 
-    initial_state = puzzle.get_initial_state()
-    queue = deque([initial_state])
-    visited = set()
+
+def solve_puzzle(puzzle, max_nodes=None, time_limit=None):
+    """
+    Solve a puzzle using BFS over packed state keys.
+
+    Args:
+        puzzle: Puzzle instance.
+        max_nodes: Optional cap on the number of expanded states.
+        time_limit: Optional wall-clock limit in seconds.
+
+    Returns:
+        The goal state, or None if the puzzle has no solution.
+
+    Raises:
+        SearchLimitExceeded: if ``max_nodes`` or ``time_limit`` is reached first.
+    """
+    deadline = time.perf_counter() + time_limit if time_limit is not None else None
+    start = puzzle.encode(puzzle.get_initial_state())
+    queue = deque([start])
+    visited = {start}
+    expansions = 0
 
     while queue:
+        key = queue.popleft()
+        if puzzle.is_goal_key(key):
+            return puzzle.decode(key)
+
+        expansions += 1
+        if max_nodes is not None and expansions > max_nodes:
+            raise SearchLimitExceeded("node_budget", expansions - 1)
+        # Reading the clock is cheap but not free, so only do it every 1024 nodes
+        if deadline is not None and not expansions & 1023 and time.perf_counter() > deadline:
+            raise SearchLimitExceeded("timeout", expansions)
+
+        for successor in puzzle.get_key_successors(key):
+            if successor not in visited:
+                visited.add(successor)
+                queue.append(successor)
+
+    return None
+
+
+# One of the two hardest 8-puzzle instances (31 moves from the goal)
+DEEP_8PUZZLE = [
+    [8, 6, 7],
+    [2, 5, 4],
+    [3, 0, 1],
+]
+
+
+def benchmark_eight_puzzle(initial_state=DEEP_8PUZZLE, max_expansions=100000):
+    """
+    Compare expansions/sec of the list-and-string BFS against the packed-key BFS.
+
+    Both loops run the same breadth-first search with a closed set and stop
+    after ``max_expansions`` expansions, so only the per-node cost differs.
+    """
+    puzzle = EightPuzzle(initial_state)
+
+    start_time = time.perf_counter()
+    queue = deque([initial_state])
+    visited = {str(initial_state)}
+    expansions = 0
+    while queue and expansions < max_expansions:
         state = queue.popleft()
+        expansions += 1
         if puzzle.is_goal_state(state):
-            return state
-
-        visited.add(str(state))
+            break
         for successor in puzzle.get_successors(state):
             if str(successor) not in visited:
+                visited.add(str(successor))
                 queue.append(successor)
-
-    return None
+    list_rate = expansions / (time.perf_counter() - start_time)
+
+    start_time = time.perf_counter()
+    start = puzzle.encode(initial_state)
+    queue = deque([start])
+    visited = {start}
+    expansions = 0
+    while queue and expansions < max_expansions:
+        key = queue.popleft()
+        expansions += 1
+        if puzzle.is_goal_key(key):
+            break
+        for successor in puzzle.get_key_successors(key):
+            if successor not in visited:
+                visited.add(successor)
+                queue.append(successor)
+    packed_rate = expansions / (time.perf_counter() - start_time)
+
+    print(f"List/str states: {list_rate:,.0f} expansions/sec")
+    print(f"Packed keys:     {packed_rate:,.0f} expansions/sec ({packed_rate / list_rate:.1f}x)")
+    return list_rate, packed_rate
+
+
+def _field(spec, key):
+    if key not in spec:
+        raise ValueError(f"{spec['type']} spec has no {key!r}")
+    return spec[key]
+
+
+def _grid(state, size, name, values):
+    """Check that ``state`` is a ``size`` x ``size`` list of ints drawn from ``values``."""
+    if (not isinstance(state, list) or len(state) != size
+            or any(not isinstance(row, list) or len(row) != size for row in state)):
+        raise ValueError(f"{name} state must be a {size}x{size} list of lists")
+    if any(type(num) is not int or num not in values for row in state for num in row):
+        raise ValueError(f"{name} cells must be ints in {min(values)}-{max(values)}")
+    return state
+
+
+def _eight_puzzle(spec):
+    state = _grid(_field(spec, "state"), 3, "EightPuzzle", range(9))
+    if sorted(num for row in state for num in row) != list(range(9)):
+        raise ValueError("EightPuzzle state must hold each of 0-8 exactly once")
+    return EightPuzzle(state)
+
+
+def _n_queens(spec):
+    n = _field(spec, "n")
+    if type(n) is not int or n < 0:
+        raise ValueError(f"NQueens n must be a non-negative int, got {n!r}")
+    return NQueens(n)
+
+
+def _sudoku(spec):
+    state = _field(spec, "state")
+    if isinstance(state, str):
+        if len(state) != 81 or any(ch not in "0123456789." for ch in state):
+            raise ValueError("Sudoku string must be 81 characters of 0-9 or '.'")
+        state = [[0 if ch == "." else int(ch) for ch in state[r * 9:r * 9 + 9]] for r in range(9)]
+    return Sudoku(_grid(state, 9, "Sudoku", range(10)))
+
+
+PUZZLE_TYPES = {
+    "EightPuzzle": _eight_puzzle,
+    "NQueens": _n_queens,
+    "Sudoku": _sudoku,
+}
+
+
+def puzzle_from_spec(spec):
+    """
+    Build a puzzle from a JSON spec such as
+    ``{"type": "EightPuzzle", "state": [[1, 2, 3], [4, 0, 5], [7, 8, 6]]}``,
+    ``{"type": "NQueens", "n": 8}`` or ``{"type": "Sudoku", "state": "53..7...."}``
+    (9x9 lists or an 81-character string). Raises ValueError for anything
+    else.
+    """
+    if not isinstance(spec, dict):
+        raise ValueError(f"Spec must be a JSON object, got {type(spec).__name__}")
+    if spec.get("type") not in PUZZLE_TYPES:
+        raise ValueError(f"Unknown puzzle type: {spec.get('type')!r}")
+    return PUZZLE_TYPES[spec["type"]](spec)
+
+
+def solve_spec(task):
+    """
+    Worker entry point: solve one ``(index, spec, max_nodes, time_limit)`` task.
+
+    Always returns a JSON-serialisable result dict instead of raising, so one
+    bad instance never takes down the batch. A spec with an "error" key (a
+    line ``read_specs`` could not parse) is reported as that error.
+    """
+    index, spec, max_nodes, time_limit = task
+    result = {"index": index, "id": spec.get("id", index) if isinstance(spec, dict) else index}
+    if isinstance(spec, dict) and "error" in spec:
+        result.update(status="error", error=spec["error"], seconds=0.0)
+        return result
+    start = time.perf_counter()
+    try:
+        solution = solve_puzzle(puzzle_from_spec(spec), max_nodes, time_limit)
+        result["status"] = "solved" if solution is not None else "unsolvable"
+        result["solution"] = solution
+    except SearchLimitExceeded as e:
+        result["status"] = e.reason
+        result["expansions"] = e.expansions
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = f"{type(e).__name__}: {e}" if not isinstance(e, ValueError) else str(e)
+    result["seconds"] = round(time.perf_counter() - start, 6)
+    return result
+
+
+def _solve_chunk(tasks):
+    return [solve_spec(task) for task in tasks]
+
+
+def solve_batch(specs, workers=None, chunksize=8, max_nodes=None, time_limit=None, ordered=True):
+    """
+    Solve a stream of puzzle specs across a process pool.
+
+    Specs are read lazily and at most a few chunks per worker are in flight
+    or waiting to be yielded, so arbitrarily long streams run in bounded
+    memory. A new chunk is submitted as soon as any finishes, so a slow
+    instance never leaves the other workers idle.
+
+    Args:
+        specs: Iterable of spec dicts (see ``puzzle_from_spec``).
+        workers: Number of worker processes (default: all cores).
+        chunksize: Specs handed to a worker at a time.
+        max_nodes: Per-instance expansion budget.
+        time_limit: Per-instance wall-clock limit in seconds.
+        ordered: Yield results in input order; otherwise as they complete.
+
+    Yields:
+        Result dicts from ``solve_spec``.
+    """
+    workers = workers or os.cpu_count()
+    tasks = ((i, spec, max_nodes, time_limit) for i, spec in enumerate(specs))
+    chunks = enumerate(iter(lambda: list(itertools.islice(tasks, chunksize)), []))
+    limit = workers * 4
+    done = queue.Queue()  # (chunk number, results or exception), filled by pool callbacks
+    waiting = {}  # finished chunks held back until the ones before them are yielded
+    in_flight = next_number = 0
+    exhausted = False
+
+    with multiprocessing.Pool(workers) as pool:
+        while True:
+            while not exhausted and in_flight + len(waiting) < limit:
+                item = next(chunks, None)
+                if item is None:
+                    exhausted = True
+                    break
+                number, chunk = item
+                pool.apply_async(_solve_chunk, (chunk,),
+                                 callback=lambda results, number=number: done.put((number, results)),
+                                 error_callback=lambda error, number=number: done.put((number, error)))
+                in_flight += 1
+            if not in_flight:
+                break
+
+            number, results = done.get()
+            in_flight -= 1
+            if isinstance(results, BaseException):
+                raise results
+            if not ordered:
+                yield from results
+                continue
+            waiting[number] = results
+            while next_number in waiting:
+                yield from waiting.pop(next_number)
+                next_number += 1
+
+
+def read_specs(stream):
+    """
+    Parse JSON lines, skipping blank lines. A line that is not valid JSON
+    is yielded as an ``{"error": ...}`` record, so ``solve_spec`` reports
+    it as an error result and the batch goes on.
+    """
+    for number, line in enumerate(stream, 1):
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                yield {"error": f"Line {number}: invalid JSON: {e}"}
+
+
+def random_eight_puzzle_specs(count, moves=40, seed=0):
+    """Solvable 8-puzzle specs made by random walks from the goal."""
+    rng = random.Random(seed)
+    puzzle = EightPuzzle(None)
+    specs = []
+    for _ in range(count):
+        key = puzzle.goal_key
+        for _ in range(moves):
+            key = rng.choice(puzzle.get_key_successors(key))
+        specs.append({"type": "EightPuzzle", "state": puzzle.decode(key)})
+    return specs
+
+
+def benchmark_batch_scaling(specs=None, max_workers=None, chunksize=4):
+    """Time ``solve_batch`` on the same workload with 1, 2, 4, ... up to ``max_workers`` processes."""
+    specs = specs or random_eight_puzzle_specs(64)
+    max_workers = max_workers or os.cpu_count()
+    counts = sorted({min(2 ** i, max_workers) for i in range(max_workers.bit_length() + 1)})
+
+    baseline = None
+    for workers in counts:
+        start = time.perf_counter()
+        results = list(solve_batch(specs, workers=workers, chunksize=chunksize))
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        solved = sum(r["status"] == "solved" for r in results)
+        print(f"{workers:>3} workers: {elapsed:7.2f}s, {len(specs) / elapsed:8.1f} puzzles/sec, "
+              f"speedup {baseline / elapsed:.2f}x ({solved}/{len(specs)} solved)")
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Solve 8-Puzzle, N-Queens and Sudoku instances")
+    parser.add_argument("--benchmark", action="store_true", help="compare list-based and packed 8-puzzle BFS")
+    parser.add_argument("--batch", metavar="FILE", help="JSON-lines file of puzzle specs ('-' for stdin)")
+    parser.add_argument("--output", metavar="FILE", help="write batch results here instead of stdout")
+    parser.add_argument("--workers", type=int, help="worker processes (default: all cores)")
+    parser.add_argument("--chunksize", type=int, default=8, help="specs sent to a worker at a time")
+    parser.add_argument("--max-nodes", type=int, help="per-instance expansion budget")
+    parser.add_argument("--timeout", type=float, help="per-instance time limit in seconds")
+    parser.add_argument("--unordered", action="store_true", help="emit results as they complete")
+    parser.add_argument("--scaling", action="store_true", help="benchmark batch throughput from 1 to N workers")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark_eight_puzzle()
+        sys.exit()
+
+    if args.scaling:
+        specs = None
+        if args.batch:
+            with open(args.batch) as f:
+                specs = list(read_specs(f))
+        benchmark_batch_scaling(specs, args.workers)
+        sys.exit()
+
+    if args.batch:
+        # Only close the files opened here, never stdin or stdout
+        with contextlib.ExitStack() as stack:
+            source = sys.stdin if args.batch == "-" else stack.enter_context(open(args.batch))
+            sink = stack.enter_context(open(args.output, "w")) if args.output else sys.stdout
+            for result in solve_batch(read_specs(source), args.workers, args.chunksize,
+                                      args.max_nodes, args.timeout, not args.unordered):
+                sink.write(json.dumps(result) + "\n")
+        sys.exit()
+
     # Solve 8-Puzzle
     initial_8puzzle = [
         [1, 2, 3],
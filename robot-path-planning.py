@@ -1,19 +1,39 @@
 from collections import deque
+import time
+
 import matplotlib.pyplot as plt
 import numpy as np
 
-def bfs_path_planning(grid, start, goal):
+from search_stats import callbacks, record
+
+def bfs_path_planning(grid, start, goal, stats=None):
+    """
+    Breadth-first search over free cells; returns the path or None.
+
+    ``stats`` (a dict or SearchStats) receives the ``search_stats`` counters
+    with a "search" phase.
+    """
+    started = time.perf_counter()
+    on_expand, on_push = callbacks(stats)
     rows, cols = len(grid), len(grid[0])
     directions = [(-1, 0), (1, 0), (0, -1), (0, 1)]  # Up, Down, Left, Right
 
     visited = set()
     queue = deque([(start, [start])])  # (current_position, path)
+    expanded = peak = 0
+    result = None  # No path found
 
     while queue:
+        if len(queue) > peak:
+            peak = len(queue)
         (x, y), path = queue.popleft()
 
+        expanded += 1
+        if on_expand is not None:
+            on_expand((x, y))
         if (x, y) == goal:  # Goal reached
-            return path
+            result = path
+            break
         
         for dx, dy in directions:
             nx, ny = x + dx, y + dy
@@ -21,8 +41,12 @@ def bfs_path_planning(grid, start, goal):
             if 0 <= nx < rows and 0 <= ny < cols and (nx, ny) not in visited and grid[nx][ny] == 0:
                 visited.add((nx, ny))
                 queue.append(((nx, ny), path + [(nx, ny)]))
+                if on_push is not None:
+                    on_push((nx, ny), len(path))
     
-    return None  # No path found
+    if stats is not None:
+        record(stats, expanded, len(visited) + 1, 0, peak, {"search": time.perf_counter() - started})
+    return result
 
 def visualize_grid(grid, start, goal, path):
     grid = np.array(grid)
@@ -52,25 +76,26 @@ def visualize_grid(grid, start, goal, path):
     plt.title("Robot Path Planning with BFS")
     plt.show()
 
-# Example Grid
-grid = [
-    [0, 0, 0, 0, 0],
-    [0, 1, 1, 1, 0],
-    [0, 0, 0, 1, 0],
-    [0, 1, 0, 0, 0],
-    [0, 0, 0, 0, 0]
-]
+if __name__ == "__main__":
+    # Example Grid
+    grid = [
+        [0, 0, 0, 0, 0],
+        [0, 1, 1, 1, 0],
+        [0, 0, 0, 1, 0],
+        [0, 1, 0, 0, 0],
+        [0, 0, 0, 0, 0]
+    ]
 
-start = (0, 0)  # Starting point
-goal = (4, 4)   # Goal point
+    start = (0, 0)  # Starting point
+    goal = (4, 4)   # Goal point
 
-# Run BFS Path Planning
-path = bfs_path_planning(grid, start, goal)
+    # Run BFS Path Planning
+    path = bfs_path_planning(grid, start, goal)
 
-if path:
-    print("Path found:", path)
-else:
-    print("No path exists.")
+    if path:
+        print("Path found:", path)
+    else:
+        print("No path exists.")
 
-# Visualize the result
-visualize_grid(grid, start, goal, path)
+    # Visualize the result
+    visualize_grid(grid, start, goal, path)
@@ -1,4 +1,14 @@
-from queue import PriorityQueue
+import heapq
+import random
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+import pocket_cube
+from pocket_cube import (MOVES, apply_all_moves, apply_move_batch, apply_moves, is_solved, meet_in_the_middle,
+                         scramble)
 
 # Define the goal state
 goal_state = (
@@ -10,34 +20,42 @@ goal_state = (
     "Y", "Y", "Y", "Y"   # Bottom
 )
 
-# Example heuristic: Number of misplaced tiles
+# Exact distance of every cube state, built into pdbs/ on first use (see
+# pocket_cube.CubeDatabase)
+_database = None
+
+
+def cube_database():
+    global _database
+    if _database is None:
+        _database = pocket_cube.load_cube_database()
+    return _database
+
+
+# Heuristic: exact number of moves to any solved orientation. Reaching
+# goal_state itself takes at least as many, so unlike the old misplaced
+# sticker count (one turn moves twelve stickers) it never overestimates.
 def heuristic(state):
-    return sum(1 for i in range(len(state)) if state[i] != goal_state[i])
-
-# Apply a move to the state
-def apply_move(state, move):
-    # Moves are simple rotations (e.g., U, F, R for top, front, right)
-    new_state = list(state)
-    if move == "U":
-        # Rotate the top layer clockwise
-        new_state[0], new_state[1], new_state[2], new_state[3] = state[1], state[2], state[3], state[0]
-    elif move == "F":
-        # Rotate the front layer clockwise
-        new_state[4], new_state[5], new_state[6], new_state[7] = state[5], state[6], state[7], state[4]
-    elif move == "R":
-        # Rotate the right layer clockwise
-        new_state[8], new_state[9], new_state[10], new_state[11] = state[9], state[10], state[11], state[8]
-    # Add more moves as necessary (L, B, D, etc.)
-    return tuple(new_state)
+    database = cube_database()
+    return database.distance(database.index_of(state)[1])
+
+# Moves are precomputed sticker permutations of a real 2x2 cube (see
+# pocket_cube.py): all six faces, clockwise, prime (') and half (2) turns
+apply_move = pocket_cube.apply_move
 
 # A* algorithm
-def rubiks_solver(start_state):
-    open_set = PriorityQueue()
-    open_set.put((0, start_state, []))
+def rubiks_solver(start_state, moves=MOVES):
+    """
+    A* over sticker tuples. Each reached state stores its parent and the
+    move that led to it, and the path is rebuilt once at the end.
+    """
+    open_set = [(heuristic(start_state), 0, start_state)]
+    parent = {start_state: None}  # state -> (previous state, move)
+    best_g = {start_state: 0}
     visited = set()
 
-    while not open_set.empty():
-        _, current_state, path = open_set.get()
+    while open_set:
+        _, g, current_state = heapq.heappop(open_set)
 
         if current_state in visited:
             continue
@@ -45,31 +63,139 @@ def rubiks_solver(start_state):
 
         # Check if the goal is reached
         if current_state == goal_state:
-            return path
+            path = []
+            while parent[current_state] is not None:
+                current_state, move = parent[current_state]
+                path.append(move)
+            return path[::-1]
 
         # Generate possible moves
-        for move in ["U", "F", "R"]:  # Add more moves as necessary
+        for move in moves:
             next_state = apply_move(current_state, move)
-            if next_state not in visited:
-                cost = len(path) + 1 + heuristic(next_state)
-                open_set.put((cost, next_state, path + [move]))
+            if next_state not in visited and g + 1 < best_g.get(next_state, float("inf")):
+                best_g[next_state] = g + 1
+                parent[next_state] = (current_state, move)
+                cost = g + 1 + heuristic(next_state)
+                heapq.heappush(open_set, (cost, g + 1, next_state))
     
     return None  # No solution found
 
-# Example scrambled state (for 2x2 cube representation)
-start_state = (
-    "W", "W", "G", "G",
-    "O", "B", "O", "B",
-    "R", "Y", "R", "Y",
-    "B", "O", "B", "O",
-    "G", "R", "G", "R",
-    "Y", "Y", "W", "W"
-)
+def optimal_solver(start_state):
+    """
+    Optimal solution read straight off the distance table: no search, just
+    one step down per move. It solves to whichever orientation is nearest,
+    so the result may be goal_state turned as a whole.
+    """
+    return cube_database().solve(start_state)
+
+def bidirectional_solver(start_state):
+    """
+    Optimal solution to goal_state by meet-in-the-middle: breadth-first
+    layers from both ends over canonical move sequences, kept as sorted
+    arrays of packed states (see pocket_cube.meet_in_the_middle).
+    """
+    return meet_in_the_middle(start_state, goal_state)
+
+def benchmark_deep(count=10, seed=1):
+    """Time and peak traced memory of A* and meet-in-the-middle on 30-move scrambles."""
+    rng = random.Random(seed)
+    cube_database()  # load the heuristic table outside the measurements
+    scrambles = [apply_moves(goal_state, scramble(30, rng)) for _ in range(count)]
+    print(f"{count} scrambles of 30 random moves:")
+    print(f"  {'depth':>5} {'A* s':>8} {'A* MB':>8} {'MITM s':>8} {'MITM MB':>8}")
+    for state in scrambles:
+        row = []
+        for solver in (rubiks_solver, bidirectional_solver):
+            tracemalloc.start()
+            start = time.perf_counter()
+            solution = solver(state)
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            assert apply_moves(state, solution) == goal_state
+            row.append((len(solution), elapsed, peak / 2**20))
+        (depth, *a_star), (_, *mitm) = row
+        assert depth == row[1][0]
+        print(f"  {depth:5} {a_star[0]:8.2f} {a_star[1]:8.1f} {mitm[0]:8.2f} {mitm[1]:8.1f}")
+
+def benchmark_solvers(count=200, seed=0):
+    """Solves per second of A* and the table lookup solver on random scrambles."""
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    database = cube_database()
+    print(f"{'distance table ready:':<28}{time.perf_counter() - start:14.2f} s")
+
+    scrambles = [apply_moves(goal_state, scramble(25, rng)) for _ in range(count)]
+    start = time.perf_counter()
+    lengths = []
+    for state in scrambles:
+        solution = optimal_solver(state)
+        assert is_solved(apply_moves(state, solution))
+        lengths.append(len(solution))
+    elapsed = time.perf_counter() - start
+    print(f"{'table lookup solver:':<28}{count / elapsed:14,.0f} solves/s (mean {np.mean(lengths):.2f} moves)")
+
+    # A* must reach goal_state exactly, so give it the shorter scrambles
+    short = [apply_moves(goal_state, scramble(6, rng)) for _ in range(20)]
+    start = time.perf_counter()
+    for state in short:
+        assert apply_moves(state, rubiks_solver(state)) == goal_state
+    elapsed = time.perf_counter() - start
+    print(f"{'A*, 6-move scrambles:':<28}{len(short) / elapsed:14,.0f} solves/s")
+
+def benchmark_moves(batch_size=100_000, repeats=200_000, seed=0):
+    """States per second of the old face-only move, the permutation-table move and the NumPy batch."""
+    def face_only_move(state, move):
+        # The previous apply_move: cycles four stickers of one face only
+        new_state = list(state)
+        if move == "U":
+            new_state[0], new_state[1], new_state[2], new_state[3] = state[1], state[2], state[3], state[0]
+        elif move == "F":
+            new_state[4], new_state[5], new_state[6], new_state[7] = state[5], state[6], state[7], state[4]
+        elif move == "R":
+            new_state[8], new_state[9], new_state[10], new_state[11] = state[9], state[10], state[11], state[8]
+        return tuple(new_state)
+
+    rng = random.Random(seed)
+    sequence = [rng.choice(["U", "F", "R"]) for _ in range(repeats)]
+    for name, move_function in (("face-only apply_move", face_only_move), ("permutation apply_move", apply_move)):
+        state = goal_state
+        start = time.perf_counter()
+        for move in sequence:
+            state = move_function(state, move)
+        print(f"{name + ':':<28}{repeats / (time.perf_counter() - start):14,.0f} states/s")
+
+    states = np.repeat(pocket_cube.GOAL[None, :], batch_size, axis=0)
+    for move in scramble(20, rng):
+        states = apply_move_batch(states, move)
+    start = time.perf_counter()
+    for move in sequence[:100]:
+        states = apply_move_batch(states, move)
+    print(f"{'NumPy batch, one move:':<28}{100 * batch_size / (time.perf_counter() - start):14,.0f} states/s")
+    start = time.perf_counter()
+    successors = apply_all_moves(states[:batch_size // 10])
+    print(f"{'NumPy batch, all 18 moves:':<28}"
+          f"{successors.shape[0] * successors.shape[1] / (time.perf_counter() - start):14,.0f} states/s")
+
+# Example usage
+if __name__ == "__main__":
+    if "--benchmark" in sys.argv:
+        benchmark_moves()
+        benchmark_solvers()
+        benchmark_deep()
+        sys.exit()
+
+    # Scrambled state (for 2x2 cube representation), reached by real moves
+    scramble_moves = ["R", "U'", "F2", "R'"]
+    start_state = apply_moves(goal_state, scramble_moves)
+    print("Scramble:", " ".join(scramble_moves))
 
-# Solve the Rubik's Cube
-solution = rubiks_solver(start_state)
+    # Solve the Rubik's Cube
+    solution = rubiks_solver(start_state)
 
-if solution:
-    print("Solution found:", " -> ".join(solution))
-else:
-    print("No solution found.")
+    if solution:
+        print("Solution found:", " -> ".join(solution))
+    else:
+        print("No solution found.")
+    print("Optimal solution:", " -> ".join(optimal_solver(start_state)))
+    print("Meet-in-the-middle:", " -> ".join(bidirectional_solver(start_state)))
@@ -0,0 +1,136 @@
+import csv
+import json
+import time
+
+COUNTERS = ("runs", "expanded", "pushed", "reopened", "peak_frontier")
+
+
+class SearchStats(dict):
+    """
+    Instrumentation for the search functions, passed as their ``stats``
+    argument. Any dict works there; this one adds a label for exports and
+    optional callbacks.
+
+    After each run the search adds its counters:
+        runs: searches recorded
+        expanded: nodes taken off the frontier and expanded, counting
+            the goal when the search stops at it
+        pushed: frontier insertions
+        reopened: nodes reached again with a lower cost after they were
+            expanded (for searches without a closed set: stale entries
+            expanded again; for IDA*: every repeat expansion of a cell,
+            whether in the same or a later threshold iteration)
+        peak_frontier: largest frontier (the deepest path for IDA*), kept as
+            the maximum over runs
+    and "phases", seconds per named phase ("search", "reconstruct", ...).
+    Functions may add their own keys as well, such as "peak_queue".
+
+    Args:
+        label: Name of this record in JSON/CSV exports.
+        on_expand: Called as on_expand(node) for every expansion.
+        on_push: Called as on_push(node, priority) for every insertion. The
+            priority is f or g for best-first searches, the depth for IDA*,
+            the side (0 forward, 1 backward) for bidirectional BFS, the
+            depth for bfs_path_planning and None for the visualizer's BFS
+            and DFS.
+    """
+
+    def __init__(self, label=None, on_expand=None, on_push=None):
+        super().__init__()
+        self.label = label
+        self.on_expand = on_expand
+        self.on_push = on_push
+
+
+def callbacks(stats):
+    """(on_expand, on_push) of ``stats``; both None for a plain dict or None, so hot loops skip them."""
+    if stats is None:
+        return None, None
+    return getattr(stats, "on_expand", None), getattr(stats, "on_push", None)
+
+
+def record(stats, expanded, pushed, reopened, peak_frontier, phases):
+    """Add the counters and phase timings of one run to ``stats`` (a no-op when it is None)."""
+    if stats is None:
+        return
+    stats["runs"] = stats.get("runs", 0) + 1
+    stats["expanded"] = stats.get("expanded", 0) + expanded
+    stats["pushed"] = stats.get("pushed", 0) + pushed
+    stats["reopened"] = stats.get("reopened", 0) + reopened
+    stats["peak_frontier"] = max(stats.get("peak_frontier", 0), peak_frontier)
+    totals = stats.setdefault("phases", {})
+    for name, seconds in phases.items():
+        totals[name] = totals.get(name, 0.0) + seconds
+
+
+def phase_times(marks):
+    """Durations between consecutive (name, perf_counter()) marks; each mark ends the phase it names."""
+    times = {}
+    for (_, started), (name, ended) in zip(marks, marks[1:]):
+        times[name] = times.get(name, 0.0) + ended - started
+    return times
+
+
+def flatten(stats):
+    """One flat row per record: label, counters, extra scalar keys and "phase_<name>" seconds."""
+    row = {"label": getattr(stats, "label", None) or stats.get("label")}
+    for key, value in stats.items():
+        if key == "phases":
+            row.update({f"phase_{name}": seconds for name, seconds in value.items()})
+        elif isinstance(value, (int, float, str)):
+            row[key] = value
+    return row
+
+
+def export_json(records, path):
+    with open(path, "w") as f:
+        json.dump([flatten(stats) for stats in records], f, indent=2)
+
+
+def export_csv(records, path):
+    rows = [flatten(stats) for stats in records]
+    fields = ["label"] + [key for key in COUNTERS if any(key in row for row in rows)]
+    for row in rows:
+        fields += [key for key in row if key not in fields]
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fields)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def benchmark_overhead(num_nodes=5000, degree=5, queries=20, repeats=5, seed=0):
+    """Time the same searches without stats, with counters only and with callbacks, then export them."""
+    import random
+    import tempfile
+
+    from indexed_heap import indexed_best_first_search
+
+    rng = random.Random(seed)
+    graph = {node: [(rng.randrange(num_nodes), rng.randint(1, 100)) for _ in range(degree)]
+             for node in range(num_nodes)}
+    pairs = [(rng.randrange(num_nodes), rng.randrange(num_nodes)) for _ in range(queries)]
+    expansions = []
+    records = []
+    for label, make_stats in (("disabled", lambda: None), ("counters", lambda: SearchStats("counters")),
+                              ("callbacks", lambda: SearchStats("callbacks", expansions.append))):
+        best = float("inf")
+        for _ in range(repeats):
+            stats = make_stats()
+            started = time.perf_counter()
+            for start, goal in pairs:
+                indexed_best_first_search(graph, start, goal, stats=stats)
+            best = min(best, time.perf_counter() - started)
+        if stats is not None:
+            records.append(stats)
+        print(f"  {label:<10} {1000 * best / queries:7.2f} ms/query")
+
+    directory = tempfile.mkdtemp(prefix="search-stats-")
+    export_json(records, f"{directory}/stats.json")
+    export_csv(records, f"{directory}/stats.csv")
+    with open(f"{directory}/stats.csv") as f:
+        print(f.read(), end="")
+    print(f"  written to {directory}")
+
+
+if __name__ == "__main__":
+    benchmark_overhead()
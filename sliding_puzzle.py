@@ -0,0 +1,428 @@
+import heapq
+import mmap
+import os
+import random
+import time
+
+import matplotlib.pyplot as plt
+import numpy as np
+
+# Offsets of the four cells around a cell: Right, Down, Left, Up
+DIRECTIONS = [(0, 1), (1, 0), (0, -1), (-1, 0)]
+
+PDB_MAGIC = b"PDB\x01"
+PDB_DIRECTORY = "pdbs"
+
+
+def board_neighbors(n):
+    """For every cell of an n x n board, the cells the blank can move to."""
+    neighbors = []
+    for i in range(n):
+        for j in range(n):
+            neighbors.append(tuple(
+                (i + di) * n + (j + dj)
+                for di, dj in DIRECTIONS
+                if 0 <= i + di < n and 0 <= j + dj < n
+            ))
+    return tuple(neighbors)
+
+
+def is_solvable(tiles, n):
+    """
+    Inversion-parity check for an n x n sliding puzzle (goal has the blank last).
+
+    For odd n the number of inversions must be even. For even n the parity of
+    inversions plus the blank's row must match the goal's (blank on row n - 1).
+    """
+    values = [t for t in tiles if t != 0]
+    inversions = sum(
+        1 for i in range(len(values)) for j in range(i + 1, len(values)) if values[i] > values[j]
+    )
+    if n % 2 == 1:
+        return inversions % 2 == 0
+    blank_row = tiles.index(0) // n
+    return (inversions + blank_row) % 2 == (n - 1) % 2
+
+
+class SlidingPuzzle:
+    """
+    N x N sliding-tile puzzle (8-, 15-, 24-puzzle, ...).
+
+    States are flat tuples of tiles in row-major order with 0 as the blank.
+    The class follows the ``Puzzle`` interface of puzzle-solver-framework.py,
+    so it can also be handed to ``solve_puzzle`` there; packed keys use
+    ``bits`` bits per tile.
+    """
+
+    def __init__(self, initial_state):
+        tiles = [t for row in initial_state for t in row] if isinstance(initial_state[0], (list, tuple)) else list(initial_state)
+        n = int(round(len(tiles) ** 0.5))
+        if n * n != len(tiles) or sorted(tiles) != list(range(n * n)):
+            raise ValueError("Initial state must be a permutation of 0..n*n-1 on a square board")
+        if not is_solvable(tiles, n):
+            raise ValueError("Unsolvable sliding puzzle: inversion parity does not match the goal")
+
+        self.n = n
+        self.initial_state = tuple(tiles)
+        self.goal_state = tuple(range(1, n * n)) + (0,)
+        self.neighbors = board_neighbors(n)
+        self.bits = (n * n - 1).bit_length()
+        self.goal_key = self.encode(self.goal_state)
+
+    @classmethod
+    def random(cls, n, rng=random):
+        """A uniformly random solvable instance."""
+        tiles = list(range(n * n))
+        rng.shuffle(tiles)
+        if not is_solvable(tiles, n):
+            # Swapping two non-blank tiles flips the inversion parity
+            i, j = [k for k, t in enumerate(tiles) if t != 0][:2]
+            tiles[i], tiles[j] = tiles[j], tiles[i]
+        return cls(tiles)
+
+    def get_initial_state(self):
+        return self.initial_state
+
+    def is_goal_state(self, state):
+        return tuple(state) == self.goal_state
+
+    def get_successors(self, state):
+        blank = state.index(0)
+        successors = []
+        for cell in self.neighbors[blank]:
+            new_state = list(state)
+            new_state[blank], new_state[cell] = new_state[cell], 0
+            successors.append(tuple(new_state))
+        return successors
+
+    def encode(self, state):
+        key = 0
+        for i, tile in enumerate(state):
+            key |= tile << (self.bits * i)
+        return key
+
+    def decode(self, key):
+        mask = (1 << self.bits) - 1
+        return tuple((key >> (self.bits * i)) & mask for i in range(self.n * self.n))
+
+    def is_goal_key(self, key):
+        return key == self.goal_key
+
+    def get_key_successors(self, key):
+        return [self.encode(s) for s in self.get_successors(self.decode(key))]
+
+    def visualize(self, state):
+        """Visualize the puzzle grid."""
+        n = self.n
+        fig, ax = plt.subplots(figsize=(6, 6))
+        ax.set_xlim(-0.5, n - 0.5)
+        ax.set_ylim(-0.5, n - 0.5)
+        ax.set_xticks(range(n))
+        ax.set_yticks(range(n))
+        ax.grid(True)
+
+        for i in range(n):
+            for j in range(n):
+                if state[i * n + j] != 0:
+                    ax.text(j, n - 1 - i, state[i * n + j], fontsize=20, ha="center", va="center")
+
+        plt.title(f"{n * n - 1}-Puzzle Solution")
+        plt.show()
+
+
+class PatternDatabase:
+    """
+    Additive pattern database for one group of tiles.
+
+    The abstract state is the positions of the pattern tiles only; a move slides
+    one pattern tile onto any adjacent cell not holding another pattern tile.
+    Every real move moves exactly one tile, so the entries of disjoint
+    databases can be added and the sum stays admissible.
+
+    Entry ``sum(position(tiles[j]) * cells**j)`` of ``table`` holds the
+    distance of that placement, one byte per entry.
+    """
+
+    def __init__(self, n, tiles, table, buffer=None):
+        self.n = n
+        self.tiles = tuple(tiles)
+        self.table = table
+        self.weights = tuple((n * n) ** j for j in range(len(self.tiles)))
+        self._buffer = buffer  # keeps the memory map alive
+
+    @classmethod
+    def build(cls, n, tiles):
+        """Breadth-first search over the abstract space, one frontier level at a time."""
+        cells = n * n
+        k = len(tiles)
+        weights = cells ** np.arange(k, dtype=np.int64)
+        moves = np.full((cells, 4), -1, dtype=np.int64)
+        for cell, targets in enumerate(board_neighbors(n)):
+            moves[cell, :len(targets)] = targets
+
+        distances = np.full(cells ** k, 255, dtype=np.uint8)
+        goal = sum((tile - 1) * cells ** j for j, tile in enumerate(tiles))
+        distances[goal] = 0
+        frontier = np.array([goal], dtype=np.int64)
+        depth = 0
+
+        while frontier.size:
+            positions = (frontier[:, None] // weights) % cells
+            occupied = np.bitwise_or.reduce(np.int64(1) << positions, axis=1)
+            candidates = []
+            for j in range(k):
+                for d in range(4):
+                    target = moves[positions[:, j], d]
+                    ok = (target >= 0) & ((occupied >> np.maximum(target, 0)) & 1 == 0)
+                    step = frontier[ok] + (target[ok] - positions[ok, j]) * weights[j]
+                    candidates.append(step[distances[step] == 255])
+            frontier = np.unique(np.concatenate(candidates))
+            depth += 1
+            distances[frontier] = depth
+
+        return cls(n, tiles, distances)
+
+    def save(self, path):
+        """Write the table as a small header followed by the raw byte array."""
+        with open(path, "wb") as f:
+            f.write(PDB_MAGIC + bytes([self.n, len(self.tiles)]) + bytes(self.tiles))
+            f.write(np.asarray(self.table, dtype=np.uint8).tobytes())
+
+    @classmethod
+    def load(cls, path):
+        """Memory-map a saved table; pages are only read when looked up."""
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if buffer[:4] != PDB_MAGIC:
+            raise ValueError(f"{path} is not a pattern database file")
+        n, k = buffer[4], buffer[5]
+        tiles = tuple(buffer[6:6 + k])
+        if len(buffer) != 6 + k + (n * n) ** k:
+            raise ValueError(f"{path} is truncated or has the wrong size for a pattern database")
+        return cls(n, tiles, memoryview(buffer)[6 + k:], buffer)
+
+    def index(self, state):
+        """Table index of a flat tile tuple."""
+        position = {tile: cell for cell, tile in enumerate(state)}
+        return sum(position[tile] * w for tile, w in zip(self.tiles, self.weights))
+
+    def lookup(self, state):
+        return self.table[self.index(state)]
+
+
+def default_patterns(n):
+    """Disjoint tile groups in row-major order: 6-6-3 for the 15-puzzle, fives beyond."""
+    size = 4 if n <= 3 else 6 if n == 4 else 5
+    tiles = list(range(1, n * n))
+    if n == 4:
+        return [(1, 5, 6, 9, 10, 13), (7, 8, 11, 12, 14, 15), (2, 3, 4)]
+    return [tuple(tiles[i:i + size]) for i in range(0, len(tiles), size)]
+
+
+def load_pattern_databases(n, patterns=None, directory=PDB_DIRECTORY):
+    """Memory-map the additive databases for an n x n board, building and saving missing ones."""
+    patterns = patterns or default_patterns(n)
+    covered = sorted(t for group in patterns for t in group)
+    if covered != list(range(1, n * n)):
+        raise ValueError("Patterns must partition the tiles 1..n*n-1")
+
+    os.makedirs(directory, exist_ok=True)
+    databases = []
+    for tiles in patterns:
+        path = os.path.join(directory, f"{n * n - 1}-puzzle-{'-'.join(map(str, tiles))}.pdb")
+        if not os.path.exists(path):
+            PatternDatabase.build(n, tiles).save(path)
+        databases.append(PatternDatabase.load(path))
+    return databases
+
+
+def pdb_heuristic(state, databases):
+    """Additive pattern-database estimate of the moves left."""
+    return sum(db.lookup(state) for db in databases)
+
+
+def a_star(puzzle, databases=None):
+    """
+    A* over flat tile tuples guided by additive pattern databases.
+
+    Returns:
+        The optimal sequence of states from the initial state to the goal.
+    """
+    databases = databases or load_pattern_databases(puzzle.n)
+    start = puzzle.get_initial_state()
+    open_set = [(pdb_heuristic(start, databases), 0, start)]
+    parent = {start: None}
+    g_score = {start: 0}
+
+    while open_set:
+        _, g, state = heapq.heappop(open_set)
+        if g > g_score[state]:
+            continue
+        if state == puzzle.goal_state:
+            path = []
+            while state is not None:
+                path.append(state)
+                state = parent[state]
+            return path[::-1]
+
+        for successor in puzzle.get_successors(state):
+            if successor not in g_score or g + 1 < g_score[successor]:
+                g_score[successor] = g + 1
+                parent[successor] = state
+                heapq.heappush(open_set, (g + 1 + pdb_heuristic(successor, databases), g + 1, successor))
+
+    return None
+
+
+class PuzzleSearch:
+    """
+    Mutable IDA* search state for one puzzle.
+
+    The board is a single list, the path is the list of blank positions, and
+    the database indices are updated incrementally: sliding a tile only
+    changes the entry of its own group.
+    """
+
+    def __init__(self, puzzle, databases):
+        self.puzzle = puzzle
+        self.databases = databases
+        self.tables = [db.table for db in databases]
+        self.group_of = [0] * (puzzle.n * puzzle.n)
+        self.weight_of = [0] * (puzzle.n * puzzle.n)
+        for g, db in enumerate(databases):
+            for tile, w in zip(db.tiles, db.weights):
+                self.group_of[tile], self.weight_of[tile] = g, w
+        self.reset()
+
+    def reset(self, blanks=None):
+        """Go back to the initial board, then replay the blank moves in ``blanks``."""
+        board = list(self.puzzle.get_initial_state())
+        blanks = list(blanks) if blanks else [board.index(0)]
+        for blank, cell in zip(blanks, blanks[1:]):
+            board[blank], board[cell] = board[cell], 0
+        self.board, self.blanks = board, blanks
+        self.indices = [db.index(board) for db in self.databases]
+        self.h = sum(table[i] for table, i in zip(self.tables, self.indices))
+
+    def search(self, bound, depth_limit=None, frontier=None, stop=None):
+        """
+        Depth-first search below the current path, pruning at f > ``bound``.
+
+        Args:
+            bound: Current IDA* threshold.
+            depth_limit: If set, nodes this many moves below the current path
+                that are within the bound are appended to ``frontier`` as
+                blank paths instead of being expanded.
+            frontier: List receiving those blank paths.
+            stop: Optional Event polled every few thousand nodes; once set the
+                search gives up and returns inf.
+
+        Returns:
+            True when the goal is reached (``blanks`` then holds the
+            solution), otherwise the smallest f-value above the bound.
+        """
+        board, blanks, indices, tables = self.board, self.blanks, self.indices, self.tables
+        neighbors, group_of, weight_of = self.puzzle.neighbors, self.group_of, self.weight_of
+        base = len(blanks) - 1
+        nodes = 0
+
+        def dfs(g, h):
+            nonlocal nodes
+            f = g + h
+            if f > bound:
+                return f
+            if h == 0:
+                return True
+            if depth_limit is not None and g - base == depth_limit:
+                frontier.append(list(blanks))
+                return float("inf")
+            if stop is not None:
+                nodes += 1
+                if not nodes & 4095 and stop.is_set():
+                    return float("inf")
+            blank = blanks[-1]
+            previous = blanks[-2] if len(blanks) > 1 else -1
+            minimum = float("inf")
+            for cell in neighbors[blank]:
+                if cell == previous:
+                    continue
+                tile = board[cell]
+                group, delta = group_of[tile], (blank - cell) * weight_of[tile]
+                table = tables[group]
+                old = indices[group]
+                indices[group] = old + delta
+                board[blank], board[cell] = tile, 0
+                blanks.append(cell)
+
+                result = dfs(g + 1, h - table[old] + table[old + delta])
+                if result is True:
+                    return True
+
+                blanks.pop()
+                board[blank], board[cell] = 0, tile
+                indices[group] = old
+                if result < minimum:
+                    minimum = result
+            return minimum
+
+        return dfs(base, self.h)
+
+    def path(self):
+        """States along the current blank path."""
+        state = list(self.puzzle.get_initial_state())
+        path = [tuple(state)]
+        for blank, cell in zip(self.blanks, self.blanks[1:]):
+            state[blank], state[cell] = state[cell], 0
+            path.append(tuple(state))
+        return path
+
+
+def ida_star(puzzle, databases=None):
+    """
+    IDA* with additive pattern databases.
+
+    Returns:
+        The optimal sequence of states from the initial state to the goal.
+    """
+    search = PuzzleSearch(puzzle, databases or load_pattern_databases(puzzle.n))
+    bound = search.h
+    while True:
+        result = search.search(bound)
+        if result is True:
+            return search.path()
+        if result == float("inf"):
+            return None
+        bound = result
+
+
+def benchmark(n=4, instances=5, seed=0):
+    """Solve random instances optimally with IDA* and report the time per instance."""
+    start_time = time.perf_counter()
+    databases = load_pattern_databases(n)
+    print(f"Pattern databases ready in {time.perf_counter() - start_time:.2f}s")
+
+    rng = random.Random(seed)
+    for _ in range(instances):
+        puzzle = SlidingPuzzle.random(n, rng)
+        start_time = time.perf_counter()
+        path = ida_star(puzzle, databases)
+        print(f"{puzzle.initial_state}: {len(path) - 1} moves in {time.perf_counter() - start_time:.2f}s")
+
+
+if __name__ == "__main__":
+    import sys
+
+    if "--benchmark" in sys.argv:
+        benchmark()
+        sys.exit()
+
+    # Solve a 15-Puzzle
+    puzzle = SlidingPuzzle([
+        [5, 1, 3, 4],
+        [9, 2, 7, 8],
+        [13, 6, 10, 11],
+        [0, 14, 15, 12],
+    ])
+    path = ida_star(puzzle)
+    print(f"15-Puzzle solved in {len(path) - 1} moves")
+    puzzle.visualize(path[-1])
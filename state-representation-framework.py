@@ -1,13 +1,35 @@
+import contextlib
+import io
+import mmap
+import os
+import random
+import struct
+import time
+import zlib
+from collections import OrderedDict, deque, namedtuple
+from collections.abc import MutableMapping
+
+import numpy as np
+
+
 class State:
     """Represents a single state in the state-space."""
     def __init__(self, name, description=""):
         self.name = name
         self.description = description
         self.transitions = {}
+        self._spaces = []  # state-spaces holding this state, notified of new transitions
 
     def add_transition(self, action, next_state):
         """Add a transition to another state."""
+        old = self.transitions.get(action)
         self.transitions[action] = next_state
+        if old == next_state:
+            return
+        for space in self._spaces:
+            if old is not None:
+                space._transition_removed(self.name, action, old)
+            space._transition_added(self.name, action, next_state)
 
     def get_next_state(self, action):
         """Get the next state for a given action."""
@@ -17,14 +39,53 @@ class State:
         return f"State({self.name}): {self.description}"
 
 
+# One simulation step; ``target`` is None when the action is invalid from ``source``
+Transition = namedtuple("Transition", ["step", "source", "action", "target"])
+
+
+class SimulationTrace:
+    """
+    Bounded record of a simulation: the last ``capacity`` transitions in a ring
+    buffer plus hit counters per state and per (state, action) transition.
+    Everything is kept in memory; nothing is printed or written.
+    """
+
+    def __init__(self, capacity=1000):
+        self.recent = deque(maxlen=capacity)
+        self.state_hits = {}
+        self.transition_hits = {}
+
+
 class StateSpace:
-    """Represents the entire state-space."""
+    """
+    Represents the entire state-space.
+
+    Reachability, shortest-path and strongly-connected-component queries treat
+    the transitions as a directed graph over state names. Their results are
+    cached: breadth-first trees per source (LRU-bounded) and the component
+    partition with its condensation DAG. Added, overwritten and removed
+    transitions update only the cached entries they affect instead of
+    recomputing everything.
+    """
+    MAX_CACHED_SOURCES = 64
+
     def __init__(self):
         self.states = {}
+        self._trees = OrderedDict()  # source -> (dist, parent, memoized paths)
+        self._components = None      # (component of node, members, DAG out-edges, DAG in-edges)
 
     def add_state(self, state):
         """Add a state to the state-space."""
+        old = self.states.get(state.name)
         self.states[state.name] = state
+        if old is not None and old is not state:
+            old._spaces.remove(self)
+            for action, next_state in old.transitions.items():
+                self._transition_removed(old.name, action, next_state)
+        if old is not state:
+            state._spaces.append(self)
+            for action, next_state in state.transitions.items():
+                self._transition_added(state.name, action, next_state)
 
     def get_state(self, name):
         """Retrieve a state by its name."""
@@ -37,24 +98,753 @@ class StateSpace:
 
     def simulate(self, start_state_name, actions):
         """Simulate a sequence of actions in the state-space."""
-        current_state = self.get_state(start_state_name)
-        if not current_state:
+        if not self.get_state(start_state_name):
             print("Start state not found!")
             return
 
-        print(f"Starting at: {current_state.name}")
-        for action in actions:
-            next_state_name = current_state.get_next_state(action)
-            if not next_state_name:
-                print(f"Action '{action}' is invalid from state '{current_state.name}'")
+        print(f"Starting at: {start_state_name}")
+        current = start_state_name
+        for event in self.run(start_state_name, actions):
+            if event.target is None:
+                print(f"Action '{event.action}' is invalid from state '{event.source}'")
                 break
-            current_state = self.get_state(next_state_name)
-            print(f"Action '{action}' -> Moved to: {current_state.name}")
-        print(f"Final State: {current_state.name}")
+            current = event.target
+            print(f"Action '{event.action}' -> Moved to: {current}")
+        print(f"Final State: {current}")
+
+    def run(self, start_state_name, actions, trace=None):
+        """
+        Step through ``actions`` lazily, yielding a ``Transition`` per action.
+
+        Stops after yielding the first invalid transition (``target`` None),
+        including moves into states that were never added. Any iterable works,
+        so this can consume a live event stream.
+
+        Args:
+            start_state_name: Name of the state to start from.
+            actions: Iterable of actions.
+            trace: Optional ``SimulationTrace`` to record into.
+        """
+        states = self.states
+        current = states[start_state_name]
+        tracing = trace is not None
+        if tracing:
+            # Bound once so the loop only does local lookups
+            remember, state_hits, transition_hits = trace.recent.append, trace.state_hits, trace.transition_hits
+            state_hits[start_state_name] = state_hits.get(start_state_name, 0) + 1
+
+        for step, action in enumerate(actions):
+            next_name = current.transitions.get(action)
+            next_state = states.get(next_name) if next_name is not None else None
+            if next_state is None:
+                event = Transition(step, current.name, action, None)
+                if tracing:
+                    remember(event)
+                yield event
+                return
+
+            event = Transition(step, current.name, action, next_name)
+            if tracing:
+                remember(event)
+                key = (current.name, action)
+                transition_hits[key] = transition_hits.get(key, 0) + 1
+                state_hits[next_name] = state_hits.get(next_name, 0) + 1
+            yield event
+            current = next_state
+
+    async def run_async(self, start_state_name, actions, trace=None):
+        """Like ``run``, but ``actions`` may also be an async iterator."""
+        if not hasattr(actions, "__aiter__"):
+            for event in self.run(start_state_name, actions, trace):
+                yield event
+            return
+
+        # Feed the synchronous stepper one action at a time from the async source
+        pending = deque()
+        steps = self.run(start_state_name, _Feed(pending), trace)
+        async for action in actions:
+            pending.append(action)
+            event = next(steps, None)
+            if event is None:
+                return
+            yield event
+            if event.target is None:
+                return
+
+    def is_reachable(self, source, target):
+        """Whether ``target`` can be reached from ``source`` by some sequence of actions."""
+        return target in self._tree(source)[0]
+
+    def shortest_action_path(self, source, target):
+        """
+        Shortest sequence of actions leading from ``source`` to ``target``.
+
+        Returns:
+            List of actions (empty if source == target), or None if unreachable.
+        """
+        dist, parent, paths = self._tree(source)
+        if target not in dist:
+            return None
+        if target not in paths:
+            actions = []
+            node = target
+            while node != source:
+                node, action = parent[node]
+                actions.append(action)
+            paths[target] = actions[::-1]
+        return list(paths[target])
+
+    def strongly_connected_components(self):
+        """All strongly connected components as a list of frozensets of state names."""
+        return [frozenset(members) for members in self._scc()[1].values()]
+
+    def component_of(self, name):
+        """The strongly connected component containing ``name``, or None for an unknown name."""
+        component, members, _, _ = self._scc()
+        if name not in component:
+            return None
+        return frozenset(members[component[name]])
+
+    def same_component(self, a, b):
+        """Whether ``a`` and ``b`` can each reach the other (False if either is unknown)."""
+        component = self._scc()[0]
+        return a in component and b in component and component[a] == component[b]
+
+    def _successors(self, name):
+        state = self.states.get(name)
+        return state.transitions.items() if state else ()
+
+    def _tree(self, source):
+        """Cached BFS tree of ``source``: distances, parent (node, action) pointers, paths."""
+        if source in self._trees:
+            self._trees.move_to_end(source)
+            return self._trees[source]
+
+        dist, parent = {source: 0}, {source: None}
+        queue = deque([source])
+        while queue:
+            node = queue.popleft()
+            for action, next_state in self._successors(node):
+                if next_state not in dist:
+                    dist[next_state] = dist[node] + 1
+                    parent[next_state] = (node, action)
+                    queue.append(next_state)
+
+        self._trees[source] = (dist, parent, {})
+        if len(self._trees) > self.MAX_CACHED_SOURCES:
+            self._trees.popitem(last=False)
+        return self._trees[source]
+
+    def _scc(self):
+        """Cached component partition, computed with an iterative Tarjan's algorithm."""
+        if self._components is not None:
+            return self._components
+
+        nodes = list(dict.fromkeys(
+            [name for name in self.states]
+            + [t for st in self.states.values() for t in st.transitions.values()]
+        ))
+        component = self._tarjan(nodes)
+
+        members, dag_out, dag_in = {}, {}, {}
+        for node, c in component.items():
+            members.setdefault(c, set()).add(node)
+            dag_out.setdefault(c, set())
+            dag_in.setdefault(c, set())
+        for node in self.states:
+            for _, next_state in self._successors(node):
+                a, b = component[node], component[next_state]
+                if a != b:
+                    dag_out[a].add(b)
+                    dag_in[b].add(a)
+        self._components = (component, members, dag_out, dag_in)
+        return self._components
+
+    def _tarjan(self, nodes, inside=None):
+        """
+        Iterative Tarjan's algorithm over ``nodes``; maps each node to its
+        component's root. With ``inside``, only edges between nodes of that
+        set are followed.
+        """
+        def targets(node):
+            return [t for _, t in self._successors(node) if inside is None or t in inside]
+
+        index, low, on_stack, stack = {}, {}, set(), []
+        component = {}
+        counter = 0
+        for root in nodes:
+            if root in index:
+                continue
+            work = [(root, iter(targets(root)))]
+            index[root] = low[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack.add(root)
+            while work:
+                node, children = work[-1]
+                for child in children:
+                    if child not in index:
+                        index[child] = low[child] = counter
+                        counter += 1
+                        stack.append(child)
+                        on_stack.add(child)
+                        work.append((child, iter(targets(child))))
+                        break
+                    if child in on_stack:
+                        low[node] = min(low[node], index[child])
+                else:
+                    work.pop()
+                    if work:
+                        low[work[-1][0]] = min(low[work[-1][0]], low[node])
+                    if low[node] == index[node]:
+                        while True:
+                            member = stack.pop()
+                            on_stack.discard(member)
+                            component[member] = node
+                            if member == node:
+                                break
+        return component
+
+    def _transition_added(self, name, action, next_state):
+        """Update the cached trees and components for a new edge ``name -action-> next_state``."""
+        for dist, parent, paths in self._trees.values():
+            if name not in dist or (next_state in dist and dist[next_state] <= dist[name] + 1):
+                continue
+            # The edge shortens paths: relax breadth-first from its target only
+            paths.clear()
+            dist[next_state] = dist[name] + 1
+            parent[next_state] = (name, action)
+            queue = deque([next_state])
+            while queue:
+                node = queue.popleft()
+                for act, succ in self._successors(node):
+                    if succ not in dist or dist[succ] > dist[node] + 1:
+                        dist[succ] = dist[node] + 1
+                        parent[succ] = (node, act)
+                        queue.append(succ)
+
+        if self._components is not None:
+            self._component_edge_added(name, next_state)
+
+    def _component_edge_added(self, a, b):
+        component, members, dag_out, dag_in = self._components
+        for node in (a, b):
+            if node not in component:
+                component[node] = node
+                members[node] = {node}
+                dag_out[node], dag_in[node] = set(), set()
+        ca, cb = component[a], component[b]
+        if ca == cb:
+            return
+
+        # A new cycle exists only if cb already reaches ca in the condensation DAG
+        forward, queue = {cb}, [cb]
+        while queue:
+            for c in dag_out[queue.pop()]:
+                if c not in forward:
+                    forward.add(c)
+                    queue.append(c)
+        if ca not in forward:
+            dag_out[ca].add(cb)
+            dag_in[cb].add(ca)
+            return
+
+        backward, queue = {ca}, [ca]
+        while queue:
+            for c in dag_in[queue.pop()]:
+                if c not in backward and c in forward:
+                    backward.add(c)
+                    queue.append(c)
+        merged = forward & backward
+        out_edges = set().union(*(dag_out.pop(c) for c in merged)) - merged
+        in_edges = set().union(*(dag_in.pop(c) for c in merged)) - merged
+        nodes = set().union(*(members.pop(c) for c in merged))
+        for node in nodes:
+            component[node] = ca
+        members[ca], dag_out[ca], dag_in[ca] = nodes, out_edges, in_edges
+        for c in out_edges:
+            dag_in[c] = (dag_in[c] - merged) | {ca}
+        for c in in_edges:
+            dag_out[c] = (dag_out[c] - merged) | {ca}
+
+    def _transition_removed(self, name, action, next_state):
+        """Drop only the cached results that depended on the removed edge."""
+        for source in [s for s, (_, parent, _) in self._trees.items() if parent.get(next_state) == (name, action)]:
+            del self._trees[source]
+        if self._components is not None:
+            self._component_edge_removed(name, next_state)
+
+    def _component_edge_removed(self, a, b):
+        component, members, dag_out, dag_in = self._components
+        state = self.states.get(a)
+        if a not in component or b not in component or (state and b in state.transitions.values()):
+            return  # another action still leads from a to b
+        ca, cb = component[a], component[b]
+        if ca != cb:
+            # The partition is unchanged; only the DAG edge may be gone
+            if not any(component[t] == cb for node in members[ca] for _, t in self._successors(node)):
+                dag_out[ca].discard(cb)
+                dag_in[cb].discard(ca)
+            return
+
+        # The component survives if a still reaches b some other way: every
+        # path that used the edge can detour through that route instead
+        nodes = members[ca]
+        seen, queue = {a}, deque([a])
+        while queue:
+            for _, t in self._successors(queue.popleft()):
+                if t == b:
+                    return
+                if t in nodes and t not in seen:
+                    seen.add(t)
+                    queue.append(t)
+
+        # Otherwise only this component can split: rerun Tarjan on its members
+        pieces = self._tarjan(nodes, nodes)
+        if len(set(pieces.values())) == 1:
+            return
+        del members[ca]
+        old_in = dag_in.pop(ca)
+        for c in dag_out.pop(ca):
+            dag_in[c].discard(ca)
+        component.update(pieces)
+        for node, c in pieces.items():
+            members.setdefault(c, set()).add(node)
+            dag_out.setdefault(c, set())
+            dag_in.setdefault(c, set())
+        for node in nodes:
+            for _, t in self._successors(node):
+                if component[node] != component[t]:
+                    dag_out[component[node]].add(component[t])
+                    dag_in[component[t]].add(component[node])
+        for c in old_in:
+            dag_out[c].discard(ca)
+            for node in members[c]:
+                for _, t in self._successors(node):
+                    if t in nodes:
+                        dag_out[c].add(component[t])
+                        dag_in[component[t]].add(c)
+
+    def save(self, path):
+        """
+        Write the state-space in the binary format read by ``load``.
+
+        Layout: a header, then 8-byte aligned arrays: string offsets, UTF-8
+        string data (every name, description and action once), each state's
+        name and description string ids, per-state offsets into the
+        transition arrays, transition action and target string ids, and a
+        name lookup table. That table is a linear-probing hash table with a
+        power-of-two number of uint32 slots (``MappedStates.table_size``).
+        Each slot holds a state index + 1, or 0 if empty, and probing starts
+        at the CRC-32 of the UTF-8 name.
+        State names, descriptions and actions must be strings.
+        """
+        strings = {}
+
+        def intern(text):
+            if not isinstance(text, str):
+                raise TypeError(f"Only string names, descriptions and actions can be saved, got {text!r}")
+            return strings.setdefault(text, len(strings))
+
+        states = list(self.states.values())
+        names = np.array([intern(st.name) for st in states], dtype=np.uint32)
+        descriptions = np.array([intern(st.description) for st in states], dtype=np.uint32)
+        trans_offsets = np.zeros(len(states) + 1, dtype=np.uint64)
+        trans_offsets[1:] = np.cumsum([len(st.transitions) for st in states])
+        actions = np.array([intern(a) for st in states for a in st.transitions], dtype=np.uint32)
+        targets = np.array([intern(t) for st in states for t in st.transitions.values()], dtype=np.uint32)
+
+        encoded = [text.encode() for text in strings]
+        string_offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+        string_offsets[1:] = np.cumsum([len(b) for b in encoded])
+        # Linear-probing table of state index + 1 (0 = empty slot), keyed by CRC-32 of the name
+        slots = MappedStates.table_size(len(states))
+        name_table = [0] * slots
+        for i, name_id in enumerate(names.tolist()):
+            slot = zlib.crc32(encoded[name_id]) & (slots - 1)
+            while name_table[slot]:
+                slot = (slot + 1) & (slots - 1)
+            name_table[slot] = i + 1
+        name_table = np.array(name_table, dtype=np.uint32)
+
+        with open(path, "wb") as f:
+            f.write(struct.pack(MappedStates.HEADER, MappedStates.MAGIC, len(states), len(encoded), len(actions), int(string_offsets[-1])))
+            for section in [string_offsets, b"".join(encoded), names, descriptions, trans_offsets, actions, targets, name_table]:
+                data = section if isinstance(section, bytes) else section.tobytes()
+                f.write(data + b"\0" * (-len(data) % 8))
+
+    @classmethod
+    def load(cls, path):
+        """
+        Open a file written by ``save``.
+
+        The file is memory-mapped read-only, so processes loading the same
+        file share its pages. ``State`` objects are only created when a state
+        is accessed; states added afterwards live in memory on top of the file.
+        """
+        state_space = cls()
+        state_space.states = MappedStates(state_space, path)
+        return state_space
+
+    def compile(self, layout="auto"):
+        """
+        Intern state and action names to ints and build a NumPy transition table.
+
+        The compiled table is a snapshot: recompile after adding states or
+        transitions.
+
+        Args:
+            layout: "dense", "sparse" or "auto" (dense unless the table would be huge).
+        """
+        return CompiledStateSpace(self, layout)
+
+
+class _Feed:
+    """Iterator over a deque that the caller refills before every ``next``."""
+
+    def __init__(self, pending):
+        self.pending = pending
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if not self.pending:
+            raise StopIteration
+        return self.pending.popleft()
+
+
+class MappedStates(MutableMapping):
+    """
+    Name -> State mapping backed by a memory-mapped file from ``StateSpace.save``.
+
+    States read from the file are materialized on first access and kept;
+    assigned states shadow the file's copy.
+    """
+
+    MAGIC = b"SSP1"
+    HEADER = "<4s4xQQQQ"
+
+    def __init__(self, state_space, path):
+        self._space = state_space
+        with open(path, "rb") as f:
+            self._buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, num_states, num_strings, num_transitions, string_bytes = struct.unpack_from(self.HEADER, self._buffer)
+        if magic != self.MAGIC:
+            raise ValueError(f"{path} is not a saved StateSpace")
+
+        # Typed memoryviews straight over the mapped pages: indexing returns plain ints
+        view = memoryview(self._buffer)
+        offset = struct.calcsize(self.HEADER)
+
+        def section(fmt, count):
+            nonlocal offset
+            size = count * struct.calcsize(fmt)
+            array = view[offset:offset + size].cast(fmt)
+            offset += size + (-size % 8)
+            return array
+
+        self._string_offsets = section("Q", num_strings + 1)
+        self._string_base = offset
+        offset += string_bytes + (-string_bytes % 8)
+        self._names = section("I", num_states)
+        self._descriptions = section("I", num_states)
+        self._trans_offsets = section("Q", num_states + 1)
+        self._actions = section("I", num_transitions)
+        self._targets = section("I", num_transitions)
+        self._table = section("I", self.table_size(num_states))
+
+        self._loaded = {}  # materialized or assigned states
+        self._added = {}   # assigned names that are not in the file
+
+    def _bytes(self, string_id):
+        base = self._string_base
+        return self._buffer[base + self._string_offsets[string_id]:base + self._string_offsets[string_id + 1]]
+
+    def _string(self, string_id):
+        return self._bytes(string_id).decode()
+
+    @staticmethod
+    def table_size(num_states):
+        """Slots in the name hash table: a power of two at least twice the state count."""
+        return 1 << (2 * num_states).bit_length()
+
+    def _find(self, name):
+        """Index of ``name`` in the file via the on-disk hash table, or None."""
+        if not isinstance(name, str):
+            return None
+        key = name.encode()
+        mask = len(self._table) - 1
+        slot = zlib.crc32(key) & mask
+        while self._table[slot]:
+            index = self._table[slot] - 1
+            if self._bytes(self._names[index]) == key:
+                return index
+            slot = (slot + 1) & mask
+        return None
+
+    def _materialize(self, index):
+        state = State(self._string(self._names[index]), self._string(self._descriptions[index]))
+        start, end = self._trans_offsets[index], self._trans_offsets[index + 1]
+        for action, target in zip(self._actions[start:end], self._targets[start:end]):
+            state.transitions[self._string(action)] = self._string(target)
+        state._spaces.append(self._space)
+        return state
+
+    def __getitem__(self, name):
+        state = self._loaded.get(name)
+        if state is not None:
+            return state
+        index = self._find(name)
+        if index is None:
+            raise KeyError(name)
+        state = self._loaded[name] = self._materialize(index)
+        return state
+
+    def __setitem__(self, name, state):
+        if name not in self._loaded and self._find(name) is None:
+            self._added[name] = state
+        self._loaded[name] = state
+
+    def __delitem__(self, name):
+        raise TypeError("States cannot be removed from a loaded StateSpace")
+
+    def __contains__(self, name):
+        return name in self._loaded or self._find(name) is not None
+
+    def __iter__(self):
+        for index in range(len(self._names)):
+            yield self._string(self._names[index])
+        yield from self._added
+
+    def __len__(self):
+        return len(self._names) + len(self._added)
+
+
+class CompiledStateSpace:
+    """
+    Integer-indexed transition table of a StateSpace.
+
+    States and actions are numbered in order of first appearance
+    (``state_names[i]``, ``action_names[j]``). A missing transition is the sentinel ``INVALID``.
+    The extra action id ``pad_action`` maps every state to itself, so ragged
+    action sequences can be padded into a rectangle.
+
+    The dense layout is a ``(states, actions + 1)`` table. The sparse layout
+    stores transitions in CSR order as globally sorted
+    ``state * (actions + 1) + action`` keys with their targets, and looks them
+    up with one vectorized binary search.
+    """
+
+    INVALID = -1
+    MAX_DENSE_ENTRIES = 50_000_000
+
+    def __init__(self, state_space, layout="auto"):
+        self.state_names = list(state_space.states)
+        self.state_index = {name: i for i, name in enumerate(self.state_names)}
+        self.action_names = list(dict.fromkeys(a for st in state_space.states.values() for a in st.transitions))
+        self.action_index = {action: j for j, action in enumerate(self.action_names)}
+        self.pad_action = len(self.action_names)
+
+        num_states, width = len(self.state_names), len(self.action_names) + 1
+        if layout == "auto":
+            layout = "dense" if num_states * width <= self.MAX_DENSE_ENTRIES else "sparse"
+        if layout not in ("dense", "sparse"):
+            raise ValueError(f"Unknown layout: {layout!r}")
+        self.layout = layout
+
+        sources, actions, targets = [], [], []
+        for i, name in enumerate(self.state_names):
+            for action, next_name in state_space.states[name].transitions.items():
+                # Transitions into states that were never added are invalid
+                if next_name in self.state_index:
+                    sources.append(i)
+                    actions.append(self.action_index[action])
+                    targets.append(self.state_index[next_name])
+        sources = np.array(sources, dtype=np.int64)
+        actions = np.array(actions, dtype=np.int64)
+        targets = np.array(targets, dtype=np.int32)
+
+        if layout == "dense":
+            self.table = np.full((num_states, width), self.INVALID, dtype=np.int32)
+            self.table[sources, actions] = targets
+            self.table[:, self.pad_action] = np.arange(num_states, dtype=np.int32)
+        else:
+            keys = np.concatenate([sources * width + actions, np.arange(num_states, dtype=np.int64) * width + self.pad_action])
+            values = np.concatenate([targets, np.arange(num_states, dtype=np.int32)])
+            order = np.argsort(keys, kind="stable")
+            self.keys, self.targets = keys[order], values[order]
+            self.indptr = np.searchsorted(self.keys, np.arange(num_states + 1, dtype=np.int64) * width)
+        self.width = width
+
+    def encode_actions(self, action_sequences):
+        """Turn a list of action-name lists into a padded ``(traces, steps)`` int array."""
+        steps = max((len(seq) for seq in action_sequences), default=0)
+        encoded = np.full((len(action_sequences), steps), self.pad_action, dtype=np.int64)
+        for row, seq in enumerate(action_sequences):
+            # Unknown actions are invalid everywhere: use an id that no state has
+            encoded[row, :len(seq)] = [self.action_index.get(a, self.width) for a in seq]
+        return encoded
+
+    def step(self, states, actions):
+        """Next state ids for arrays of state and action ids (``INVALID`` where undefined)."""
+        unknown = actions >= self.width
+        actions = np.where(unknown, self.pad_action, actions)
+        if self.layout == "dense":
+            nxt = self.table[states, actions]
+        else:
+            keys = states.astype(np.int64) * self.width + actions
+            pos = np.minimum(np.searchsorted(self.keys, keys), len(self.keys) - 1)
+            nxt = np.where(self.keys[pos] == keys, self.targets[pos], self.INVALID)
+        return np.where(unknown, self.INVALID, nxt)
+
+    def simulate_many(self, start_states, action_sequences):
+        """
+        Advance many action sequences at once.
+
+        Like ``StateSpace.simulate``, a trace stops at its first invalid action
+        and keeps the state it reached.
+
+        Args:
+            start_states: One start state name for all traces, or one per trace.
+            action_sequences: List of action-name lists, or an int array from
+                ``encode_actions``.
+
+        Returns:
+            (final state ids, per-trace bool array: stopped on an invalid action)
+        """
+        if not isinstance(action_sequences, np.ndarray):
+            action_sequences = self.encode_actions(action_sequences)
+        traces = action_sequences.shape[0]
+        if isinstance(start_states, str):
+            current = np.full(traces, self.state_index[start_states], dtype=np.int32)
+        else:
+            current = np.array([self.state_index[name] for name in start_states], dtype=np.int32)
+
+        halted = np.zeros(traces, dtype=bool)
+        for t in range(action_sequences.shape[1]):
+            nxt = self.step(current, action_sequences[:, t])
+            halted |= nxt == self.INVALID
+            current = np.where(halted, current, nxt)
+        return current, halted
+
+    def names(self, state_ids):
+        """Map state ids back to names."""
+        return [self.state_names[i] for i in state_ids]
+
+
+def random_state_space(num_states, num_actions, seed=0):
+    """A random state machine where every state has every action."""
+    rng = random.Random(seed)
+    state_space = StateSpace()
+    for i in range(num_states):
+        state = State(f"S{i}")
+        for a in range(num_actions):
+            state.add_transition(f"a{a}", f"S{rng.randrange(num_states)}")
+        state_space.add_state(state)
+    return state_space
+
+
+def benchmark_simulate_many(num_states=1000, num_actions=8, traces=10000, steps=100, seed=0):
+    """Events/sec of the compiled batch simulator against the per-step ``simulate``."""
+    state_space = random_state_space(num_states, num_actions, seed)
+    rng = random.Random(seed)
+    sequences = [[f"a{rng.randrange(num_actions)}" for _ in range(steps)] for _ in range(traces)]
+
+    sample = sequences[:200]
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for seq in sample:
+            state_space.simulate("S0", seq)
+    simulate_rate = len(sample) * steps / (time.perf_counter() - start)
+
+    compiled = state_space.compile()
+    encoded = compiled.encode_actions(sequences)
+    start = time.perf_counter()
+    compiled.simulate_many("S0", encoded)
+    batch_rate = traces * steps / (time.perf_counter() - start)
+
+    print(f"simulate:      {simulate_rate:>14,.0f} events/sec (output discarded)")
+    print(f"simulate_many: {batch_rate:>14,.0f} events/sec ({batch_rate / simulate_rate:.0f}x)")
+
+
+def benchmark_queries(num_states=100000, num_actions=3, queries=1000, seed=0):
+    """Time first (uncached) and repeated (cached) reachability and path queries."""
+    state_space = random_state_space(num_states, num_actions, seed)
+    rng = random.Random(seed)
+    pairs = [("S0", f"S{rng.randrange(num_states)}") for _ in range(queries)]
+
+    start = time.perf_counter()
+    state_space.shortest_action_path(*pairs[0])
+    state_space.strongly_connected_components()
+    print(f"First query (BFS tree + components): {time.perf_counter() - start:.3f}s")
+
+    for label, query in [("is_reachable", state_space.is_reachable),
+                         ("shortest_action_path", state_space.shortest_action_path),
+                         ("same_component", state_space.same_component)]:
+        start = time.perf_counter()
+        for source, target in pairs:
+            query(source, target)
+        print(f"Cached {label}: {1e6 * (time.perf_counter() - start) / queries:.2f} us/query")
+
+    start = time.perf_counter()
+    state_space.get_state("S1").add_transition("extra", "S2")
+    print(f"Incremental update for a new transition: {1e6 * (time.perf_counter() - start):.0f} us")
+
+    start = time.perf_counter()
+    state_space.get_state("S1").add_transition("extra", "S3")
+    state_space.same_component("S1", "S3")
+    print(f"Incremental update for an overwritten transition: {1e6 * (time.perf_counter() - start):.0f} us")
+
+
+def benchmark_run(num_states=1000, num_actions=8, steps=1_000_000, seed=0):
+    """Steps/sec of the streaming simulator with tracing off and on."""
+    state_space = random_state_space(num_states, num_actions, seed)
+    rng = random.Random(seed)
+    actions = [f"a{rng.randrange(num_actions)}" for _ in range(steps)]
+
+    for label, trace in [("tracing off", None), ("tracing on ", SimulationTrace(capacity=1000))]:
+        start = time.perf_counter()
+        for _ in state_space.run("S0", actions, trace):
+            pass
+        print(f"run, {label}: {steps / (time.perf_counter() - start):>12,.0f} steps/sec")
+
+
+def benchmark_save_load(num_states=2_000_000, num_actions=3, path="state_space.bin", seed=0):
+    """File size and open time of the binary format for a large random state-space."""
+    start = time.perf_counter()
+    state_space = random_state_space(num_states, num_actions, seed)
+    print(f"Built {num_states:,} states in Python: {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    state_space.save(path)
+    print(f"Saved in {time.perf_counter() - start:.2f}s, {os.path.getsize(path) / 2 ** 20:.1f} MiB on disk")
+    del state_space
+
+    start = time.perf_counter()
+    loaded = StateSpace.load(path)
+    print(f"Loaded in {1000 * (time.perf_counter() - start):.2f} ms")
+
+    rng = random.Random(seed)
+    names = [f"S{rng.randrange(num_states)}" for _ in range(10000)]
+    start = time.perf_counter()
+    for name in names:
+        loaded.get_state(name)
+    print(f"First access: {1e6 * (time.perf_counter() - start) / len(names):.1f} us/state")
+    os.remove(path)
 
 
 # Example Usage
 if __name__ == "__main__":
+    import sys
+
+    if "--benchmark" in sys.argv:
+        benchmark_simulate_many()
+        benchmark_run()
+        benchmark_queries()
+        benchmark_save_load()
+        sys.exit()
+
     # Define states
     idle = State("Idle", "The system is idle")
     processing = State("Processing", "The system is processing data")
@@ -81,3 +871,22 @@ if __name__ == "__main__":
     print("\nSimulation:")
     actions = ["start", "wait", "input", "finish", "reset"]
     state_space.simulate("Idle", actions)
+
+    # Stream the same actions without printing, keeping a bounded trace
+    trace = SimulationTrace(capacity=3)
+    for event in state_space.run("Idle", actions, trace):
+        pass
+    print("\nLast transitions:", [(e.source, e.action, e.target) for e in trace.recent])
+    print("State hits:", trace.state_hits)
+
+    # Query the transition graph
+    print("\nShortest path Waiting -> Idle:", state_space.shortest_action_path("Waiting", "Idle"))
+    print("Components:", [sorted(c) for c in state_space.strongly_connected_components()])
+
+    # Replay several traces at once on the compiled table
+    print("\nBatch Simulation:")
+    compiled = state_space.compile()
+    traces = [actions, ["start", "finish", "reset", "start"], ["start", "reset"]]
+    final, halted = compiled.simulate_many("Idle", traces)
+    for trace, name, stopped in zip(traces, compiled.names(final), halted):
+        print(f"{trace} -> {name}{' (stopped on invalid action)' if stopped else ''}")
@@ -0,0 +1,282 @@
+import argparse
+import time
+
+# Cell -> row, column and box index, and the 27 units as lists of cells
+ROW_OF = [cell // 9 for cell in range(81)]
+COL_OF = [cell % 9 for cell in range(81)]
+BOX_OF = [3 * (cell // 27) + (cell % 9) // 3 for cell in range(81)]
+UNITS = (
+    [[r * 9 + c for c in range(9)] for r in range(9)]
+    + [[r * 9 + c for r in range(9)] for c in range(9)]
+    + [[cell for cell in range(81) if BOX_OF[cell] == b] for b in range(9)]
+)
+UNITS_OF = [(ROW_OF[cell], 9 + COL_OF[cell], 18 + BOX_OF[cell]) for cell in range(81)]
+UNIT_BITS = [sum(1 << unit for unit in units) for units in UNITS_OF]  # units of a cell as a 27-bit set
+PEERS = [sorted({peer for unit in UNITS_OF[cell] for peer in UNITS[unit]} - {cell}) for cell in range(81)]
+
+ALL_DIGITS = 0x1FF  # bit d - 1 set means digit d is still possible
+BIT_COUNT = [bin(mask).count("1") for mask in range(512)]
+DIGITS_OF = [[d + 1 for d in range(9) if mask >> d & 1] for mask in range(512)]
+
+# Hard puzzles used when no corpus file is given
+HARD_PUZZLES = [
+    "4.....8.5.3..........7......2.....6.....8.4......1.......6.3.7.5..2.....1.4......",
+    "8..........36......7..9.2...5...7.......457.....1...3...1....68..85...1..9....4..",
+    "..53.....8......2..7..1.5..4....53...1..7...6..32...8..6.5....9..4....3......97..",
+    "1....7.9..3..2...8..96..5....53..9...1..8...26....4...3......1..4......7..7...3..",
+    "53..7....6..195....98....6.8...6...34..8.3..17...2...6.6....28....419..5....8..79",
+]
+
+
+def parse_puzzle(line):
+    """Exactly 81 characters, digits for clues and '0' or '.' for empty cells."""
+    line = line.strip()
+    if len(line) != 81 or any(ch not in "0123456789." for ch in line):
+        raise ValueError(f"Expected 81 characters of 0-9 or '.', got {len(line)}: {line!r}")
+    return [0 if ch == "." else int(ch) for ch in line]
+
+
+class SudokuState:
+    """
+    Grid plus the digits already used in every row, column and box as 9-bit
+    masks, and once ``propagate`` has run, every empty cell's candidates.
+    """
+
+    __slots__ = ("grid", "rows", "cols", "boxes", "masks")
+
+    def __init__(self, grid, rows, cols, boxes, masks=None):
+        self.grid = grid
+        self.rows = rows
+        self.cols = cols
+        self.boxes = boxes
+        self.masks = masks
+
+    @classmethod
+    def from_grid(cls, grid):
+        """Build the masks from a list of 81 digits; None if two clues clash."""
+        state = cls(list(grid), [0] * 9, [0] * 9, [0] * 9)
+        for cell, digit in enumerate(grid):
+            if digit:
+                state.grid[cell] = 0
+                if not state.candidates(cell) & (1 << (digit - 1)):
+                    return None
+                state.place(cell, digit)
+        return state
+
+    def copy(self):
+        return SudokuState(self.grid[:], self.rows[:], self.cols[:], self.boxes[:], self.masks[:])
+
+    def candidates(self, cell):
+        return ALL_DIGITS & ~(self.rows[ROW_OF[cell]] | self.cols[COL_OF[cell]] | self.boxes[BOX_OF[cell]])
+
+    def place(self, cell, digit):
+        bit = 1 << (digit - 1)
+        self.grid[cell] = digit
+        self.rows[ROW_OF[cell]] |= bit
+        self.cols[COL_OF[cell]] |= bit
+        self.boxes[BOX_OF[cell]] |= bit
+
+    def propagate(self, assign=None):
+        """
+        Fill naked and hidden singles until a fixed point.
+
+        Candidate masks are kept exact: each placement clears its digit from
+        the peers, and only units containing a cell whose mask changed are
+        rescanned for hidden singles. Called with ``assign`` (a cell, digit
+        pair) on a copy of a state already at a fixed point, the work starts
+        from that one placement instead of all 81 cells and 27 units.
+
+        Returns:
+            None on a contradiction, otherwise the remaining empty cells as
+            ``(cell, candidates)`` pairs.
+        """
+        grid, rows, cols, boxes = self.grid, self.rows, self.cols, self.boxes
+        if assign is None:
+            self.masks = masks = [0] * 81
+            singles = []
+            for cell in range(81):
+                if not grid[cell]:
+                    mask = ALL_DIGITS & ~(rows[ROW_OF[cell]] | cols[COL_OF[cell]] | boxes[BOX_OF[cell]])
+                    if not mask:
+                        return None
+                    masks[cell] = mask
+                    if not mask & (mask - 1):
+                        singles.append(cell)
+            dirty = (1 << 27) - 1  # bit u set: unit u needs a hidden-single scan
+        else:
+            masks = self.masks
+            cell, digit = assign
+            masks[cell] = 1 << (digit - 1)
+            singles, dirty = [cell], 0
+
+        while singles or dirty:
+            # Naked singles: place them, clearing the digit from every peer
+            while singles:
+                cell = singles.pop()
+                if grid[cell]:
+                    continue
+                bit = masks[cell]
+                grid[cell] = bit.bit_length()
+                rows[ROW_OF[cell]] |= bit
+                cols[COL_OF[cell]] |= bit
+                boxes[BOX_OF[cell]] |= bit
+                dirty |= UNIT_BITS[cell]
+                for peer in PEERS[cell]:
+                    mask = masks[peer]
+                    if mask & bit and not grid[peer]:
+                        mask ^= bit
+                        if not mask:
+                            return None
+                        masks[peer] = mask
+                        if not mask & (mask - 1):
+                            singles.append(peer)
+                        dirty |= UNIT_BITS[peer]
+
+            # Hidden singles: digits with exactly one place left in a changed unit
+            while dirty and not singles:
+                low = dirty & -dirty
+                dirty ^= low
+                unit = UNITS[low.bit_length() - 1]
+                once = twice = placed = 0
+                for cell in unit:
+                    if grid[cell]:
+                        placed |= 1 << (grid[cell] - 1)
+                    else:
+                        mask = masks[cell]
+                        twice |= once & mask
+                        once |= mask
+                if (once | placed) != ALL_DIGITS:
+                    return None
+                hidden = once & ~twice & ~placed
+                while hidden:
+                    bit = hidden & -hidden
+                    hidden ^= bit
+                    for cell in unit:
+                        if not grid[cell] and masks[cell] & bit:
+                            masks[cell] = bit
+                            singles.append(cell)
+                            break
+                    else:
+                        return None  # an earlier hidden single took the only cell
+
+        return [(cell, masks[cell]) for cell in range(81) if not grid[cell]]
+
+
+def search(state, assign=None):
+    """
+    Depth-first search with propagation at every node; returns the solved
+    state or None. ``assign`` is the branching placement, made by ``propagate``.
+    """
+    empty = state.propagate(assign)
+    if empty is None:
+        return None
+    if not empty:
+        return state
+    # Branch on the most constrained cell (minimum remaining values)
+    cell, mask = min(empty, key=lambda item: BIT_COUNT[item[1]])
+    for digit in DIGITS_OF[mask]:
+        result = search(state.copy(), (cell, digit))
+        if result:
+            return result
+    return None
+
+
+def solve_sudoku(puzzle):
+    """
+    Solve a Sudoku given as an 81-character string or a 9x9 list of lists.
+
+    Returns:
+        The solution as a 9x9 list of lists, or None if there is none.
+    """
+    if isinstance(puzzle, str):
+        grid = parse_puzzle(puzzle)
+    else:
+        grid = [num for row in puzzle for num in row]
+    state = SudokuState.from_grid(grid)
+    solved = search(state) if state else None
+    if not solved:
+        return None
+    return [solved.grid[r * 9:r * 9 + 9] for r in range(9)]
+
+
+def solve_file(input_path, output_path):
+    """
+    Stream puzzles from a file (one 81-character puzzle per line) and write one
+    solution line per puzzle. Blank lines and lines starting with '#' are
+    skipped; unsolvable puzzles produce the line 'unsolvable' and malformed
+    ones the line 'invalid'.
+
+    Returns:
+        Number of puzzles read.
+    """
+    count = 0
+    with open(input_path) as src, open(output_path, "w") as dst:
+        for line in src:
+            if not line.strip() or line.startswith("#"):
+                continue
+            try:
+                solution = solve_sudoku(line)
+            except ValueError:
+                dst.write("invalid\n")
+            else:
+                if solution:
+                    dst.write("".join(str(num) for row in solution for num in row) + "\n")
+                else:
+                    dst.write("unsolvable\n")
+            count += 1
+    return count
+
+
+def benchmark(path=None, repeat=20):
+    """Report puzzles/sec and per-puzzle latency over a corpus file (or the built-in hard set)."""
+    if path:
+        with open(path) as f:
+            puzzles = [line for line in f if line.strip() and not line.startswith("#")]
+    else:
+        puzzles = HARD_PUZZLES * repeat
+
+    times = []
+    unsolved = 0
+    for puzzle in puzzles:
+        start = time.perf_counter()
+        if solve_sudoku(puzzle) is None:
+            unsolved += 1
+        times.append(time.perf_counter() - start)
+
+    total = sum(times)
+    times.sort()
+    print(f"Puzzles: {len(puzzles)}, unsolved: {unsolved}")
+    print(f"Throughput: {len(puzzles) / total:,.0f} puzzles/sec")
+
+    def percentile(p):
+        return 1000 * times[min(len(times) - 1, int(p * len(times)))]
+
+    print(f"Latency: mean {1000 * total / len(puzzles):.3f} ms, median {percentile(0.5):.3f} ms, "
+          f"p90 {percentile(0.9):.3f} ms, p99 {percentile(0.99):.3f} ms, max {1000 * times[-1]:.3f} ms")
+
+
+def print_grid(grid):
+    for r, row in enumerate(grid):
+        if r and r % 3 == 0:
+            print("------+-------+------")
+        print(" | ".join(" ".join(str(num) for num in row[c:c + 3]) for c in range(0, 9, 3)))
+
+
+# Example Usage
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bitmask constraint-propagation Sudoku solver")
+    parser.add_argument("input", nargs="?", help="file with one 81-character puzzle per line")
+    parser.add_argument("output", nargs="?", help="file to write the solutions to")
+    parser.add_argument("--benchmark", action="store_true", help="measure throughput over the input file or the built-in hard puzzles")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.input)
+    elif args.input and args.output:
+        start = time.perf_counter()
+        count = solve_file(args.input, args.output)
+        print(f"Solved {count} puzzles in {time.perf_counter() - start:.2f}s")
+    else:
+        solution = solve_sudoku(HARD_PUZZLES[1])
+        print("Sudoku Solution:")
+        print_grid(solution)
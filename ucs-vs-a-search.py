@@ -1,90 +1,234 @@
+import argparse
 import heapq
+import random
+import time
+import tracemalloc
+
 import networkx as nx
-import matplotlib.pyplot as plt
 
-def uniform_cost_search(graph, start, goal):
+from indexed_heap import indexed_best_first_search
+from graph_render import LAYOUT_DIRECTORY, cached_layout, draw_sizes, graph_edges, new_figure, show_or_save
+from graph_store import CSRGraph
+from search_stats import callbacks, record
+
+def uniform_cost_search(graph, start, goal, queue="heapq", stats=None):
+    """
+    With ``queue="indexed"`` the frontier is an IndexedHeap with decrease-key
+    instead of a heapq list that collects stale entries. ``stats`` (a dict or
+    SearchStats) receives "peak_queue", the largest frontier size, and the
+    counters and phase timings described in ``search_stats``.
+    """
+    if isinstance(graph, CSRGraph):
+        cost, path = uniform_cost_search(graph.weighted_view(), graph.node_id(start), graph.node_id(goal), queue, stats)
+        return cost, graph.labels_of(path)
+    if queue == "indexed":
+        cost, path, _ = indexed_best_first_search(graph, start, goal, stats=stats)
+        return cost, path
+    started = time.perf_counter()
+    on_expand, on_push = callbacks(stats)
+    peak = 0
+    pushed = 1
+    reopened = 0
     pq = []  # Priority queue
     heapq.heappush(pq, (0, start))  # (cost, node)
     visited = set()
     cost_so_far = {start: 0}
 
     path = []  # To store the explored path
+    found = False
 
     while pq:
+        if len(pq) > peak:
+            peak = len(pq)
         current_cost, current_node = heapq.heappop(pq)
 
         if current_node in visited:
             continue
         visited.add(current_node)
         path.append(current_node)
+        if on_expand is not None:
+            on_expand(current_node)
 
         if current_node == goal:
-            return current_cost, path
+            found = True
+            break
 
         for neighbor, weight in graph[current_node]:
             new_cost = current_cost + weight
             if neighbor not in cost_so_far or new_cost < cost_so_far[neighbor]:
+                if neighbor in visited:  # only with negative weights
+                    reopened += 1
                 cost_so_far[neighbor] = new_cost
                 heapq.heappush(pq, (new_cost, neighbor))
+                pushed += 1
+                if on_push is not None:
+                    on_push(neighbor, new_cost)
 
+    if stats is not None:
+        stats["peak_queue"] = peak
+        record(stats, len(path), pushed, reopened, peak, {"search": time.perf_counter() - started})
+    if found:
+        return current_cost, path
     return float("inf"), path  # If no path is found
 
-def a_star_search(graph, start, goal, heuristic):
+def a_star_search(graph, start, goal, heuristic, queue="heapq", stats=None):
+    """
+    ``queue`` and ``stats`` work as in ``uniform_cost_search``; "reopened"
+    counts closed nodes later reached more cheaply (inconsistent heuristics),
+    which this search does not expand again.
+    """
+    if isinstance(graph, CSRGraph):
+        cost, path = a_star_search(graph.weighted_view(), graph.node_id(start), graph.node_id(goal),
+                                   heuristic_by_id(graph, heuristic), queue, stats)
+        return cost, graph.labels_of(path)
+    if queue == "indexed":
+        cost, path, _ = indexed_best_first_search(graph, start, goal, heuristic, stats=stats)
+        return cost, path
+    started = time.perf_counter()
+    on_expand, on_push = callbacks(stats)
+    peak = 0
+    pushed = 1
+    reopened = 0
     pq = []  # Priority queue
     heapq.heappush(pq, (0, start))  # (f(n), node)
     visited = set()
     cost_so_far = {start: 0}
 
     path = []  # To store the explored path
+    found = False
 
     while pq:
+        if len(pq) > peak:
+            peak = len(pq)
         current_cost, current_node = heapq.heappop(pq)
 
         if current_node in visited:
             continue
         visited.add(current_node)
         path.append(current_node)
+        if on_expand is not None:
+            on_expand(current_node)
 
         if current_node == goal:
-            return cost_so_far[current_node], path
+            found = True
+            break
 
         for neighbor, weight in graph[current_node]:
             new_cost = cost_so_far[current_node] + weight
             if neighbor not in cost_so_far or new_cost < cost_so_far[neighbor]:
+                if neighbor in visited:
+                    reopened += 1
                 cost_so_far[neighbor] = new_cost
                 f_cost = new_cost + heuristic[neighbor]
                 heapq.heappush(pq, (f_cost, neighbor))
+                pushed += 1
+                if on_push is not None:
+                    on_push(neighbor, f_cost)
 
+    if stats is not None:
+        stats["peak_queue"] = peak
+        record(stats, len(path), pushed, reopened, peak, {"search": time.perf_counter() - started})
+    if found:
+        return cost_so_far[goal], path
     return float("inf"), path  # If no path is found
 
-def visualize_graph(graph, ucs_path, astar_path, start, goal):
+def heuristic_by_id(graph, heuristic):
+    """
+    Index a heuristic by the node ids of a CSRGraph. Takes a dict keyed by
+    node label (nodes it leaves out get 0, labels not in the graph are
+    ignored) or a sequence already in id order.
+    """
+    if isinstance(heuristic, dict):
+        values = [0] * graph.num_nodes
+        for label, value in heuristic.items():
+            try:
+                values[graph.node_id(label)] = value
+            except KeyError:
+                continue
+        return values
+    return heuristic.tolist() if hasattr(heuristic, "tolist") else heuristic
+
+def visualize_graph(graph, ucs_path, astar_path, start, goal, hops=None, output=None, layout="auto",
+                    layout_directory=LAYOUT_DIRECTORY):
     """
     Visualizes the graph and the paths explored by UCS and A*.
+
+    With ``hops`` only the nodes within that many hops of either path are
+    drawn; with ``output`` the picture is written to that image file
+    (headless) instead of shown. Layouts are cached in ``layout_directory``.
     """
+    nodes, edges = graph_edges(graph, list(dict.fromkeys(ucs_path + astar_path)), hops)
     G = nx.DiGraph()
-    for node, edges in graph.items():
-        for neighbor, weight in edges:
-            G.add_edge(node, neighbor, weight=weight)
+    G.add_nodes_from(nodes)
+    for node, neighbor, weight in edges:
+        G.add_edge(node, neighbor, weight=weight)
 
-    pos = nx.spring_layout(G)
+    pos = cached_layout(G, layout, layout_directory)
+    fig, ax = new_figure(output, figsize=(10, 7))
+    node_size, labels = draw_sizes(G)
 
     # Draw the graph
-    nx.draw(G, pos, with_labels=True, node_size=700, node_color="lightblue")
-    nx.draw_networkx_edge_labels(G, pos, edge_labels={(u, v): d["weight"] for u, v, d in G.edges(data=True)})
+    nx.draw(G, pos, ax=ax, with_labels=labels, node_size=node_size, node_color="lightblue")
+    if labels:
+        nx.draw_networkx_edge_labels(G, pos, ax=ax, edge_labels={(u, v): d["weight"] for u, v, d in G.edges(data=True)})
 
     # Highlight UCS path
     ucs_edges = [(ucs_path[i], ucs_path[i + 1]) for i in range(len(ucs_path) - 1)]
-    nx.draw_networkx_edges(G, pos, edgelist=ucs_edges, edge_color="blue", width=2, label="UCS Path")
+    nx.draw_networkx_edges(G, pos, ax=ax, edgelist=ucs_edges, edge_color="blue", width=2, label="UCS Path")
 
     # Highlight A* path
     astar_edges = [(astar_path[i], astar_path[i + 1]) for i in range(len(astar_path) - 1)]
-    nx.draw_networkx_edges(G, pos, edgelist=astar_edges, edge_color="red", width=2, style="dashed", label="A* Path")
+    nx.draw_networkx_edges(G, pos, ax=ax, edgelist=astar_edges, edge_color="red", width=2, style="dashed", label="A* Path")
+
+    ax.legend(loc="best")
+    ax.set_title(f"Graph Visualization ({start} to {goal})")
+    show_or_save(fig, output)
+
+def dense_random_graph(n, density=0.5, max_weight=100, seed=0):
+    """Directed graph where each node links to ``density * n`` random others with random weights."""
+    rng = random.Random(seed)
+    others = list(range(n))
+    return {node: [(neighbor, rng.randint(1, max_weight)) for neighbor in rng.sample(others, int(density * n))]
+            for node in range(n)}
 
-    plt.legend(loc="best")
-    plt.title(f"Graph Visualization ({start} to {goal})")
-    plt.show()
+def benchmark_queues(n=2000, density=0.5, queries=10, seed=0):
+    """Peak frontier size, peak memory and runtime of heapq against the indexed heap on a dense graph."""
+    graph = dense_random_graph(n, density, seed=seed)
+    rng = random.Random(seed + 1)
+    pairs = [(rng.randrange(n), rng.randrange(n)) for _ in range(queries)]
+    # Half the exact distance to each goal: an admissible heuristic for A*
+    reverse = nx.DiGraph((v, u, {"weight": w}) for u, edges in graph.items() for v, w in edges)
+    heuristics = {goal: [0] * n for _, goal in pairs}
+    for goal, h in heuristics.items():
+        for node, distance in nx.single_source_dijkstra_path_length(reverse, goal).items():
+            h[node] = distance / 2
+    print(f"Dense graph: {n:,} nodes, {sum(map(len, graph.values())):,} edges, {queries} queries")
 
-def compare_and_visualize():
+    for name, search in (("uniform_cost_search", lambda s, g, q, st: uniform_cost_search(graph, s, g, q, st)),
+                         ("a_star_search", lambda s, g, q, st: a_star_search(graph, s, g, heuristics[g], q, st))):
+        for queue in ("heapq", "indexed"):
+            peak_queue = 0
+            costs = []
+            start_time = time.perf_counter()
+            for start, goal in pairs:
+                stats = {}
+                costs.append(search(start, goal, queue, stats)[0])
+                peak_queue = max(peak_queue, stats["peak_queue"])
+            elapsed = time.perf_counter() - start_time
+
+            tracemalloc.start()
+            for start, goal in pairs:
+                search(start, goal, queue, None)
+            peak_memory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"  {name:<20} {queue:<8} {1000 * elapsed / queries:8.1f} ms/query, "
+                  f"peak queue {peak_queue:>9,}, peak memory {peak_memory / 2 ** 20:6.1f} MB")
+            if queue == "heapq":
+                expected = costs
+            else:
+                assert costs == expected
+
+def compare_and_visualize(output=None):
     graph = {
         "A": [("B", 1), ("C", 4)],
         "B": [("C", 2), ("D", 5)],
@@ -112,7 +256,16 @@ def compare_and_visualize():
     print(f"A* Search: Path cost = {astar_cost}, Path = {astar_path}")
 
     # Visualize the graph and paths
-    visualize_graph(graph, ucs_path, astar_path, start, goal)
+    visualize_graph(graph, ucs_path, astar_path, start, goal, output=output)
 
 # Example usage
-compare_and_visualize()
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Uniform-Cost Search vs A*")
+    parser.add_argument("output", nargs="?", help="write the picture to this image file instead of opening a window")
+    parser.add_argument("--benchmark", action="store_true", help="compare heapq and the indexed heap on a dense graph")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark_queues()
+    else:
+        compare_and_visualize(args.output)